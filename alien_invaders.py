@@ -3,47 +3,205 @@
 familiarizing myself with Python
 """
 
-import pygame.display
-from pygame.sprite import Group
-from pygame.surface import Surface
+from contextlib import ExitStack
+from time import perf_counter
 
-import game_functions as gf
-from button import Button
-from game_stats import GameStats
-from scoreboard import Scoreboard
-from settings import Settings
-from ship import Ship
+# Read before anything else is imported, so startup is timed from launch
+LAUNCHED = perf_counter()
+
+import pygame.display  # noqa: E402
+import pygame.event  # noqa: E402
+import pygame.font  # noqa: E402
+import pygame.time  # noqa: E402
+from pygame.surface import Surface  # noqa: E402
+
+import game_functions as gf  # noqa: E402
+import image_functions as img_funs  # noqa: E402
+from bullet import BulletPool  # noqa: E402
+from button import Button  # noqa: E402
+from capture import FrameCapture  # noqa: E402
+from fleet import Fleet  # noqa: E402
+from game_stats import GameStats  # noqa: E402
+from glyph_atlas import get_font  # noqa: E402
+from high_scores import HighScoreStore  # noqa: E402
+from pipeline import Pipeline  # noqa: E402
+from profiler import (ASSETS, DISPLAY, EVENTS, FIRST_FRAME,  # noqa: E402
+                      IMPORTS, NULL_PROFILER, OBJECTS, RENDER, SPRITES,
+                      FrameProfiler, PerfHud, StartupTimer)
+from renderer import create_renderer  # noqa: E402
+from replay import InputRecorder, state_checksum  # noqa: E402
+from scoreboard import Scoreboard  # noqa: E402
+from settings import Settings  # noqa: E402
+from ship import SHIP_IMAGE, Ship  # noqa: E402
+from simulation import ALIEN_IMAGE  # noqa: E402
 
 
 def run_game():
-    pygame.init()
+    startup = StartupTimer(LAUNCHED)
+    startup.mark(IMPORTS)
+
+    # Read the images in the background while the display comes up
+    img_funs.preload_async([ALIEN_IMAGE, SHIP_IMAGE])
+    # Only what the game uses: pygame.init() would also bring up audio
+    # and joysticks, which can be slow and the game has no use for
+    pygame.display.init()
+    pygame.font.init()
     ai_settings: Settings = Settings()
-    screen = pygame.display.set_mode(
-        (ai_settings.screen_width, ai_settings.screen_height))
-    pygame.display.set_caption('Alien Invasion')
+    size = (ai_settings.screen_width, ai_settings.screen_height)
+    if ai_settings.render_backend == 'texture':
+        # The renderer draws straight to a window of its own; the
+        # screen surface only sizes the sprites and receives read backs.
+        # Only this backend needs pygame's experimental _sdl2 module.
+        from pygame._sdl2.video import Window
+        window = Window('Alien Invasion', size)
+        screen = Surface(size)
+    else:
+        window = None
+        # vsync needs a renderer-backed window, which SCALED provides
+        flags = pygame.SCALED if ai_settings.vsync else 0
+        screen = pygame.display.set_mode(size, flags,
+                                         vsync=int(ai_settings.vsync))
+        pygame.display.set_caption('Alien Invasion')
+    startup.mark(DISPLAY)
 
+    # Convert every image once, now that the display exists
+    img_funs.preload([ALIEN_IMAGE, SHIP_IMAGE])
+    img_funs.load_image(SHIP_IMAGE, ai_settings.lives_left_height)
+    startup.mark(ASSETS)
+
+    renderer = create_renderer(ai_settings, screen, window)
     play_button = Button(ai_settings, screen, "Play")
-    stats = GameStats(ai_settings)
+    if ai_settings.high_score_file:
+        # Opens and reads the file on its own thread
+        high_scores = HighScoreStore(ai_settings.high_score_file,
+                                     ai_settings.high_score_flush_interval)
+    else:
+        high_scores = None
+    stats = GameStats(ai_settings, high_scores)
+    # Whether the stored high score has been taken up yet
+    high_score_loaded = high_scores is None
     scoreboard = Scoreboard(ai_settings, screen, stats)
     ship = Ship(ai_settings, screen)
-    aliens = Group()
-    bullets = Group()
+    aliens = Fleet(ai_settings, screen)
+    bullets = BulletPool(ai_settings, screen)
 
     gf.create_fleet(ai_settings, screen, ship, aliens)
+    startup.mark(OBJECTS)
+
+    # Fixed-timestep loop: the clock's elapsed time accumulates in lag
+    # and is consumed in whole simulation steps; the remainder sets how
+    # far between steps the frame is drawn.
+    clock = pygame.time.Clock()
+    step = 1.0 / ai_settings.simulation_rate
+    lag = 0.0
+
+    if ai_settings.profile:
+        profiler = FrameProfiler(ai_settings.profile_frames)
+        hud = PerfHud(profiler, screen,
+                      get_font(24, ai_settings.font_file))
+    else:
+        profiler = NULL_PROFILER
+        hud = None
+
+    if ai_settings.pipelined:
+        # The sprites only show what the simulation thread publishes
+        pipeline = Pipeline(ai_settings, stats, scoreboard, play_button,
+                            ship, aliens, bullets)
+        seed = pipeline.aliens.seed
+    else:
+        pipeline = None
+        seed = aliens.seed
+
+    if ai_settings.record_input:
+        recorder = InputRecorder(ai_settings.record_input, ai_settings,
+                                 seed)
+    else:
+        recorder = None
+
+    if ai_settings.capture_output:
+        capture = FrameCapture(ai_settings.capture_output, ai_settings,
+                               screen)
+        if window:
+            # Frames are only drawn to the screen surface when asked
+            renderer.copy_to_screen = True
+    else:
+        capture = None
+
+    # Simulation steps taken, which stamp recorded input
+    tick = 0
+
+    try:
+        if pipeline:
+            pipeline.start(recorder)
+        while True:
+            running = stats.game_active and not stats.game_paused
+            fps = ai_settings.max_fps if running else ai_settings.idle_fps
+            if startup:
+                # Draw the first frame straight away, without waiting
+                # out a frame's worth of time since the clock started
+                fps = 0
+            elapsed = clock.tick(fps) / 1000.0
+            lag += min(elapsed, ai_settings.max_frame_time)
+
+            profiler.begin_frame()
+            events = pygame.event.get()
+            if pipeline:
+                pipeline.handle_events(events, renderer)
+            else:
+                if recorder:
+                    recorder.record_events(tick, events)
+                gf.check_events(ai_settings, stats, scoreboard, screen,
+                                play_button, ship, aliens, bullets, events,
+                                renderer)
+            if not high_score_loaded:
+                high_score_loaded = gf.check_stored_high_score(stats,
+                                                               scoreboard)
+            profiler.mark(EVENTS)
 
-    while True:
-        gf.check_events(ai_settings, stats, scoreboard, screen,
-                        play_button, ship, aliens, bullets)
+            if pipeline:
+                alpha = pipeline.sync()
+            else:
+                while lag >= step:
+                    lag -= step
+                    if stats.game_active and not stats.game_paused:
+                        gf.update_game(ai_settings, screen, stats,
+                                       scoreboard, ship, aliens, bullets,
+                                       step, profiler)
+                    tick += 1
+                    if (recorder
+                            and tick % recorder.checksum_interval == 0):
+                        recorder.record_checksum(tick, state_checksum(
+                            ai_settings, stats, ship, aliens, bullets))
 
-        if stats.game_active and not stats.game_paused:
-            ship.update()
-            gf.update_bullets(ai_settings, screen, stats, scoreboard,
-                              ship, aliens, bullets)
-            gf.update_aliens(ai_settings, screen, stats, scoreboard,
-                             ship, aliens, bullets)
+                running = stats.game_active and not stats.game_paused
+                alpha = lag / step if running else 1.0
+            gf.update_screen(ai_settings, screen, stats, scoreboard, ship,
+                             aliens, bullets, play_button, renderer, alpha,
+                             hud, capture)
+            profiler.mark(RENDER)
+            profiler.count(SPRITES, len(aliens) + len(bullets) + 1)
+            profiler.end_frame()
 
-        gf.update_screen(ai_settings, screen, stats, scoreboard, ship,
-                         aliens, bullets, play_button)
+            if startup:
+                startup.mark(FIRST_FRAME)
+                if ai_settings.startup_report:
+                    print(startup.report())
+                startup = None
+    finally:
+        # Each is closed even if one before it fails, last to first as
+        # added, so the high score store always gets to flush its writes
+        with ExitStack() as closing:
+            if high_scores:
+                closing.callback(high_scores.close)
+            if profiler.enabled and ai_settings.profile_output:
+                closing.callback(profiler.dump, ai_settings.profile_output)
+            if capture:
+                closing.callback(capture.close)
+            if recorder:
+                closing.callback(lambda: recorder.close(
+                    pipeline.tick if pipeline else tick))
+            if pipeline:
+                closing.callback(pipeline.stop)
 
 
 run_game()
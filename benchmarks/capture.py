@@ -0,0 +1,82 @@
+"""
+Time what frame capture costs the game loop, per format.
+
+Renders the game headless at full size, paced to --fps, and times each
+call the game loop makes to FrameCapture.capture, which is all the
+capture costs it; encoding happens on the writer thread. Frames go to
+a temporary directory.
+
+Run from the project directory:
+    python -m benchmarks.capture [--frames 300] [--fps 60] [--format y4m]
+"""
+import argparse
+import os
+import tempfile
+from time import perf_counter, sleep
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np  # noqa: E402
+
+from capture import FORMATS, FrameCapture  # noqa: E402
+from headless import HeadlessGame  # noqa: E402
+from settings import Settings  # noqa: E402
+
+OUTPUTS = {'png': 'frames', 'y4m': 'capture.y4m', 'raw': 'capture.rgb'}
+
+
+def time_captures(game: HeadlessGame, frames: int, fps: float,
+                  capture: FrameCapture) -> np.ndarray:
+    """Seconds each captured (not skipped or dropped) capture call took"""
+    times = []
+    deadline = perf_counter()
+    for frame in range(frames):
+        game.step()
+        game.render()
+        start = perf_counter()
+        if capture.capture(game.screen):
+            times.append(perf_counter() - start)
+        if fps:
+            deadline += 1.0 / fps
+            sleep(max(0.0, deadline - perf_counter()))
+    return np.array(times or [0.0])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--fps', type=float, default=60,
+                        help='Frame rate to pace at, 0 for flat out')
+    parser.add_argument('--format', choices=FORMATS, action='append')
+    args = parser.parse_args()
+
+    ai_settings = Settings()
+    # Redraw everything so each frame costs the same
+    ai_settings.render_mode = 'full'
+    # Capture at the paced rate, so no frame is skipped or repeated
+    ai_settings.max_fps = round(args.fps)
+    game = HeadlessGame(ai_settings)
+    game.start()
+    print('{}x{}, {} frames at {} fps'.format(
+        ai_settings.screen_width, ai_settings.screen_height, args.frames,
+        args.fps or 'unlimited'))
+
+    for capture_format in args.format or FORMATS:
+        with tempfile.TemporaryDirectory() as directory:
+            capture = FrameCapture(
+                os.path.join(directory, OUTPUTS[capture_format]),
+                ai_settings, game.screen)
+            times = time_captures(game, args.frames, args.fps,
+                                  capture)
+            start = perf_counter()
+            capture.close()
+            drain = perf_counter() - start
+        print('{:>4}: {:.3f} ms/frame median, {:.3f} ms p99, '
+              '{} written, {} dropped, {:.2f}s to drain'.format(
+                  capture_format, np.median(times) * 1000,
+                  np.percentile(times, 99) * 1000, capture.written,
+                  capture.dropped, drain))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+"""
+Compare pygame.sprite.groupcollide with the fleet's lattice broadphase
+and the spatial hash fallback, then time the fleet's pixel-accurate
+'mask' collision mode against plain rects on the calls the game makes.
+
+Run from the project directory:
+    python -m benchmarks.collisions [--aliens 10000] [--bullets 1000]
+"""
+import argparse
+import os
+import random
+import timeit
+from statistics import median
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+from pygame.sprite import Group, Sprite  # noqa: E402
+
+from collisions import spatial_groupcollide  # noqa: E402
+from fleet import Fleet  # noqa: E402
+from settings import Settings  # noqa: E402
+from ship import Ship  # noqa: E402
+from simulation import ProjectilePool, World  # noqa: E402
+
+
+def build_scene(number_aliens: int, number_bullets: int, seed: int,
+                collision_mode: str = 'rect'):
+    ai_settings = Settings()
+    ai_settings.collision_mode = collision_mode
+    columns = int(number_aliens ** 0.5)
+    rows = -(-number_aliens // columns)
+
+    probe = Fleet(ai_settings, pygame.Surface((1, 1)))
+    width = (2 * columns + 1) * probe.width
+    height = (2 * rows + 1) * probe.height
+    screen = pygame.Surface((width, height))
+
+    fleet = Fleet(ai_settings, screen)
+    fleet.spawn_grid(columns, rows)
+    # Knock out a few aliens so dead cells are exercised too
+    rng = random.Random(seed)
+    fleet.kill(rng.sample(range(fleet.size), fleet.size // 100))
+    # Move off the integer lattice, as a fleet does in play
+    fleet.x[:fleet.size] += 7.3
+    fleet.y[:fleet.size] += 3
+
+    bullets = Group()
+    for _ in range(number_bullets):
+        bullet = Sprite()
+        bullet.rect = pygame.Rect(rng.randrange(width), rng.randrange(height),
+                                  ai_settings.bullet_width,
+                                  ai_settings.bullet_height)
+        bullets.add(bullet)
+
+    # The same aliens as ordinary sprites, for the groupcollide baseline
+    aliens = Group()
+    alive = np.flatnonzero(fleet.alive[:fleet.size])
+    for index, left, top in zip(alive.tolist(),
+                                fleet.lefts()[alive].tolist(),
+                                fleet.tops()[alive].tolist()):
+        alien = Sprite()
+        alien.rect = pygame.Rect(left, top, fleet.width, fleet.height)
+        alien.index = index
+        aliens.add(alien)
+    return fleet, aliens, bullets
+
+
+def as_indexes(collisions) -> dict:
+    return {bullet: [alien.index for alien in hits]
+            for bullet, hits in collisions.items()}
+
+
+def lattice_groupcollide(fleet: Fleet, bullets: Group) -> dict:
+    """groupcollide(bullets, fleet) on the fleet's lattice, by index"""
+    sprites = bullets.sprites()
+    rects = np.array([sprite.rect for sprite in sprites],
+                     dtype=np.int64).reshape(-1, 4)
+    lefts, tops = rects[:, 0], rects[:, 1]
+    rect_indexes, indexes = fleet.collide_rects(
+        lefts, tops, lefts + rects[:, 2], tops + rects[:, 3])
+    collisions: dict = {}
+    for rect_index, index in zip(rect_indexes.tolist(), indexes.tolist()):
+        collisions.setdefault(sprites[rect_index], []).append(index)
+    return collisions
+
+
+class ProjectileScene():
+    """
+    A fleet and projectiles in flight at rects, put back as they were
+    before every timed collide_projectiles call, since it kills the
+    aliens and projectiles that hit
+    """
+
+    def __init__(self, fleet: Fleet, rects: List[Tuple[int, ...]]) -> None:
+        self.fleet = fleet
+        self.rects = rects
+        self.projectiles = ProjectilePool(
+            fleet.ai_settings, World(*fleet.screen.get_size()))
+        self.alive = fleet.alive[:fleet.size].copy()
+        self.alive_count = fleet.alive_count
+        self.front = fleet.front.copy()
+
+    def collide(self) -> float:
+        """Time one collide_projectiles call, in seconds"""
+        fleet = self.fleet
+        fleet.alive[:fleet.size] = self.alive
+        fleet.alive_count = self.alive_count
+        fleet.front[:] = self.front
+        self.projectiles.empty()
+        for left, top, _, _ in self.rects:
+            projectile = self.projectiles.take()
+            projectile.left = left
+            projectile.top = top
+        start = perf_counter()
+        fleet.collide_projectiles(self.projectiles)
+        return perf_counter() - start
+
+
+def time_call(function: Callable[[], object]) -> float:
+    start = perf_counter()
+    function()
+    return perf_counter() - start
+
+
+def compare_modes(name: str, rect_call: Callable[[], float],
+                  mask_call: Callable[[], float], iterations: int) -> None:
+    """
+    Time rect and mask mode call by call, taking turns so that both see
+    the same machine, and print the median of each
+    """
+    rect_times, mask_times = [], []
+    for _ in range(iterations):
+        rect_times.append(rect_call())
+        mask_times.append(mask_call())
+    rect_time, mask_time = median(rect_times), median(mask_times)
+    print('{:>26}: rect {:8.1f} us, mask {:8.1f} us ({:+.1f}%)'.format(
+        name, rect_time * 1e6, mask_time * 1e6,
+        100 * (mask_time / rect_time - 1)))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--aliens', type=int, default=10000)
+    parser.add_argument('--bullets', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--iterations', type=int, default=3000,
+                        help='Calls timed per mode when comparing modes')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pygame.init()
+    fleet, aliens, bullets = build_scene(args.aliens, args.bullets, args.seed)
+
+    expected = as_indexes(pygame.sprite.groupcollide(bullets, aliens,
+                                                     False, False))
+    assert lattice_groupcollide(fleet, bullets) == expected
+    assert as_indexes(spatial_groupcollide(bullets, aliens,
+                                           False, False)) == expected
+
+    candidates = {
+        'groupcollide': lambda: pygame.sprite.groupcollide(
+            bullets, aliens, False, False),
+        'spatial hash': lambda: spatial_groupcollide(
+            bullets, aliens, False, False),
+        'lattice': lambda: lattice_groupcollide(fleet, bullets),
+    }
+    print('{:,} aliens, {:,} bullets, {} hits'.format(
+        len(fleet), len(bullets), len(expected)))
+    baseline = None
+    for name, function in candidates.items():
+        seconds = min(timeit.repeat(function, number=1,
+                                    repeat=args.repeat))
+        baseline = baseline or seconds
+        print('{:>14}: {:9.3f} ms  ({:.1f}x)'.format(
+            name, seconds * 1000, baseline / seconds))
+
+    # Same scene, same seed, with masks: the overhead of mask mode on
+    # the calls the game makes each step
+    mask_fleet, _, _ = build_scene(args.aliens, args.bullets, args.seed,
+                                   'mask')
+    ship = Ship(mask_fleet.ai_settings, mask_fleet.screen)
+    center_x, center_y = mask_fleet.screen.get_rect().center
+    ship.left = center_x - ship.width // 2
+    ship.top = center_y - ship.height // 2
+    rects = [tuple(bullet.rect) for bullet in bullets]
+    in_play = fleet.ai_settings.bullets_allowed
+    print('collision modes, {:,} aliens, median of {:,} calls:'.format(
+        len(fleet), args.iterations))
+    for number in (in_play, len(rects)):
+        scenes = [ProjectileScene(candidate, rects[:number])
+                  for candidate in (fleet, mask_fleet)]
+        compare_modes('collide_projectiles ({})'.format(number),
+                      scenes[0].collide, scenes[1].collide,
+                      args.iterations)
+    compare_modes('collide_rect (ship)',
+                  lambda: time_call(lambda: fleet.collide_rect(
+                      ship.left, ship.top, ship.width, ship.height)),
+                  lambda: time_call(lambda: mask_fleet.collide_rect(
+                      ship.left, ship.top, ship.width, ship.height,
+                      ship.shape)),
+                  args.iterations)
+
+
+if __name__ == '__main__':
+    main()
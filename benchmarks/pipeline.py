@@ -0,0 +1,153 @@
+"""
+Compare the serial game loop with pipelined mode when drawing is slow.
+
+Both loops run headless for the same scripted input, drawing at up to
+max_fps, with an optional sleep after each frame standing in for a slow
+flip (which, like pygame's blits and flips, releases the GIL). The
+intervals between simulation steps show how steadily each mode keeps
+the simulation rate: serial steps come in bursts after every frame,
+pipelined ones on their own clock.
+
+Run from the project directory:
+    python -m benchmarks.pipeline [--seconds 5] [--flip-delay 30]
+    python -m benchmarks.pipeline --heavy
+"""
+import argparse
+import os
+from time import perf_counter, sleep
+from typing import Dict, List
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np  # noqa: E402
+import pygame  # noqa: E402
+import pygame.time  # noqa: E402
+from pygame.event import Event  # noqa: E402
+
+from headless import HeadlessGame  # noqa: E402
+from pipeline import Pipeline  # noqa: E402
+from settings import Settings  # noqa: E402
+
+
+class Script():
+    """Start a game, sweep from side to side and fire ten times a second"""
+
+    def __init__(self) -> None:
+        self.fired = 0
+        self.direction = None
+
+    def events(self, elapsed: float) -> List[Event]:
+        events = []
+        if self.direction is None:
+            events.append(Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+        direction = (pygame.K_LEFT if int(elapsed / 2) % 2
+                     else pygame.K_RIGHT)
+        if direction != self.direction:
+            if self.direction is not None:
+                events.append(Event(pygame.KEYUP, key=self.direction))
+            events.append(Event(pygame.KEYDOWN, key=direction))
+            self.direction = direction
+        while self.fired < elapsed * 10:
+            events.append(Event(pygame.KEYDOWN, key=pygame.K_SPACE))
+            self.fired += 1
+        return events
+
+
+def build(heavy: bool) -> HeadlessGame:
+    ai_settings = Settings()
+    ai_settings.random_seed = 0
+    ai_settings.high_score_file = None
+    if heavy:
+        # 10k+ aliens blitted one by one on a 4K screen
+        ai_settings.screen_width = 3840
+        ai_settings.screen_height = 2160
+        ai_settings.alien_height = 13
+        ai_settings.fleet_composite = False
+    return HeadlessGame(ai_settings, display=False)
+
+
+def run_serial(game: HeadlessGame, seconds: float,
+               flip_delay: float) -> Dict:
+    """The loop run_game runs: input, the steps due, then a frame"""
+    ai_settings = game.ai_settings
+    script = Script()
+    clock = pygame.time.Clock()
+    step_times = []
+    frames = 0
+    lag = 0.0
+    start = perf_counter()
+    while perf_counter() - start < seconds:
+        lag += min(clock.tick(ai_settings.max_fps) / 1000.0,
+                   ai_settings.max_frame_time)
+        game.handle_events(script.events(perf_counter() - start))
+        while lag >= game.step_time:
+            lag -= game.step_time
+            step_times.append(perf_counter())
+            game.step()
+        game.render(lag / game.step_time)
+        sleep(flip_delay)
+        frames += 1
+    return summarize(step_times, frames, perf_counter() - start, game)
+
+
+def run_pipelined(game: HeadlessGame, seconds: float,
+                  flip_delay: float) -> Dict:
+    ai_settings = game.ai_settings
+    pipeline = Pipeline(ai_settings, game.stats, game.scoreboard,
+                        game.play_button, game.ship, game.aliens,
+                        game.bullets)
+    pipeline.start()
+    step_times = pipeline.thread.step_times = []
+    script = Script()
+    clock = pygame.time.Clock()
+    frames = 0
+    start = perf_counter()
+    try:
+        while perf_counter() - start < seconds:
+            clock.tick(ai_settings.max_fps)
+            pipeline.handle_events(script.events(perf_counter() - start))
+            game.render(pipeline.sync())
+            sleep(flip_delay)
+            frames += 1
+    finally:
+        pipeline.stop()
+    return summarize(step_times, frames, perf_counter() - start, game)
+
+
+def summarize(step_times: List[float], frames: int, seconds: float,
+              game: HeadlessGame) -> Dict:
+    intervals = np.diff(step_times) * 1000
+    return {'steps_per_second': len(step_times) / seconds,
+            'frames_per_second': frames / seconds,
+            'interval_p50': float(np.percentile(intervals, 50)),
+            'interval_p99': float(np.percentile(intervals, 99)),
+            'interval_max': float(intervals.max()),
+            'interval_std': float(intervals.std()),
+            'score': game.stats.score}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--flip-delay', type=float, default=20,
+                        help='Milliseconds to sleep after each frame')
+    parser.add_argument('--heavy', action='store_true',
+                        help='Draw 10k+ aliens one blit each at 4K')
+    args = parser.parse_args()
+
+    print('{:<10} {:>8} {:>8} {:>9} {:>9} {:>9} {:>9}'.format(
+        'mode', 'steps/s', 'frames/s', 'p50 ms', 'p99 ms', 'max ms',
+        'std ms'))
+    for name, run in (('serial', run_serial), ('pipelined', run_pipelined)):
+        result = run(build(args.heavy), args.seconds,
+                     args.flip_delay / 1000)
+        print('{:<10} {:>8.1f} {:>8.1f} {:>9.2f} {:>9.2f} {:>9.2f} '
+              '{:>9.2f}'.format(
+                  name, result['steps_per_second'],
+                  result['frames_per_second'], result['interval_p50'],
+                  result['interval_p99'], result['interval_max'],
+                  result['interval_std']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare the surface and texture render backends on the same frames.
+
+Each scenario from the suite is run once per backend, stepping the
+simulation with the suite's scripted player and timing update_screen,
+which builds the draw list and presents it. The surface backend draws
+onto the display and flips; the texture backend draws through the SDL
+renderer SDL picks, which on machines without a GPU (and under the
+dummy video driver) is its software renderer. Frames are not read back
+from the texture backend, as they would not be in play.
+
+Run from the project directory:
+    python -m benchmarks.render_backends [--frames 300]
+    python -m benchmarks.render_backends --scenario bullets_1k
+"""
+import argparse
+from time import perf_counter
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.suite import SCENARIOS, Scenario, percentiles
+from headless import HeadlessGame
+from settings import Settings
+
+BACKENDS = ('surface', 'texture')
+
+
+def build(scenario: Scenario, backend: str) -> HeadlessGame:
+    ai_settings = Settings()
+    for name, value in scenario.settings.items():
+        setattr(ai_settings, name, value)
+    ai_settings.random_seed = 0
+    ai_settings.high_score_file = None
+    ai_settings.render_backend = backend
+    game = HeadlessGame(ai_settings)
+    if backend == 'texture':
+        game.renderer.copy_to_screen = False
+    game.start()
+    scenario.apply_dynamic_settings(game)
+    return game
+
+
+def run(scenario: Scenario, backend: str, frames: int,
+        warmup: int) -> Dict:
+    game = build(scenario, backend)
+    times = []
+    for frame in range(warmup + frames):
+        scenario.drive(game, frame)
+        game.step()
+        start = perf_counter()
+        game.render()
+        if frame >= warmup:
+            times.append(perf_counter() - start)
+    return percentiles(np.array(times))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--warmup', type=int, default=30)
+    parser.add_argument('--scenario', action='append',
+                        choices=[scenario.name for scenario in SCENARIOS],
+                        help='Run only these scenarios (repeatable)')
+    args = parser.parse_args()
+
+    # Rebuilding the fleet every step measures the simulation, not drawing
+    scenarios = [scenario for scenario in SCENARIOS
+                 if (scenario.name in args.scenario if args.scenario
+                     else 'rebuild' not in scenario.name)]
+    print('{:<20} {:<8} {:>9} {:>9} {:>9}'.format(
+        'scenario', 'backend', 'mean ms', 'p50 ms', 'p99 ms'))
+    for scenario in scenarios:
+        for backend in BACKENDS:
+            result = run(scenario, backend, args.frames, args.warmup)
+            print('{:<20} {:<8} {:>9.3f} {:>9.3f} {:>9.3f}'.format(
+                scenario.name, backend, result['mean'], result['p50'],
+                result['p99']))
+
+
+if __name__ == '__main__':
+    main()
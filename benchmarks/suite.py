@@ -0,0 +1,274 @@
+"""
+Headless benchmark suite for the game's real update and render paths.
+
+Each scenario drives a HeadlessGame with a scripted player and times
+game_functions.update_game and update_screen frame by frame. Results
+are written as JSON, which later runs can compare against to flag
+regressions. Scenarios marked stays_dirty also fail the run if the
+dirty renderer falls back to repainting the whole screen during play.
+
+Run from the project directory:
+    python -m benchmarks.suite [--output results.json]
+    python -m benchmarks.suite --baseline results.json
+"""
+import argparse
+import json
+import platform
+import sys
+import tracemalloc
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pygame
+
+import headless
+from headless import HeadlessGame
+from settings import Settings
+
+
+class Scenario():
+    """
+    A named workload. settings are applied before the game is built,
+    dynamic_settings after each new game starts (starting a game resets
+    them) and drive is called before every frame. stays_dirty marks
+    scenarios the dirty renderer should draw without full repaints.
+    """
+
+    def __init__(self, name: str, description: str,
+                 settings: Optional[Dict] = None,
+                 dynamic_settings: Optional[Dict] = None,
+                 drive: Optional[Callable[[HeadlessGame, int], None]] = None,
+                 stays_dirty: bool = False) -> None:
+        self.name = name
+        self.description = description
+        self.settings = settings or {}
+        self.dynamic_settings = dynamic_settings or {}
+        self.drive = drive or autopilot
+        self.stays_dirty = stays_dirty
+
+    def build(self, render_mode: Optional[str]) -> HeadlessGame:
+        ai_settings = Settings()
+        for name, value in self.settings.items():
+            setattr(ai_settings, name, value)
+        # The same bombs every run, for comparable results
+        ai_settings.random_seed = 0
+        if render_mode:
+            ai_settings.render_mode = render_mode
+        game = HeadlessGame(ai_settings)
+        game.start()
+        self.apply_dynamic_settings(game)
+        return game
+
+    def apply_dynamic_settings(self, game: HeadlessGame) -> None:
+        for name, value in self.dynamic_settings.items():
+            value = value(game.ai_settings) if callable(value) else value
+            setattr(game.ai_settings, name, value)
+
+
+def autopilot(game: HeadlessGame, frame: int, shots: int = 1) -> None:
+    """Sweep the ship from side to side, firing as often as allowed"""
+    ship = game.ship
+    ship.moving_left = (frame // 240) % 2 == 1
+    ship.moving_right = not ship.moving_left
+    if frame % 12 == 0 or shots > 1:
+        for _ in range(shots):
+            game.fire()
+
+
+def rebuild_every_frame(game: HeadlessGame, frame: int) -> None:
+    """Destroy the whole fleet so every step starts a new level"""
+    game.aliens.kill(range(game.aliens.size))
+    # Keep the level-up speedup from compounding frame after frame
+    game.ai_settings.initialize_dynamic_settings()
+    autopilot(game, frame)
+
+
+SCENARIOS = [
+    Scenario('default', 'Default fleet and settings', stays_dirty=True),
+    # The composite is only drawn when the whole screen is redrawn
+    Scenario('fleet_10k_4k', '10k+ small aliens on a 3840x2160 screen',
+             settings={'screen_width': 3840, 'screen_height': 2160,
+                       'alien_height': 13, 'render_mode': 'full'}),
+    Scenario('fleet_10k_4k_blits',
+             'fleet_10k_4k drawn one blit per alien, without the composite',
+             settings={'screen_width': 3840, 'screen_height': 2160,
+                       'alien_height': 13, 'render_mode': 'full',
+                       'fleet_composite': False}),
+    Scenario('bullets_1k', 'Up to 1,000 bullets in flight',
+             settings={'bullets_allowed': 1000},
+             drive=lambda game, frame: autopilot(game, frame, shots=5)),
+    Scenario('edge_bounce', 'Fleet bouncing off an edge every step',
+             settings={'fleet_drop_speed': 0},
+             dynamic_settings={'alien_speed_factor': lambda ai_settings:
+                               60 * ai_settings.simulation_rate}),
+    Scenario('fleet_rebuild', 'A new fleet built on every step',
+             drive=rebuild_every_frame),
+    Scenario('fleet_rebuild_4k', 'A new 10k+ alien fleet on every step',
+             settings={'screen_width': 3840, 'screen_height': 2160,
+                       'alien_height': 13},
+             drive=rebuild_every_frame),
+]
+
+
+def percentiles(times: np.ndarray) -> Dict[str, float]:
+    milliseconds = times * 1000
+    return {'mean': float(milliseconds.mean()),
+            'p50': float(np.percentile(milliseconds, 50)),
+            'p99': float(np.percentile(milliseconds, 99)),
+            'max': float(milliseconds.max())}
+
+
+def run_scenario(scenario: Scenario, frames: int, warmup: int,
+                 alloc_frames: int, render_mode: Optional[str]) -> Dict:
+    game = scenario.build(render_mode)
+    ships_left = game.stats.ships_left
+
+    def frame(number: int) -> None:
+        scenario.drive(game, number)
+        game.step()
+        if not game.stats.game_active:
+            # Keep the workload going if the scripted player loses
+            game.start()
+            scenario.apply_dynamic_settings(game)
+
+    for number in range(warmup):
+        frame(number)
+        game.render()
+
+    # Only the dirty renderer counts its full repaints
+    full_frames = getattr(game.renderer, 'full_frames', 0)
+    update_times = np.zeros(frames)
+    render_times = np.zeros(frames)
+    for number in range(frames):
+        start = perf_counter()
+        frame(warmup + number)
+        middle = perf_counter()
+        game.render()
+        update_times[number] = middle - start
+        render_times[number] = perf_counter() - middle
+    full_repaints = getattr(game.renderer, 'full_frames', 0) - full_frames
+
+    # Allocations are measured separately; tracemalloc slows every call
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    baseline_memory, _ = tracemalloc.get_traced_memory()
+    for number in range(alloc_frames):
+        frame(warmup + frames + number)
+        game.render()
+    _, peak_memory = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocations = after.compare_to(before, 'filename')
+    allocated = sum(stat.size_diff for stat in allocations
+                    if stat.size_diff > 0)
+
+    frame_times = update_times + render_times
+    return {
+        'description': scenario.description,
+        'frames': frames,
+        'aliens': len(game.aliens),
+        'bullets': len(game.bullets),
+        'ships_lost': ships_left - game.stats.ships_left,
+        'full_repaints': full_repaints,
+        'update_ms': percentiles(update_times),
+        'render_ms': percentiles(render_times),
+        'frame_ms': percentiles(frame_times),
+        'frames_per_second': float(frames / frame_times.sum()),
+        'alloc_peak_kb': (peak_memory - baseline_memory) / 1024,
+        'alloc_retained_kb_per_frame': allocated / 1024 / max(alloc_frames,
+                                                              1),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Return a line for every scenario slower than baseline"""
+    regressions = []
+    for name, result in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous is None:
+            continue
+        for statistic in ('mean', 'p50'):
+            now = result['frame_ms'][statistic]
+            before = previous['frame_ms'][statistic]
+            if before > 0 and now > before * (1 + threshold):
+                regressions.append(
+                    '{}: frame {} {:.3f} ms -> {:.3f} ms (+{:.0%})'.format(
+                        name, statistic, before, now, now / before - 1))
+    return regressions
+
+
+def check_dirty(scenario: Scenario, result: Dict) -> List[str]:
+    """A line if a stays_dirty scenario was repainted in full"""
+    if not scenario.stays_dirty or not result['full_repaints']:
+        return []
+    return ['{}: {} of {} frames repainted the whole screen under the '
+            'dirty renderer'.format(scenario.name, result['full_repaints'],
+                                    result['frames'])]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description='Headless benchmark suite for Alien Invaders')
+    parser.add_argument('--scenario', action='append',
+                        choices=[scenario.name for scenario in SCENARIOS],
+                        help='Run only these scenarios (repeatable)')
+    parser.add_argument('--frames', type=int, default=600)
+    parser.add_argument('--warmup', type=int, default=60)
+    parser.add_argument('--alloc-frames', type=int, default=60)
+    parser.add_argument('--render-mode', choices=['full', 'dirty'])
+    parser.add_argument('--output', help='Write results to this JSON file')
+    parser.add_argument('--baseline',
+                        help='Compare against a previous results file')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='Slowdown that counts as a regression')
+    args = parser.parse_args(argv)
+
+    headless.init()
+    results = {
+        'meta': {'python': platform.python_version(),
+                 'pygame': pygame.version.ver,
+                 'numpy': np.__version__,
+                 'platform': platform.platform(),
+                 'render_mode': args.render_mode or Settings().render_mode},
+        'scenarios': {},
+    }
+    failures = []
+    print('{:<14} {:>9} {:>9} {:>9} {:>9} {:>10} {:>10}'.format(
+        'scenario', 'update', 'render', 'p50', 'p99', 'frames/s',
+        'peak KiB'))
+    for scenario in SCENARIOS:
+        if args.scenario and scenario.name not in args.scenario:
+            continue
+        result = run_scenario(scenario, args.frames, args.warmup,
+                              args.alloc_frames, args.render_mode)
+        results['scenarios'][scenario.name] = result
+        failures.extend(check_dirty(scenario, result))
+        print('{:<14} {:>9.3f} {:>9.3f} {:>9.3f} {:>9.3f} {:>10.0f} '
+              '{:>10.1f}'.format(
+                  scenario.name, result['update_ms']['mean'],
+                  result['render_ms']['mean'], result['frame_ms']['p50'],
+                  result['frame_ms']['p99'], result['frames_per_second'],
+                  result['alloc_peak_kb']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=1)
+
+    for failure in failures:
+        print('FULL REPAINTS', failure)
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file),
+                                  args.threshold)
+        for regression in regressions:
+            print('REGRESSION', regression)
+        if regressions:
+            return 1
+        print('No regressions against', args.baseline)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
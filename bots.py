@@ -0,0 +1,36 @@
+"""
+Scripted players for games driven without a human: sweeps, netplay's
+headless clients, and anything else that steps a Simulation or a game
+mirroring one. They only read the game's bodies and set the ship's
+controls, so they never touch pygame.
+"""
+import numpy as np
+
+
+def autopilot(game) -> None:
+    """
+    A simple player: keep under the nearest front-line alien, fire
+    whenever it can, and sidestep bombs falling towards the ship
+    """
+    ship = game.ship
+    aliens = game.aliens
+    target = ship.centerx
+
+    columns = np.flatnonzero(aliens.front >= 0)
+    if len(columns):
+        fronts = aliens.front[columns]
+        centers = aliens.x[fronts] + aliens.width / 2
+        target = centers[np.argmin(np.abs(centers - ship.centerx))]
+
+    for bomb in aliens.bombs:
+        if (abs(bomb.centerx - ship.centerx) < 1.5 * ship.width
+                and bomb.bottom > ship.top - 200):
+            # Run for whichever side of the bomb is further from it
+            target = (ship.centerx + 3 * ship.width
+                      if bomb.centerx < ship.centerx
+                      else ship.centerx - 3 * ship.width)
+            break
+
+    ship.moving_left = target < ship.centerx - 4
+    ship.moving_right = target > ship.centerx + 4
+    game.fire()
@@ -1,34 +1,65 @@
-import pygame
-import pygame.draw
-from pygame.sprite import Sprite
+from typing import Optional, Type
+
+from pygame.rect import Rect
 from pygame.surface import Surface
 
 from settings import Settings
-from ship import Ship
+from simulation import (FallingProjectile, Projectile, ProjectilePool,
+                        World)
+
+
+class Bullet(Projectile):
+    """
+    A bullet fired from the ship, as the game draws it: a Projectile
+    with a color, and a rect built from its position
+    """
 
+    __slots__ = ('screen', 'color')
 
-class Bullet(Sprite):
-    def __init__(self, ai_settings: Settings,
-                 screen: Surface, ship: Ship) -> None:
-        super(Bullet, self).__init__()
+    def __init__(self, ai_settings: Settings, screen: Surface,
+                 pool: Optional['BulletPool'] = None) -> None:
+        super(Bullet, self).__init__(ai_settings, pool)
         self.screen = screen
+        self.color = ai_settings.bullet_color
 
-        self.rect = pygame.Rect(
-            0, 0,
-            ai_settings.bullet_width,
-            ai_settings.bullet_height)
-        self.rect.centerx = ship.rect.centerx
-        self.rect.top = ship.rect.top
+    @property
+    def rect(self) -> Rect:
+        return Rect(self.left, self.top, self.width, self.height)
 
-        # Store position separately as a float value
-        self.y = float(self.rect.y)
+    def interpolated_rect(self, alpha: float) -> Rect:
+        """Rect for drawing alpha of the way through the last step"""
+        rect = self.rect
+        rect.y = self.previous_y + (self.y - self.previous_y) * alpha
+        return rect
+
+    def draw_list(self, alpha: float = 1.0) -> list:
+        return [(self.color, self.interpolated_rect(alpha))]
 
-        self.color = ai_settings.bullet_color
-        self.speed_factor = ai_settings.bullet_speed_factor
 
-    def update(self) -> None:
-        self.y -= self.speed_factor
-        self.rect.y = self.y
+class Bomb(Bullet, FallingProjectile):
+    """A bomb dropped by an alien, drawn as a Bullet is"""
+
+    __slots__ = ()
+
+    def __init__(self, ai_settings: Settings, screen: Surface,
+                 pool: Optional['BulletPool'] = None) -> None:
+        super(Bomb, self).__init__(ai_settings, screen, pool)
+        self.color = ai_settings.bomb_color
+
+
+class BulletPool(ProjectilePool):
+    """
+    A ProjectilePool of Bullets, or of Bombs as the fleet keeps, which
+    can be drawn
+    """
+
+    def __init__(self, ai_settings: Settings, screen: Surface,
+                 capacity: Optional[int] = None,
+                 kind: Type[Bullet] = Bullet) -> None:
+        self.screen = screen
+        super(BulletPool, self).__init__(ai_settings,
+                                         World(*screen.get_size()),
+                                         capacity, kind)
 
-    def draw_bullet(self) -> None:
-        pygame.draw.rect(self.screen, self.color, self.rect)
+    def _make(self) -> Bullet:
+        return self.kind(self.ai_settings, self.screen, pool=self)
@@ -1,7 +1,7 @@
-import pygame.font
 from pygame.rect import Rect
 from pygame.surface import Surface
 
+from glyph_atlas import get_atlas, get_font
 from settings import Settings
 
 
@@ -15,7 +15,7 @@ class Button():
         self.width, self.height = 200, 50
         self.button_color = (0, 255, 0)
         self.text_color = (255, 255, 255)
-        self.font = pygame.font.SysFont(None, 48)
+        self.font = get_font(48, ai_settings.font_file)
 
         self.rect = Rect(0, 0, self.width, self.height)
         self.rect.center = self.screen_rect.center
@@ -24,11 +24,12 @@ class Button():
 
     def prep_msg(self, msg: str):
         """Trun msg into a rendered image and center text on the button"""
-        self.msg_img = self.font.render(msg, True, self.text_color,
-                                        self.button_color)
+        atlas = get_atlas(self.font, self.text_color, self.button_color)
+        self.msg_img = atlas.render(msg)
         self.msg_image_rect = self.msg_img.get_rect()
         self.msg_image_rect.center = self.rect.center
 
-    def draw_button(self):
-        self.screen.fill(self.button_color, self.rect)
-        self.screen.blit(self.msg_img, self.msg_image_rect)
+    def draw_list(self) -> list:
+        """The button as (source, rect) pairs for a renderer"""
+        return [(self.button_color, self.rect),
+                (self.msg_img, self.msg_image_rect)]
@@ -0,0 +1,229 @@
+"""
+Capture rendered frames to disk without stalling the game loop.
+
+Each captured frame costs the game loop one contiguous copy of the
+screen's pixels into a preallocated buffer, taken through a
+pygame.surfarray view of the surface. A writer thread converts the
+buffers to RGB and encodes them, as a PNG sequence, a YUV4MPEG2 (.y4m)
+stream or raw RGB24 video. When the writer falls behind and every
+buffer is queued, frames are dropped rather than waited for.
+
+Output runs at a constant frame rate, the one a .y4m stream's header
+states, kept to the wall clock: a frame is repeated for as many output
+frames as pass before the next is captured, so screens drawn at
+idle_fps, and gaps left by dropped frames, play back at their real
+speed, and frames drawn faster than the output rate are skipped.
+
+A raw stream plays back with, for example:
+    ffplay -f rawvideo -pixel_format rgb24 -video_size 1200x800 out.rgb
+"""
+import os
+import queue
+import struct
+import sys
+import threading
+import zlib
+from time import perf_counter
+from typing import Optional
+
+import numpy as np
+import pygame.surfarray
+from pygame.surface import Surface
+
+from settings import Settings
+
+FORMATS = ('png', 'y4m', 'raw')
+
+
+def format_for(filename: str) -> str:
+    """Pick a capture format from a filename's extension"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.y4m':
+        return 'y4m'
+    elif extension in ('.raw', '.rgb'):
+        return 'raw'
+    # Anything else names a directory of numbered PNGs
+    return 'png'
+
+
+class FrameCapture():
+    """
+    Capture screen to filename at rate frames a second, max_fps (or
+    simulation_rate) over capture_every. capture_queue_size buffers are
+    shared between the game loop and the writer thread; frames,
+    captured and dropped count what happened to the frames offered,
+    and written the output frames, repeats included.
+    """
+
+    def __init__(self, filename: str, ai_settings: Settings,
+                 screen: Surface) -> None:
+        self.filename = filename
+        self.format = ai_settings.capture_format or format_for(filename)
+        if self.format not in FORMATS:
+            raise ValueError('Unknown capture format {!r}, expected one of {}'
+                             .format(self.format, ', '.join(FORMATS)))
+        self.every = ai_settings.capture_every
+        self.width, self.height = screen.get_size()
+        rate = ai_settings.max_fps or ai_settings.simulation_rate
+        self.rate = max(1, round(rate / self.every))
+
+        # 32-bit surfaces are copied as whole pixels through pixels2d,
+        # transposed so the copy runs along memory. Anything else goes
+        # through pixels3d, which is a slower, strided copy.
+        self.packed = screen.get_bytesize() == 4
+        if self.packed:
+            shape, dtype = (self.height, self.width), np.uint32
+            # Which byte of each packed pixel holds red, green and blue
+            self.channels = [self._byte_index(shift)
+                             for shift in screen.get_shifts()[:3]]
+        else:
+            shape, dtype = (self.width, self.height, 3), np.uint8
+        size = max(1, ai_settings.capture_queue_size)
+        self.free: queue.Queue = queue.Queue(size)
+        for _ in range(size):
+            self.free.put(np.empty(shape, dtype))
+        self.pending: queue.Queue = queue.Queue(size)
+
+        self.frames = self.captured = self.dropped = self.written = 0
+        # Output frames due so far, counted from the first capture
+        self.slots = 0
+        self.start: Optional[float] = None
+        self.error: Optional[BaseException] = None
+
+        if self.format == 'png':
+            os.makedirs(filename, exist_ok=True)
+            self.output = None
+        else:
+            self.output = open(filename, 'wb')
+            if self.format == 'y4m':
+                # Tagged full range, as rgb_to_yuv444 writes it; readers
+                # otherwise take it as limited range
+                self.output.write('YUV4MPEG2 W{} H{} F{}:1 Ip A1:1 C444 '
+                                  'XCOLORRANGE=FULL\n'
+                                  .format(self.width, self.height,
+                                          self.rate).encode('ascii'))
+        self.writer = threading.Thread(target=self._write_frames,
+                                       name='frame-capture', daemon=True)
+        self.writer.start()
+
+    @staticmethod
+    def _byte_index(shift: int) -> int:
+        index = shift // 8
+        return index if sys.byteorder == 'little' else 3 - index
+
+    def capture(self, screen: Surface) -> bool:
+        """
+        Queue a copy of screen for writing, to fill every output frame
+        due since the last capture. Return False when no output frame
+        has come due yet, or the frame was dropped for lack of a buffer.
+        """
+        self.frames += 1
+        now = perf_counter()
+        if self.start is None:
+            self.start = now
+        # Rounded, so frames paced at the rate survive half a frame of
+        # jitter either way
+        due = int((now - self.start) * self.rate + 0.5) + 1
+        if due <= self.slots:
+            return False
+        try:
+            buffer = self.free.get_nowait()
+        except queue.Empty:
+            # The next frame captured fills the missed output frames
+            self.dropped += 1
+            return False
+
+        if self.packed:
+            pixels = pygame.surfarray.pixels2d(screen)
+            np.copyto(buffer, pixels.T)
+        else:
+            pixels = pygame.surfarray.pixels3d(screen)
+            np.copyto(buffer, pixels)
+        # Release the view, unlocking the surface
+        del pixels
+        self.pending.put_nowait((self.slots, due - self.slots, buffer))
+        self.slots = due
+        self.captured += 1
+        return True
+
+    def close(self) -> None:
+        """Write out the queued frames and stop the writer"""
+        self.pending.put(None)
+        self.writer.join()
+        if self.output is not None:
+            self.output.close()
+        if self.error is not None:
+            raise self.error
+
+    def _write_frames(self) -> None:
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            number, repeats, buffer = item
+            try:
+                if self.error is None:
+                    self._write(number, repeats, self._rgb(buffer))
+                    self.written += repeats
+            except Exception as error:
+                # Keep recycling buffers; close() reports the error
+                self.error = error
+            finally:
+                self.free.put(buffer)
+
+    def _rgb(self, buffer: np.ndarray) -> np.ndarray:
+        """A (height, width, 3) RGB array of a captured buffer"""
+        if self.packed:
+            pixels = buffer.view(np.uint8).reshape(self.height,
+                                                   self.width, 4)
+            return pixels[..., self.channels]
+        return buffer.transpose(1, 0, 2)
+
+    def _write(self, number: int, repeats: int, rgb: np.ndarray) -> None:
+        """Write rgb as output frames number to number + repeats - 1"""
+        # Each frame is encoded once, however often it is written
+        if self.format == 'png':
+            data = encode_png(rgb)
+            for frame in range(number, number + repeats):
+                with open(os.path.join(self.filename, 'frame_{:06d}.png'
+                                       .format(frame)), 'wb') as image:
+                    image.write(data)
+            return
+        elif self.format == 'y4m':
+            data = b'FRAME\n' + rgb_to_yuv444(rgb).tobytes()
+        else:
+            data = np.ascontiguousarray(rgb).tobytes()
+        for _ in range(repeats):
+            self.output.write(data)
+
+
+def rgb_to_yuv444(rgb: np.ndarray) -> np.ndarray:
+    """Full-range BT.601 Y, U and V planes, stacked, of an RGB frame"""
+    r, g, b = (rgb[..., channel].astype(np.int32) for channel in range(3))
+    planes = np.empty((3,) + rgb.shape[:2], np.int32)
+    planes[0] = (77 * r + 150 * g + 29 * b + 128) >> 8
+    planes[1] = ((-43 * r - 85 * g + 128 * b + 128) >> 8) + 128
+    planes[2] = ((128 * r - 107 * g - 21 * b + 128) >> 8) + 128
+    return np.clip(planes, 0, 255).astype(np.uint8)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return (struct.pack('>I', len(data)) + kind + data
+            + struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+
+def encode_png(rgb: np.ndarray) -> bytes:
+    """
+    Encode an RGB frame as a PNG. Done here rather than with
+    pygame.image.save because zlib lets go of the GIL while it
+    compresses, so the game loop keeps running meanwhile.
+    """
+    height, width = rgb.shape[:2]
+    # Every scanline starts with its filter type, 0 for none
+    rows = np.zeros((height, 1 + 3 * width), np.uint8)
+    rows[:, 1:] = rgb.reshape(height, 3 * width)
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return b''.join((b'\x89PNG\r\n\x1a\n',
+                     _png_chunk(b'IHDR', header),
+                     _png_chunk(b'IDAT', zlib.compress(rows.tobytes(), 1)),
+                     _png_chunk(b'IEND', b'')))
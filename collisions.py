@@ -0,0 +1,249 @@
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+
+class LatticeIndex():
+    """
+    Broadphase for sprites laid out on a regular lattice that moves as a
+    block, such as the alien fleet. Cell (column, row) sits at
+    origin + (column * pitch_x, row * pitch_y), so the cells a rect can
+    touch follow directly from its position relative to the origin.
+    """
+
+    def __init__(self, width: int, height: int,
+                 pitch_x: int, pitch_y: int) -> None:
+        self.width = width
+        self.height = height
+        self.pitch_x = pitch_x
+        self.pitch_y = pitch_y
+        self.grid = np.full((0, 0), -1, dtype=np.int64)
+
+    def build(self, columns: np.ndarray, rows: np.ndarray,
+              indexes: np.ndarray) -> None:
+        """Map each (column, row) cell to the index stored there"""
+        shape = ((int(rows.max()) + 1, int(columns.max()) + 1)
+                 if len(indexes) else (0, 0))
+        self.grid = np.full(shape, -1, dtype=np.int64)
+        self.grid[rows, columns] = indexes
+
+    def query(self, origin_x: float, origin_y: float,
+              lefts: np.ndarray, tops: np.ndarray,
+              rights: np.ndarray, bottoms: np.ndarray
+              ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (rect, index) candidate pairs for the given rects, in rect
+        order. Candidates still need an exact overlap test; rects are
+        widened by a pixel so float drift never hides a real hit.
+        """
+        number_rows, number_columns = self.grid.shape
+        empty = np.zeros(0, dtype=np.int64)
+        if not len(lefts) or not number_rows:
+            return empty, empty
+
+        # A cell c overlaps [left, right) when
+        # left < origin + c * pitch + width and right > origin + c * pitch
+        first_column = np.floor(
+            (lefts - 1 - origin_x - self.width) / self.pitch_x) + 1
+        last_column = np.ceil((rights + 1 - origin_x) / self.pitch_x) - 1
+        first_row = np.floor(
+            (tops - 1 - origin_y - self.height) / self.pitch_y) + 1
+        last_row = np.ceil((bottoms + 1 - origin_y) / self.pitch_y) - 1
+
+        first_column = np.clip(first_column, 0,
+                               number_columns).astype(np.int64)
+        last_column = np.clip(last_column, -1,
+                              number_columns - 1).astype(np.int64)
+        first_row = np.clip(first_row, 0, number_rows).astype(np.int64)
+        last_row = np.clip(last_row, -1, number_rows - 1).astype(np.int64)
+
+        span_columns = np.maximum(last_column - first_column + 1, 0)
+        span_rows = np.maximum(last_row - first_row + 1, 0)
+        counts = span_columns * span_rows
+        total = int(counts.sum())
+        if not total:
+            return empty, empty
+
+        # Expand every rect into the cells of its candidate block
+        rects = np.repeat(np.arange(len(lefts)), counts)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        offsets = np.arange(total) - starts
+        widths = span_columns[rects]
+        columns = first_column[rects] + offsets % widths
+        rows = first_row[rects] + offsets // widths
+
+        indexes = self.grid[rows, columns]
+        occupied = indexes >= 0
+        return rects[occupied], indexes[occupied]
+
+    def query_rect(self, origin_x: float, origin_y: float,
+                   left: int, top: int, right: int, bottom: int
+                   ) -> List[int]:
+        """
+        Candidate indexes for a single rect. Plain Python arithmetic
+        beats NumPy's per-call overhead when there is only one rect.
+        """
+        number_rows, number_columns = self.grid.shape
+        first_column = max(0, math.floor(
+            (left - 1 - origin_x - self.width) / self.pitch_x) + 1)
+        last_column = min(number_columns - 1, math.ceil(
+            (right + 1 - origin_x) / self.pitch_x) - 1)
+        first_row = max(0, math.floor(
+            (top - 1 - origin_y - self.height) / self.pitch_y) + 1)
+        last_row = min(number_rows - 1, math.ceil(
+            (bottom + 1 - origin_y) / self.pitch_y) - 1)
+
+        item = self.grid.item
+        candidates = []
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                index = item(row, column)
+                if index >= 0:
+                    candidates.append(index)
+        return candidates
+
+
+def shape_sums(shape: np.ndarray) -> np.ndarray:
+    """
+    Summed-area table of a shape, a boolean array of opaque pixels
+    indexed [y, x]: entry [y, x] counts the set pixels above and left
+    of (x, y). Any rect can then be tested against the shape with four
+    lookups, however many pixels it covers.
+    """
+    height, width = shape.shape
+    sums = np.zeros((height + 1, width + 1), dtype=np.int32)
+    sums[1:, 1:] = shape.cumsum(axis=0).cumsum(axis=1)
+    return sums
+
+
+def pack_shape(shape: np.ndarray, stride: int) -> int:
+    """A shape's set pixels as one integer, row y starting at bit y * stride"""
+    height, width = shape.shape
+    rows = np.zeros((height, stride), dtype=bool)
+    rows[:, :width] = shape
+    return int.from_bytes(np.packbits(rows, bitorder='little').tobytes(),
+                          'little')
+
+
+class ShapeOverlap():
+    """
+    Tests whether two shapes share a set pixel, as Mask.overlap tests
+    masks. Both are packed into integers with rows far enough apart
+    for the shapes to sit side by side, so placing other is a shift
+    and the test a single AND, not slicing and comparing arrays.
+    """
+
+    def __init__(self, shape: np.ndarray, other: np.ndarray) -> None:
+        self.stride = shape.shape[1] + other.shape[1]
+        self.bits = pack_shape(shape, self.stride)
+        self.other_bits = pack_shape(other, self.stride)
+
+    def overlap(self, dx: int, dy: int) -> bool:
+        """
+        With other's top-left at (dx, dy) relative to shape's. Their
+        bounds must overlap, or columns would wrap between rows.
+        """
+        shift = dy * self.stride + dx
+        if shift >= 0:
+            return bool(self.bits & (self.other_bits << shift))
+        return bool((self.bits << -shift) & self.other_bits)
+
+
+def rects_touch_mask(sums: np.ndarray, lefts: np.ndarray, tops: np.ndarray,
+                     rights: np.ndarray, bottoms: np.ndarray) -> np.ndarray:
+    """
+    Which solid rects, given relative to a mask's top-left corner,
+    cover at least one of its set pixels. Every rect must overlap the
+    mask's bounds, as those that passed a rect test do, so each edge
+    only needs clamping on one side.
+    """
+    height, width = sums.shape[0] - 1, sums.shape[1] - 1
+    # np.clip costs several times more than these on small arrays
+    lefts = np.maximum(lefts, 0)
+    rights = np.minimum(rights, width)
+    tops = np.maximum(tops, 0)
+    bottoms = np.minimum(bottoms, height)
+    counts = (sums[bottoms, rights] - sums[tops, rights]
+              - sums[bottoms, lefts] + sums[tops, lefts])
+    return counts > 0
+
+
+def rect_touches_mask(sums: np.ndarray, left: int, top: int, right: int,
+                      bottom: int) -> bool:
+    """
+    rects_touch_mask for one rect, in plain Python: for a handful of
+    rects NumPy's overhead per call costs more than the test itself
+    """
+    left = max(left, 0)
+    right = min(right, sums.shape[1] - 1)
+    top = max(top, 0)
+    bottom = min(bottom, sums.shape[0] - 1)
+    return (sums.item(bottom, right) - sums.item(top, right)
+            - sums.item(bottom, left) + sums.item(top, left)) > 0
+
+
+class SpatialHash():
+    """
+    Uniform grid of buckets for sprites that move freely. Each item is
+    filed under every cell its rect touches.
+    """
+
+    def __init__(self, cell_size: int) -> None:
+        self.cell_size = cell_size
+        self.buckets: Dict[Tuple[int, int], List] = defaultdict(list)
+
+    def _cells(self, rect) -> Iterable[Tuple[int, int]]:
+        left, top, width, height = rect
+        size = self.cell_size
+        for cell_x in range(left // size, (left + max(width, 1) - 1)
+                            // size + 1):
+            for cell_y in range(top // size, (top + max(height, 1) - 1)
+                                // size + 1):
+                yield cell_x, cell_y
+
+    def insert(self, item, rect) -> None:
+        for cell in self._cells(rect):
+            self.buckets[cell].append(item)
+
+    def query(self, rect) -> List:
+        """Return the distinct items sharing a cell with rect"""
+        found = {}
+        for cell in self._cells(rect):
+            for item in self.buckets.get(cell, ()):
+                found[id(item)] = item
+        return list(found.values())
+
+
+def spatial_groupcollide(groupa, groupb, dokilla: bool, dokillb: bool,
+                         cell_size: int = 64) -> Dict[object, List]:
+    """
+    Equivalent of pygame.sprite.groupcollide using a spatial hash over
+    groupb, so each sprite in groupa is only tested against its
+    neighbours instead of every sprite in groupb.
+    """
+    spatial_hash = SpatialHash(cell_size)
+    order = {}
+    for sprite in groupb.sprites():
+        order[id(sprite)] = len(order)
+        spatial_hash.insert(sprite, sprite.rect)
+
+    collisions = {}
+    killed = set()
+    for sprite in groupa.sprites():
+        hits = [other for other in spatial_hash.query(sprite.rect)
+                if id(other) not in killed
+                and sprite.rect.colliderect(other.rect)]
+        if not hits:
+            continue
+        # Report hits in groupb order, as groupcollide does
+        hits.sort(key=lambda other: order[id(other)])
+        collisions[sprite] = hits
+        if dokilla:
+            sprite.kill()
+        if dokillb:
+            for other in hits:
+                killed.add(id(other))
+                other.kill()
+    return collisions
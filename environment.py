@@ -0,0 +1,334 @@
+"""
+Gym-style environments for training agents on the game.
+
+AlienInvadersEnv wraps one game behind reset() and step(action): a
+Simulation, which draws nothing, for state observations, or a headless
+game for pixels. VecEnv runs many of them in batch across a pool of
+worker processes. Each worker steps its share of the instances and
+writes observations, rewards and done flags straight into shared
+memory, so a batch step costs one small message per worker.
+"""
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pygame
+import pygame.surfarray
+import pygame.transform
+
+from headless import HeadlessGame
+from settings import Settings
+from simulation import Simulation
+
+# Discrete actions: which way to move, and whether to fire
+ACTIONS = ('noop', 'left', 'right', 'fire', 'left_fire', 'right_fire')
+NOOP, LEFT, RIGHT, FIRE, LEFT_FIRE, RIGHT_FIRE = range(len(ACTIONS))
+
+# Leading entries of a state observation, before bullets, bombs and the
+# fleet
+STATE_FIELDS = ('ship_x', 'fleet_x', 'fleet_y', 'fleet_direction',
+                'alien_speed', 'ships_left', 'level', 'respawning')
+
+
+class AlienInvadersEnv():
+    """
+    One game instance. Observations are either a compact state
+    vector ('state') or a downsampled greyscale frame ('pixels').
+    Rewards are the change in stats.score; an episode is done when the
+    game is over, or after max_steps actions.
+    """
+
+    def __init__(self, settings: Optional[Dict] = None,
+                 observation: str = 'state', frame_skip: int = 4,
+                 pixel_scale: int = 8,
+                 max_steps: Optional[int] = None) -> None:
+        ai_settings = Settings()
+        for name, value in (settings or {}).items():
+            setattr(ai_settings, name, value)
+        if observation == 'pixels' or ai_settings.collision_mode == 'mask':
+            # Only pixel observations are drawn, and never need to skip
+            # unchanged frames; 'mask' collisions need decoded images
+            ai_settings.render_mode = 'full'
+            self.game = HeadlessGame(ai_settings, display=False)
+        else:
+            self.game = Simulation(ai_settings)
+        self.observation = observation
+        self.frame_skip = frame_skip
+        self.max_steps = max_steps
+        self.steps = 0
+
+        width = ai_settings.screen_width
+        height = ai_settings.screen_height
+        if observation == 'pixels':
+            self.small = pygame.Surface((width // pixel_scale,
+                                         height // pixel_scale))
+            self.observation_shape = (height // pixel_scale,
+                                      width // pixel_scale)
+            self.observation_dtype = np.dtype(np.uint8)
+        elif observation == 'state':
+            aliens = self.game.aliens
+            self.grid_shape = (int(aliens.row[:aliens.size].max()) + 1,
+                               int(aliens.column[:aliens.size].max()) + 1)
+            self.max_bullets = ai_settings.bullets_allowed
+            self.max_bombs = ai_settings.bombs_allowed
+            self.observation_shape = (len(STATE_FIELDS)
+                                      + 2 * self.max_bullets
+                                      + 2 * self.max_bombs
+                                      + self.grid_shape[0]
+                                      * self.grid_shape[1],)
+            self.observation_dtype = np.dtype(np.float32)
+        else:
+            raise ValueError("observation must be 'state' or 'pixels', "
+                             "not {!r}".format(observation))
+
+    def reset(self) -> np.ndarray:
+        self.game.stats.game_active = False
+        self.game.start()
+        self.steps = 0
+        return self.observe()
+
+    def step(self, action: int) -> Tuple[np.ndarray, float, bool, Dict]:
+        game = self.game
+        ship = game.ship
+        ship.moving_left = action in (LEFT, LEFT_FIRE)
+        ship.moving_right = action in (RIGHT, RIGHT_FIRE)
+        if action in (FIRE, LEFT_FIRE, RIGHT_FIRE):
+            game.fire()
+
+        score = game.stats.score
+        for _ in range(self.frame_skip):
+            game.step()
+            if not game.stats.game_active:
+                break
+        self.steps += 1
+
+        reward = float(game.stats.score - score)
+        truncated = (self.max_steps is not None
+                     and self.steps >= self.max_steps)
+        done = not game.stats.game_active or truncated
+        info = {'score': game.stats.score, 'level': game.stats.level,
+                'truncated': truncated}
+        return self.observe(), reward, done, info
+
+    def observe(self, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Write the current observation into out, or a new array"""
+        if out is None:
+            out = np.empty(self.observation_shape, self.observation_dtype)
+        if self.observation == 'pixels':
+            self._observe_pixels(out)
+        else:
+            self._observe_state(out)
+        return out
+
+    def _observe_pixels(self, out: np.ndarray) -> None:
+        self.game.render()
+        pygame.transform.scale(self.game.screen, self.small.get_size(),
+                               self.small)
+        rgb = pygame.surfarray.pixels3d(self.small)
+        # surfarray is indexed [x, y]; observations are [row, column]
+        out[...] = np.dot(rgb, (0.299, 0.587, 0.114)).T
+        del rgb
+
+    def _observe_state(self, out: np.ndarray) -> None:
+        game = self.game
+        ai_settings = game.ai_settings
+        width = ai_settings.screen_width
+        height = ai_settings.screen_height
+        aliens = game.aliens
+
+        origin_x, origin_y = aliens.origin() if aliens.size else (0.0, 0.0)
+        out[:len(STATE_FIELDS)] = (
+            game.ship.center / width, origin_x / width, origin_y / height,
+            ai_settings.fleet_direction,
+            ai_settings.alien_speed_factor / width,
+            game.stats.ships_left / ai_settings.ship_limit,
+            game.stats.level, game.stats.respawning)
+
+        start = len(STATE_FIELDS)
+        for pool, limit in ((game.bullets, self.max_bullets),
+                            (aliens.bombs, self.max_bombs)):
+            positions = out[start:start + 2 * limit]
+            positions[:] = -1.0
+            for slot, projectile in zip(range(limit), pool):
+                positions[2 * slot] = projectile.centerx / width
+                positions[2 * slot + 1] = projectile.y / height
+            start += 2 * limit
+
+        grid = out[start:].reshape(self.grid_shape)
+        grid[:] = 0.0
+        alive = aliens.alive[:aliens.size]
+        rows = aliens.row[:aliens.size][alive]
+        columns = aliens.column[:aliens.size][alive]
+        inside = (rows < self.grid_shape[0]) & (columns < self.grid_shape[1])
+        grid[rows[inside], columns[inside]] = 1.0
+
+
+def _worker(connection, names: Dict[str, str], start: int, stop: int,
+            num_envs: int, shape: Tuple[int, ...], dtype: str,
+            env_kwargs: Dict) -> None:
+    """Step environments [start, stop) on commands from VecEnv"""
+    buffers = {name: shared_memory.SharedMemory(name=shm_name)
+               for name, shm_name in names.items()}
+    observations = np.ndarray((num_envs,) + shape, dtype,
+                              buffer=buffers['observations'].buf)
+    rewards = np.ndarray(num_envs, np.float64, buffer=buffers['rewards'].buf)
+    dones = np.ndarray(num_envs, np.bool_, buffer=buffers['dones'].buf)
+
+    envs = [AlienInvadersEnv(**env_kwargs) for _ in range(start, stop)]
+    try:
+        while True:
+            command, actions = connection.recv()
+            if command == 'reset':
+                for index, env in enumerate(envs, start):
+                    env.reset()
+                    env.observe(observations[index])
+                connection.send(None)
+            elif command == 'step':
+                infos = []
+                for index, (env, action) in enumerate(zip(envs, actions),
+                                                      start):
+                    _, reward, done, info = env.step(action)
+                    if done:
+                        # Start the next episode straight away
+                        info['final_score'] = info['score']
+                        env.reset()
+                    env.observe(observations[index])
+                    rewards[index] = reward
+                    dones[index] = done
+                    infos.append(info)
+                connection.send(infos)
+            elif command == 'close':
+                break
+    finally:
+        del observations, rewards, dones
+        for buffer in buffers.values():
+            buffer.close()
+        connection.close()
+
+
+class VecEnv():
+    """
+    num_envs independent games stepped in batch. Instances are split
+    across num_workers processes (0 steps them in this process). Finished
+    episodes reset automatically, with the last score in the step's
+    info as 'final_score'.
+
+    The observation array returned by reset() and step() is a view of
+    shared memory that the next call overwrites; copy it to keep it.
+    """
+
+    def __init__(self, num_envs: int, num_workers: Optional[int] = None,
+                 **env_kwargs) -> None:
+        self.num_envs = num_envs
+        if num_workers is None:
+            num_workers = min(num_envs, os.cpu_count() or 1)
+        self.num_workers = num_workers
+
+        probe = AlienInvadersEnv(**env_kwargs)
+        self.observation_shape = probe.observation_shape
+        self.observation_dtype = probe.observation_dtype
+
+        if not num_workers:
+            self.envs = [probe] + [AlienInvadersEnv(**env_kwargs)
+                                   for _ in range(num_envs - 1)]
+            self.observations = np.empty(
+                (num_envs,) + self.observation_shape, self.observation_dtype)
+            self.rewards = np.zeros(num_envs)
+            self.dones = np.zeros(num_envs, dtype=bool)
+            return
+
+        observation_size = (int(np.prod(self.observation_shape))
+                            * self.observation_dtype.itemsize)
+        sizes = {'observations': num_envs * observation_size,
+                 'rewards': num_envs * 8,
+                 'dones': num_envs}
+        self.buffers = {name: shared_memory.SharedMemory(create=True,
+                                                         size=max(size, 1))
+                        for name, size in sizes.items()}
+        self.observations = np.ndarray(
+            (num_envs,) + self.observation_shape, self.observation_dtype,
+            buffer=self.buffers['observations'].buf)
+        self.rewards = np.ndarray(num_envs, np.float64,
+                                  buffer=self.buffers['rewards'].buf)
+        self.dones = np.ndarray(num_envs, np.bool_,
+                                buffer=self.buffers['dones'].buf)
+
+        # spawn rather than fork: SDL state does not survive a fork
+        context = multiprocessing.get_context('spawn')
+        names = {name: buffer.name for name, buffer in self.buffers.items()}
+        bounds = np.linspace(0, num_envs, num_workers + 1).astype(int)
+        self.slices = list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+        self.connections = []
+        self.processes = []
+        for start, stop in self.slices:
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_worker, daemon=True,
+                args=(child, names, start, stop, num_envs,
+                      self.observation_shape, self.observation_dtype.str,
+                      env_kwargs))
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def reset(self) -> np.ndarray:
+        if not self.num_workers:
+            for index, env in enumerate(self.envs):
+                env.reset()
+                env.observe(self.observations[index])
+            return self.observations
+
+        for connection in self.connections:
+            connection.send(('reset', None))
+        for connection in self.connections:
+            connection.recv()
+        return self.observations
+
+    def step(self, actions: Sequence[int]
+             ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict]]:
+        actions = np.asarray(actions).tolist()
+        if not self.num_workers:
+            infos = []
+            for index, (env, action) in enumerate(zip(self.envs, actions)):
+                _, reward, done, info = env.step(action)
+                if done:
+                    info['final_score'] = info['score']
+                    env.reset()
+                env.observe(self.observations[index])
+                self.rewards[index] = reward
+                self.dones[index] = done
+                infos.append(info)
+            return self.observations, self.rewards.copy(), \
+                self.dones.copy(), infos
+
+        for connection, (start, stop) in zip(self.connections, self.slices):
+            connection.send(('step', actions[start:stop]))
+        infos = []
+        for connection in self.connections:
+            infos.extend(connection.recv())
+        return (self.observations, self.rewards.copy(), self.dones.copy(),
+                infos)
+
+    def close(self) -> None:
+        if not self.num_workers:
+            return
+        for connection in self.connections:
+            connection.send(('close', None))
+            connection.close()
+        for process in self.processes:
+            process.join()
+        del self.observations, self.rewards, self.dones
+        for buffer in self.buffers.values():
+            buffer.close()
+            buffer.unlink()
+        self.num_workers = 0
+        self.envs = []
+
+    def __enter__(self) -> 'VecEnv':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,132 @@
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from pygame.surface import Surface
+
+import image_functions as img_funs
+from bullet import Bomb, BulletPool
+from settings import Settings
+from simulation import ALIEN_IMAGE, FleetBody, World, to_pixel, to_pixels
+
+# Aliens killed at once above which the composite is rebuilt rather than
+# patched cell by cell
+MAX_COMPOSITE_PATCHES = 64
+
+
+class Fleet(FleetBody):
+    """
+    The alien fleet as the game draws it: a FleetBody with the image
+    every alien shares. With fleet_composite set, and the whole screen
+    redrawn every frame, a fleet on its lattice is drawn from one
+    surface holding every living alien at its cell, over the
+    background. The surface is built when a fleet is spawned, and only
+    the cells of aliens that die are repainted.
+    """
+
+    def __init__(self, ai_settings: Settings, screen: Surface) -> None:
+        self.screen = screen
+        self.screen_rect = screen.get_rect()
+
+        self.image = img_funs.load_image(ALIEN_IMAGE,
+                                         ai_settings.alien_height)
+        width, height = self.image.get_size()
+        shape = (img_funs.load_shape(ALIEN_IMAGE, ai_settings.alien_height)
+                 if ai_settings.collision_mode == 'mask' else None)
+        super(Fleet, self).__init__(
+            ai_settings, World(*screen.get_size()), width, height, shape,
+            BulletPool(ai_settings, screen, ai_settings.bombs_allowed, Bomb))
+        self.composite: Optional[Surface] = None
+        self._composite_stale = True
+
+    def empty(self) -> None:
+        super(Fleet, self).empty()
+        self._composite_stale = True
+
+    def spawn(self, x: float, y: float, column: int, row: int) -> int:
+        self._composite_stale = True
+        return super(Fleet, self).spawn(x, y, column, row)
+
+    def spawn_grid(self, number_aliens_x: int, number_rows: int) -> None:
+        super(Fleet, self).spawn_grid(number_aliens_x, number_rows)
+        self._composite_stale = True
+
+    def kill(self, indexes: Iterable[int]) -> np.ndarray:
+        indexes = super(Fleet, self).kill(indexes)
+        if not self.alive_count or len(indexes) > MAX_COMPOSITE_PATCHES:
+            # Cheaper to compose the survivors afresh, if any are left
+            self._composite_stale = True
+        elif len(indexes) and not self._composite_stale:
+            # Paint the dead aliens' cells back to the background
+            bg_color = self.ai_settings.bg_color
+            pitch_x, pitch_y = self.lattice.pitch_x, self.lattice.pitch_y
+            for column, row in zip(self.column[indexes].tolist(),
+                                   self.row[indexes].tolist()):
+                self.composite.fill(bg_color, (column * pitch_x,
+                                               row * pitch_y,
+                                               self.width, self.height))
+        return indexes
+
+    def _positions(self, alpha: float) -> Iterable[Tuple[int, int]]:
+        """Living aliens' top-lefts, alpha of the way through the step"""
+        alive = self.alive[:self.size]
+        lag = 1.0 - alpha
+        lefts = to_pixels(self.x[:self.size][alive] - self.step_dx * lag)
+        tops = to_pixels(self.y[:self.size][alive] - self.step_dy * lag)
+        return zip(lefts.tolist(), tops.tolist())
+
+    def _use_composite(self) -> bool:
+        """Whether the fleet can be drawn from its composite surface"""
+        ai_settings = self.ai_settings
+        if not ai_settings.fleet_composite or not self.alive_count:
+            return False
+        if ai_settings.render_backend == 'texture':
+            # The composite is patched in place, which would leave its
+            # texture stale; one alien texture drawn per alien is cheap
+            return False
+        if ai_settings.render_mode != 'full':
+            # Its bounding rect alone is past the dirty renderer's
+            # threshold, forcing a full repaint every frame
+            return False
+        if self._index_stale:
+            self._refresh_index()
+        if not self._on_lattice:
+            return False
+        if self._composite_stale:
+            self._compose()
+        return True
+
+    def _compose(self) -> None:
+        """Draw every living alien onto the composite at its cell"""
+        rows, columns = self.lattice.grid.shape
+        pitch_x, pitch_y = self.lattice.pitch_x, self.lattice.pitch_y
+        size = ((columns - 1) * pitch_x + self.width,
+                (rows - 1) * pitch_y + self.height)
+        if self.composite is None or self.composite.get_size() != size:
+            # Opaque, in the screen's format, so it blits as a copy
+            self.composite = Surface(size, 0, self.screen)
+        self.composite.fill(self.ai_settings.bg_color)
+        alive = self.alive[:self.size]
+        image = self.image
+        self.composite.blits(
+            [(image, (column * pitch_x, row * pitch_y))
+             for column, row in zip(self.column[:self.size][alive].tolist(),
+                                    self.row[:self.size][alive].tolist())],
+            doreturn=False)
+        self._composite_stale = False
+
+    def _composite_position(self, alpha: float) -> Tuple[int, int]:
+        """Where the composite goes, alpha of the way through the step"""
+        origin_x, origin_y = self.origin()
+        lag = 1.0 - alpha
+        return (to_pixel(origin_x - self.step_dx * lag),
+                to_pixel(origin_y - self.step_dy * lag))
+
+    def draw_list(self, alpha: float = 1.0) -> list:
+        """The fleet as (source, rect) pairs for a renderer"""
+        if self._use_composite():
+            left, top = self._composite_position(alpha)
+            return [(self.composite,
+                     (left, top) + self.composite.get_size())]
+        image, width, height = self.image, self.width, self.height
+        return [(image, (left, top, width, height))
+                for left, top in self._positions(alpha)]
@@ -1,42 +1,62 @@
 import sys
-from time import sleep
+from typing import Iterable, Optional
 
 import pygame
 import pygame.mouse
 import pygame.sprite
 from pygame.event import Event
-from pygame.sprite import Group
 from pygame.surface import Surface
 
-from alien import Alien
-from bullet import Bullet
+import simulation as sim
+import snapshot
+from bullet import BulletPool
 from button import Button
+from fleet import Fleet
+from profiler import ALIENS, COLLISIONS, NULL_PROFILER
 from game_stats import GameStats
 from scoreboard import Scoreboard
 from settings import Settings
 from ship import Ship
 
+# Events sent when the window has to be drawn again, e.g. uncovered
+EXPOSE_EVENTS = (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED)
+
 
 def check_events(ai_settings: Settings, stats: GameStats,
                  scoreboard: Scoreboard, screen: Surface, play_button: Button,
-                 ship: Ship, aliens: Group, bullets: Group) -> None:
-    for event in pygame.event.get():
+                 ship: Ship, aliens: Fleet, bullets: BulletPool,
+                 events: Optional[Iterable[Event]] = None,
+                 renderer=None) -> None:
+    """
+    Respond to keypresses, mouse events and exposes. events defaults to
+    the pending pygame events; replays pass in recorded ones instead.
+    renderer, when given, repaints in full after the window is exposed.
+    """
+    if events is None:
+        events = pygame.event.get()
+    for event in events:
         if event.type == pygame.QUIT:
             sys.exit()
+        elif event.type in EXPOSE_EVENTS:
+            if renderer is not None:
+                # Renderers skip unchanged frames, which would leave an
+                # uncovered window blank while paused or on Play
+                renderer.invalidate()
         elif event.type == pygame.KEYDOWN:
             check_keydown_events(event, ai_settings, stats, screen,
                                  scoreboard, ship, aliens, bullets)
         elif event.type == pygame.KEYUP:
             check_keyup_events(event, ship)
         elif event.type == pygame.MOUSEBUTTONDOWN:
-            mouse_x, mouse_y = pygame.mouse.get_pos()
+            mouse_x, mouse_y = event.pos
             check_play_button(ai_settings, screen, stats, scoreboard,
-                              play_button, ship, aliens, bullets, mouse_x, mouse_y)
+                              play_button, ship, aliens, bullets,
+                              mouse_x, mouse_y)
 
 
 def check_play_button(ai_settings: Settings, screen: Surface, stats: GameStats,
                       scoreboard: Scoreboard, play_button: Button,
-                      ship: Ship, aliens: Group, bullets: Group,
+                      ship: Ship, aliens: Fleet, bullets: BulletPool,
                       mouse_x: int, mouse_y: int) -> None:
     """Start a new game when the player clicks Play"""
     button_clicked = play_button.rect.collidepoint(mouse_x, mouse_y)
@@ -46,54 +66,53 @@ def check_play_button(ai_settings: Settings, screen: Surface, stats: GameStats,
 
 
 def reset_game(ai_settings: Settings, screen: Surface, stats: GameStats,
-               scoreboard: Scoreboard, ship: Ship, aliens: Group,
-               bullets: Group) -> None:
+               scoreboard: Scoreboard, ship: Ship, aliens: Fleet,
+               bullets: BulletPool) -> None:
     if not stats.game_active:
-        # Reset the game statistics
-        stats.reset_stats()
-        stats.game_active = True
+        sim.reset_game(ai_settings, stats, ship, aliens, bullets)
 
         # Reset the scoreboard images
         scoreboard.reset()
 
-        # Empty the list of aliens and bullets
-        aliens.empty()
-        bullets.empty()
-
-        create_fleet(ai_settings, screen, ship, aliens)
-        ship.center_ship()
-
-        ai_settings.initialize_dynamic_settings()
-        pygame.mouse.set_visible(False)
-
-        stats.game_active = True
-
 
 def check_keydown_events(event: Event,
                          ai_settings: Settings, stats: GameStats,
                          screen: Surface, scoreboard: Scoreboard,
-                         ship: Ship, aliens: Group, bullets: Group) -> None:
+                         ship: Ship, aliens: Fleet,
+                         bullets: BulletPool) -> None:
     if event.key == pygame.K_RIGHT:
         ship.moving_right = True
     elif event.key == pygame.K_LEFT:
         ship.moving_left = True
     elif event.key == pygame.K_SPACE:
         if stats.game_active:
-            fire_bullet(ai_settings, screen, ship, bullets)
+            sim.fire_bullet(ai_settings, ship, bullets)
         else:
             reset_game(ai_settings, screen, stats, scoreboard,
                        ship, aliens, bullets)
     elif event.key == pygame.K_p:
         stats.game_paused = not stats.game_paused
+    elif event.key == pygame.K_F3:
+        stats.perf_hud_visible = not stats.perf_hud_visible
+    elif event.key == pygame.K_F5:
+        stats.quick_save = snapshot.save(ai_settings, stats, ship, aliens,
+                                         bullets)
+    elif event.key == pygame.K_F9:
+        if stats.quick_save is not None:
+            load_state(stats.quick_save, ai_settings, stats, scoreboard,
+                       ship, aliens, bullets)
     elif event.key == pygame.K_q:
         sys.exit()
 
 
-def fire_bullet(ai_settings: Settings, screen: Surface,
-                ship: Ship, bullets: Group) -> None:
-    if len(bullets) < ai_settings.bullets_allowed:
-        new_bullet = Bullet(ai_settings, screen, ship)
-        bullets.add(new_bullet)
+def load_state(state: bytes, ai_settings: Settings, stats: GameStats,
+               scoreboard: Scoreboard, ship: Ship, aliens: Fleet,
+               bullets: BulletPool) -> None:
+    """Put the game back into a snapshot's state"""
+    snapshot.restore(state, ai_settings, stats, ship, aliens, bullets)
+
+    # Reset the scoreboard images
+    scoreboard.reset()
 
 
 def check_keyup_events(event: Event, ship: Ship):
@@ -105,176 +124,123 @@ def check_keyup_events(event: Event, ship: Ship):
 
 def update_screen(ai_settings: Settings, screen: Surface,
                   stats: GameStats, scoreboard: Scoreboard,
-                  ship: Ship, aliens: Group, bullets:
-                  Group, play_button: Button) -> None:
-    screen.fill(ai_settings.bg_color)
+                  ship: Ship, aliens: Fleet, bullets:
+                  BulletPool, play_button: Button, renderer,
+                  alpha: float = 1.0, hud=None, capture=None) -> None:
+    """
+    Draw the frame. alpha is how far the clock has run into the next
+    simulation step; moving sprites are drawn that far between their
+    last two positions. hud is an optional overlay shown while
+    stats.perf_hud_visible is set, and capture an optional
+    FrameCapture handed each finished frame.
+    """
+    show_mouse(stats)
+
+    # The fleet goes first: its composite covers the background around
+    # the aliens, and would hide bullets and bombs drawn before it
+    items = aliens.draw_list(alpha)
     for bullet in bullets.sprites():
-        bullet.draw_bullet()
-    ship.blitme()
-    aliens.draw(screen)
+        items.extend(bullet.draw_list(alpha))
+    for bomb in aliens.bombs.sprites():
+        items.extend(bomb.draw_list(alpha))
+    if ship_visible(ai_settings, stats):
+        items.extend(ship.draw_list(alpha))
 
-    scoreboard.show_score()
+    items.extend(scoreboard.draw_list())
 
     if not stats.game_active:
-        play_button.draw_button()
+        items.extend(play_button.draw_list())
 
-    pygame.display.flip()
+    if hud is not None and stats.perf_hud_visible:
+        items.extend(hud.draw_list())
 
+    renderer.present(items)
 
-def update_bullets(ai_settings: Settings, screen: Surface,
-                   stats: GameStats, scoreboard: Scoreboard,
-                   ship: Ship, aliens: Group, bullets: Group) -> None:
-    """Update bullet positions"""
-    bullets.update()
-    check_bullet_alien_collisions(ai_settings, screen, stats, scoreboard,
-                                  ship, aliens, bullets)
+    if capture is not None:
+        capture.capture(screen)
 
 
-def check_bullet_alien_collisions(ai_settings: Settings, screen: Surface,
-                                  stats: GameStats, scoreboard: Scoreboard,
-                                  ship: Ship, aliens: Group,
-                                  bullets: Group) -> None:
+def show_mouse(stats: GameStats) -> None:
     """
-    Check for any bullets that have hit aliens.
-    When so, get rid of both bullet an alien
+    Show the mouse, for the Play button, only while no game is running.
+    Only the frame touches it, so the handlers that start, load or end a
+    game can run on the simulation thread in pipelined mode.
     """
-    # Remove any bullets and aliens that have collided.
-    collisions = pygame.sprite.groupcollide(bullets, aliens, True, True)
+    if pygame.mouse.get_visible() == stats.game_active:
+        pygame.mouse.set_visible(not stats.game_active)
 
-    if collisions:
-        for aliens in collisions.values():
-            stats.score += ai_settings.alien_points
-        scoreboard.prep_score()
-        check_high_score(stats, scoreboard)
 
-    if len(aliens) == 0:
-        # If the entire alien fleet is destroyed start a new level
-        bullets.empty()
-        ai_settings.increase_speed()
+def ship_visible(ai_settings: Settings, stats: GameStats) -> bool:
+    """Blink the ship while it respawns, if the animation is on"""
+    if not stats.respawning or not ai_settings.respawn_animation:
+        return True
+    blinks = stats.respawn_time_left * ai_settings.respawn_blink_rate
+    return int(2 * blinks) % 2 == 0
+
+
+def update_game(ai_settings: Settings, screen: Surface,
+                stats: GameStats, scoreboard: Scoreboard,
+                ship: Ship, aliens: Fleet, bullets: BulletPool,
+                dt: float, profiler=NULL_PROFILER) -> None:
+    """
+    Advance the simulation by one fixed step of dt seconds, then bring
+    the scoreboard up to date with it
+    """
+    score, level, ships_left = stats.score, stats.level, stats.ships_left
+    hits = sim.update_game(ai_settings, stats, ship, aliens, bullets, dt,
+                           profiler.mark_phase if profiler.enabled else None)
+    profiler.count(COLLISIONS, hits)
+    show_changes(stats, scoreboard, score, level, ships_left)
+    profiler.mark(ALIENS)
+
 
-        stats.level += 1
+def show_changes(stats: GameStats, scoreboard: Scoreboard, score: int,
+                 level: int, ships_left: int) -> None:
+    """
+    Re-render whatever the last step changed on the scoreboard, given
+    the score, level and ships left before it, and end a lost game
+    """
+    if stats.score != score:
+        scoreboard.prep_score()
+        check_high_score(stats, scoreboard)
+    if stats.level != level:
         scoreboard.prep_level()
+    if stats.ships_left != ships_left:
+        scoreboard.prep_ships_left()
+        if not stats.game_active:
+            game_over(stats)
 
-        create_fleet(ai_settings, screen, ship, aliens)
 
-    # Get rid of bullets that have disappeared
-    for bullet in bullets.copy():
-        if bullet.rect.bottom <= 0:
-            bullets.remove(bullet)
+def game_over(stats: GameStats) -> None:
+    if stats.high_scores:
+        stats.high_scores.record_game(stats.score, stats.level)
 
 
 def check_high_score(stats: GameStats, scoreboard: Scoreboard) -> None:
     if stats.score > stats.high_score:
         stats.high_score = stats.score
         scoreboard.prep_high_score()
+        if stats.high_scores:
+            # Only queued here; the store's own thread does the writing
+            stats.high_scores.submit(stats.high_score)
 
 
-def check_aliens_bottom(ai_settings: Settings, screen: Surface,
-                        stats: GameStats, scoreboard: Scoreboard,
-                        ship: Ship, aliens: Group, bullets: Group) -> None:
-    """Check if any aliens have reached the bottom of the screen"""
-    screen_rect = screen.get_rect()
-    for alien in aliens.sprites():
-        if alien.rect.bottom >= screen_rect.bottom:
-            ship_hit(ai_settings, screen, stats, scoreboard,
-                     ship, aliens, bullets)
-            break
-
-
-def get_number_aliens_x(ai_settings: Settings, alien_width: int) -> int:
-    """Determine the number of aliens that fit in a row"""
-    available_space_x = ai_settings.screen_width - (2 * alien_width)
-    number_aliens_x = int(available_space_x / (2 * alien_width))
-    return number_aliens_x
-
-
-def get_number_rows(ai_settings: Settings, ship_height: int,
-                    alien_height: int) -> int:
-    available_space_y = (ai_settings.screen_height
-                         - (3 * alien_height)
-                         - ship_height)
-    number_rows = int(available_space_y / (2 * alien_height))
-    return number_rows
-
-
-def create_alien(ai_settings: Settings, screen: Surface, aliens: Group,
-                 alien_number: int, row_number: int) -> None:
-    """Create an alien and place it"""
-    alien = Alien(ai_settings, screen)
-    alien_width = alien.rect.width
-    alien.x = alien_width + (2 * alien_width * alien_number)
-    alien.rect.x = alien.x
-    alien.rect.y = alien.rect.height + (2 * alien.rect.height * row_number)
-    aliens.add(alien)
+def check_stored_high_score(stats: GameStats,
+                            scoreboard: Scoreboard) -> bool:
+    """
+    Take up the stored high score if the store has loaded it by now.
+    Return True once it has, or has failed to, when there is no need to
+    check again. If it failed, the in-memory high score stands.
+    """
+    best = stats.high_scores.best()
+    if best is None:
+        return stats.high_scores.error is not None
+    if best > stats.high_score:
+        stats.high_score = best
+        scoreboard.prep_high_score()
+    return True
 
 
 def create_fleet(ai_settings: Settings, screen: Surface,
-                 ship: Ship, aliens: Group) -> None:
-    alien = Alien(ai_settings, screen)
-    alien_width = alien.rect.width
-    number_aliens_x = get_number_aliens_x(ai_settings, alien_width)
-    number_rows = get_number_rows(ai_settings,
-                                  ship.rect.height, alien.rect.height)
-
-    # Create a fleet of aliens
-    for row_number in range(number_rows):
-        for alien_number in range(number_aliens_x):
-            create_alien(ai_settings, screen, aliens,
-                         alien_number, row_number)
-
-
-def check_fleet_edges(ai_settings: Settings, aliens: Group) -> None:
-    """Respond if any aliens have reached an edge"""
-    for alien in aliens.sprites():
-        if alien.check_edges():
-            change_fleet_direction(ai_settings, aliens)
-            break
-
-
-def change_fleet_direction(ai_settings: Settings, aliens: Group) -> None:
-    """Drop the entire fleed and change the fleet's direction"""
-    for alien in aliens.sprites():
-        alien.rect.y += ai_settings.fleet_drop_speed
-    ai_settings.fleet_direction *= -1
-
-
-def update_aliens(ai_settings: Settings, screen: Surface, stats: GameStats,
-                  scoreboard: Scoreboard, ship: Ship, aliens: Group,
-                  bullets: Group) -> None:
-    """
-    Check if a fleet is at an edge.
-    Update the positions of all aliens in the fleet.
-    Check for alien-ship collisions
-    """
-    check_fleet_edges(ai_settings, aliens)
-    aliens.update()
-
-    # Look for alien-ship collisions
-    if pygame.sprite.spritecollideany(ship, aliens):
-        ship_hit(ai_settings, screen, stats, scoreboard,
-                 ship, aliens, bullets)
-    # Look for aliens hitting the bottom of the screen
-    check_aliens_bottom(ai_settings, screen, stats, scoreboard, ship,
-                        aliens, bullets)
-
-
-def ship_hit(ai_settings: Settings, screen: Surface, stats: GameStats,
-             scoreboard: Scoreboard, ship: Ship, aliens: Group,
-             bullets: Group) -> None:
-    """Respond to a ship being hit by an alien"""
-    stats.ships_left -= 1
-    scoreboard.prep_ships_left()
-
-    if stats.ships_left > 0:
-        aliens.empty()
-        bullets.empty()
-
-        create_fleet(ai_settings, screen, ship, aliens)
-        ship.center_ship()
-
-        # Pause
-        sleep(0.5)
-
-    else:
-        stats.game_active = False
-        pygame.mouse.set_visible(True)
+                 ship: Ship, aliens: Fleet) -> None:
+    sim.create_fleet(ai_settings, ship, aliens)
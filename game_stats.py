@@ -1,17 +1,35 @@
+from typing import Optional
+
+from high_scores import HighScoreStore
 from settings import Settings
 
 
 class GameStats():
-    def __init__(self, ai_settings: Settings) -> None:
+    def __init__(self, ai_settings: Settings,
+                 high_scores: Optional[HighScoreStore] = None) -> None:
         self.ai_settings = ai_settings
         self.reset_stats()
         self.game_active = False
         self.game_paused = False
+        self.perf_hud_visible = False
+        # The state F5 saved, for F9 to load
+        self.quick_save: Optional[bytes] = None
 
-        # High score should never be reset
+        # High score should never be reset. With a store it outlives
+        # the process, and is raised to the stored one once loaded.
         self.high_score = 0
+        self.high_scores = high_scores
 
     def reset_stats(self):
         self.ships_left = self.ai_settings.ship_limit
         self.score = 0
         self.level = 1
+        self.respawn_time_left = 0.0
+
+    @property
+    def respawning(self) -> bool:
+        """True while the game holds after the ship was hit"""
+        return self.respawn_time_left > 0
+
+    def advance_respawn(self, dt: float) -> None:
+        self.respawn_time_left = max(0.0, self.respawn_time_left - dt)
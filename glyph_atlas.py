@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import pygame
+from pygame.font import Font
+from pygame.surface import Surface
+
+Color = Tuple[int, int, int]
+
+
+class GlyphAtlas():
+    """
+    Text renderer that draws each character with FreeType once and
+    composes strings by blitting the cached glyphs side by side. Whole
+    strings are kept in a small LRU cache, so redrawing a score that was
+    shown recently is a dictionary lookup.
+    """
+
+    def __init__(self, font: Font, color: Color,
+                 background: Optional[Color] = None,
+                 cache_size: int = 64) -> None:
+        self.font = font
+        self.color = color
+        self.background = background
+        self.height = font.get_height()
+        self.cache_size = cache_size
+        self.glyphs: Dict[str, Surface] = {}
+        self.strings: 'OrderedDict[str, Surface]' = OrderedDict()
+
+    def glyph(self, char: str) -> Surface:
+        glyph = self.glyphs.get(char)
+        if glyph is None:
+            glyph = self.font.render(char, True, self.color, self.background)
+            self.glyphs[char] = glyph
+        return glyph
+
+    def preload(self, chars: str) -> None:
+        for char in chars:
+            self.glyph(char)
+
+    def render(self, text: str) -> Surface:
+        """Return text as a rendered image, shared with later calls"""
+        image = self.strings.get(text)
+        if image is not None:
+            self.strings.move_to_end(text)
+            return image
+
+        glyphs = [self.glyph(char) for char in text]
+        width = sum(glyph.get_width() for glyph in glyphs)
+        if self.background is None:
+            image = Surface((width, self.height), pygame.SRCALPHA)
+        else:
+            # Glyphs are rendered on the background and tile the whole
+            # image, so there is nothing left to fill
+            image = Surface((width, self.height))
+
+        x = 0
+        blits = []
+        for glyph in glyphs:
+            blits.append((glyph, (x, 0)))
+            x += glyph.get_width()
+        image.blits(blits, doreturn=False)
+
+        self.strings[text] = image
+        if len(self.strings) > self.cache_size:
+            self.strings.popitem(last=False)
+        return image
+
+
+_fonts: Dict[Tuple[Optional[str], int], Font] = {}
+
+
+def get_font(size: int, filename: Optional[str] = None) -> Font:
+    """
+    Return the shared font for a file and size, loading it on first use.
+    filename None is the font bundled with pygame, opened directly from
+    its file; SysFont(None, ...) ends up with the same font, but may
+    scan the system's font directories first.
+    """
+    key = (filename, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = Font(filename, size)
+        _fonts[key] = font
+    return font
+
+
+_atlases: Dict[Tuple[Font, Color, Optional[Color]], GlyphAtlas] = {}
+
+
+def get_atlas(font: Font, color: Color,
+              background: Optional[Color] = None) -> GlyphAtlas:
+    """Return the shared atlas for a font, colour and background"""
+    key = (font, tuple(color), background and tuple(background))
+    atlas = _atlases.get(key)
+    if atlas is None:
+        atlas = GlyphAtlas(font, color, background)
+        _atlases[key] = atlas
+    return atlas
@@ -0,0 +1,83 @@
+"""
+Run the game without a window or a player, for benchmarks and tools.
+SDL's dummy video driver stands in for a real display.
+"""
+import os
+from typing import Iterable, Optional, Tuple
+
+import pygame
+import pygame.display
+import pygame.font
+from pygame.event import Event
+
+import game_functions as gf
+from bullet import BulletPool
+from button import Button
+from fleet import Fleet
+from renderer import create_renderer
+from scoreboard import Scoreboard
+from settings import Settings
+from ship import Ship
+from simulation import Simulation
+
+
+def init() -> None:
+    """Start just the parts of pygame the game needs, without a window"""
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    pygame.display.init()
+    pygame.font.init()
+
+
+class HeadlessGame(Simulation):
+    """
+    All of the state run_game keeps, driven by the caller one simulation
+    step at a time: a Simulation played with the game's sprites, which
+    keeps its scoreboard up to date and can be drawn. With
+    display=False the game draws onto an ordinary Surface and no video
+    mode is ever set.
+    """
+
+    def __init__(self, ai_settings: Optional[Settings] = None,
+                 display: bool = True) -> None:
+        init()
+        ai_settings = ai_settings or Settings()
+        size = (ai_settings.screen_width, ai_settings.screen_height)
+        if display:
+            self.screen = pygame.display.set_mode(size)
+        else:
+            self.screen = pygame.Surface(size)
+        self.renderer = create_renderer(ai_settings, self.screen)
+        self.play_button = Button(ai_settings, self.screen, "Play")
+        super(HeadlessGame, self).__init__(ai_settings)
+        self.scoreboard = Scoreboard(self.ai_settings, self.screen,
+                                     self.stats)
+
+    def make_bodies(self) -> Tuple[Ship, Fleet, BulletPool]:
+        return (Ship(self.ai_settings, self.screen),
+                Fleet(self.ai_settings, self.screen),
+                BulletPool(self.ai_settings, self.screen))
+
+    def start(self) -> None:
+        gf.reset_game(self.ai_settings, self.screen, self.stats,
+                      self.scoreboard, self.ship, self.aliens, self.bullets)
+
+    def handle_events(self, events: Iterable[Event]) -> None:
+        """Handle input events as the main loop would"""
+        gf.check_events(self.ai_settings, self.stats, self.scoreboard,
+                        self.screen, self.play_button, self.ship,
+                        self.aliens, self.bullets, events, self.renderer)
+
+    def load_state(self, state: bytes) -> None:
+        gf.load_state(state, self.ai_settings, self.stats, self.scoreboard,
+                      self.ship, self.aliens, self.bullets)
+
+    def update(self, dt: float) -> None:
+        gf.update_game(self.ai_settings, self.screen, self.stats,
+                       self.scoreboard, self.ship, self.aliens,
+                       self.bullets, dt)
+
+    def render(self, alpha: float = 1.0) -> None:
+        gf.update_screen(self.ai_settings, self.screen, self.stats,
+                         self.scoreboard, self.ship, self.aliens,
+                         self.bullets, self.play_button, self.renderer,
+                         alpha)
@@ -0,0 +1,152 @@
+"""
+Persistent high scores, kept in SQLite and written off the game loop.
+
+The game only ever puts small messages on a queue. A writer thread
+owns the database: it opens and reads it at startup, then batches up
+whatever arrives within flush_interval seconds into one transaction.
+Rapid high score updates in a batch are coalesced into the best of
+them. The database runs in WAL mode, so a crash loses at most the
+batch in flight, never the file.
+"""
+import queue
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS high_score (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    score INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS games (
+    score INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    played_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_by_score ON games (score DESC);
+'''
+
+# Messages on the queue
+BEST, GAME = range(2)
+
+
+class HighScoreStore():
+    """
+    The stored high score and a leaderboard of finished games. best()
+    is None until the writer thread has loaded the database, and stays
+    None, with error set, if it could not; submit() and record_game()
+    never wait on it.
+    """
+
+    def __init__(self, filename: str, flush_interval: float = 1.0) -> None:
+        self.filename = filename
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue = queue.Queue()
+        self.error: Optional[BaseException] = None
+        self._best: Optional[int] = None
+        self.writes = 0
+        self.writer = threading.Thread(target=self._run,
+                                       name='high-scores', daemon=True)
+        self.writer.start()
+
+    def best(self) -> Optional[int]:
+        return self._best
+
+    def submit(self, score: int) -> None:
+        """Store score as the high score if it beats the stored one"""
+        self.queue.put((BEST, score))
+
+    def record_game(self, score: int, level: int) -> None:
+        """Add a finished game to the leaderboard"""
+        self.queue.put((GAME, score, level, time.time()))
+
+    def top(self, count: int = 10) -> List[Tuple[int, int, float]]:
+        """
+        The best count games as (score, level, played_at) tuples. This
+        reads the database on the calling thread, so it is meant for
+        tools and menus rather than the game loop.
+        """
+        with sqlite3.connect(self.filename) as connection:
+            return connection.execute(
+                'SELECT score, level, played_at FROM games '
+                'ORDER BY score DESC LIMIT ?', (count,)).fetchall()
+
+    def close(self) -> None:
+        """Write out everything queued and stop the writer"""
+        self.queue.put(None)
+        self.writer.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self) -> None:
+        try:
+            connection = self._open()
+        except Exception as error:
+            self.error = error
+            self._drain()
+            return
+        try:
+            while self._write_batch(connection):
+                pass
+        finally:
+            connection.close()
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.filename)
+        connection.execute('PRAGMA journal_mode=WAL')
+        # With WAL, NORMAL only skips syncing on every commit: a crash of
+        # the game loses nothing, a power cut at most the last batch
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.executescript(SCHEMA)
+        row = connection.execute(
+            'SELECT score FROM high_score WHERE id = 0').fetchone()
+        self._best = row[0] if row else 0
+        return connection
+
+    def _next_batch(self) -> Tuple[list, bool]:
+        """Messages arriving within flush_interval of the first one"""
+        message = self.queue.get()
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while message is not None:
+            batch.append(message)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return batch, True
+            try:
+                message = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                return batch, True
+        return batch, False
+
+    def _write_batch(self, connection: sqlite3.Connection) -> bool:
+        """Write one batch; return False once the store is closed"""
+        batch, running = self._next_batch()
+        best = max((message[1] for message in batch
+                    if message[0] == BEST), default=None)
+        games = [message[1:] for message in batch if message[0] == GAME]
+        if best is None and not games:
+            return running
+
+        try:
+            with connection:
+                if best is not None and best > self._best:
+                    connection.execute(
+                        'INSERT INTO high_score (id, score) VALUES (0, ?) '
+                        'ON CONFLICT (id) DO UPDATE SET score = '
+                        'max(score, excluded.score)', (best,))
+                    self._best = best
+                connection.executemany(
+                    'INSERT INTO games (score, level, played_at) '
+                    'VALUES (?, ?, ?)', games)
+            self.writes += 1
+        except sqlite3.Error as error:
+            # Keep taking messages so the game never backs up on them;
+            # close() reports the error
+            self.error = error
+        return running
+
+    def _drain(self) -> None:
+        while self.queue.get() is not None:
+            pass
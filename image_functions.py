@@ -1,7 +1,30 @@
+import threading
+from collections import namedtuple
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
 import pygame
+import pygame.mask
+import pygame.surfarray
 import pygame.transform
 from pygame.surface import Surface
 
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'size'])
+
+# Process-wide asset cache, keyed by (filename, target height).
+# Sprites share the cached surfaces, so they must never draw onto them.
+_cache: Dict[Tuple[str, Optional[int]], Surface] = {}
+# Collision shapes of cached surfaces, under the same keys
+_shapes: Dict[Tuple[str, Optional[int]], np.ndarray] = {}
+_hits = 0
+_misses = 0
+
+# Files a background preload has yet to read, each with an event set
+# once it has, and the images read so far, waiting to be converted
+_lock = threading.Lock()
+_reading: Dict[str, threading.Event] = {}
+_read: Dict[str, Surface] = {}
+
 
 def load_as_surface(filename: str) -> Surface:
     """
@@ -9,7 +32,10 @@ def load_as_surface(filename: str) -> Surface:
     blitting a surface to a surface, therefore pre-draw all images you
     plan on using onto their own surfaces.
     """
-    image = pygame.image.load(filename)
+    return _to_surface(pygame.image.load(filename))
+
+
+def _to_surface(image: Surface) -> Surface:
     rect = image.get_rect()
     surface = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
     surface.fill((0, 0, 0, 0))
@@ -22,3 +48,125 @@ def resize(image: Surface, new_height: int) -> Surface:
     old_height = image.get_height()
     new_width = int(old_width * (new_height / old_height))
     return pygame.transform.scale(image, (new_width, new_height))
+
+
+def load_image(filename: str, height: Optional[int] = None) -> Surface:
+    """
+    Return the shared surface for filename, optionally resized to height.
+    Each image is decoded and converted to the display's pixel format
+    once; later calls are dictionary lookups.
+    """
+    global _hits, _misses
+    key = (filename, height)
+    surface = _cache.get(key)
+    if surface is not None:
+        _hits += 1
+        return surface
+
+    _misses += 1
+    if height is None:
+        surface = _decode(filename)
+    else:
+        surface = resize(load_image(filename), height)
+    _cache[key] = surface
+    return surface
+
+
+def _decode(filename: str) -> Surface:
+    """Decode filename, converting it when a display mode has been set"""
+    image = _take_read(filename)
+    if pygame.display.get_surface() is None:
+        # convert_alpha() needs a display; fall back to a plain
+        # per-pixel alpha surface for headless use.
+        return _to_surface(image)
+    return image.convert_alpha()
+
+
+def _take_read(filename: str) -> Surface:
+    """
+    The image a background preload read for filename, waiting for it if
+    it is still being read, or else one read now
+    """
+    with _lock:
+        event = _reading.get(filename)
+    if event is not None:
+        event.wait()
+    with _lock:
+        image = _read.pop(filename, None)
+    if image is None:
+        image = pygame.image.load(filename)
+    return image
+
+
+def load_shape(filename: str, height: Optional[int] = None) -> np.ndarray:
+    """
+    Return the shared collision shape of load_image(filename, height):
+    a boolean array, indexed [y, x], of the pixels opaque enough to
+    hit. It is built from the alpha channel the first time it is asked
+    for.
+    """
+    key = (filename, height)
+    shape = _shapes.get(key)
+    if shape is None:
+        mask = pygame.mask.from_surface(load_image(filename, height))
+        surface = mask.to_surface(setcolor=(255, 255, 255, 255),
+                                  unsetcolor=(0, 0, 0, 255))
+        shape = pygame.surfarray.array_red(surface).T > 0
+        shape.flags.writeable = False
+        _shapes[key] = shape
+    return shape
+
+
+def preload(filenames: Iterable[str], height: Optional[int] = None) -> None:
+    """Warm the cache so the first frame does not pay for decoding"""
+    for filename in filenames:
+        load_image(filename, height)
+
+
+def preload_async(filenames: Iterable[str]) -> threading.Thread:
+    """
+    Start reading filenames on a background thread, e.g. while the
+    display is being set up. load_image picks the images up as they
+    are needed, waiting only for one still being read, and converts
+    them then, since conversion needs the display mode.
+    """
+    with _lock:
+        filenames = [filename for filename in filenames
+                     if (filename, None) not in _cache
+                     and filename not in _reading
+                     and filename not in _read]
+        for filename in filenames:
+            _reading[filename] = threading.Event()
+    thread = threading.Thread(target=_read_files, args=(filenames,),
+                              name='asset-preload', daemon=True)
+    thread.start()
+    return thread
+
+
+def _read_files(filenames: Iterable[str]) -> None:
+    for filename in filenames:
+        try:
+            image = pygame.image.load(filename)
+        except Exception:
+            # load_image tries again, and raises, on the main thread
+            image = None
+        with _lock:
+            if image is not None:
+                _read[filename] = image
+            event = _reading.pop(filename)
+        event.set()
+
+
+def cache_info() -> CacheInfo:
+    """Report cache hits, misses and the number of cached surfaces"""
+    return CacheInfo(_hits, _misses, len(_cache))
+
+
+def clear_cache() -> None:
+    global _hits, _misses
+    _cache.clear()
+    _shapes.clear()
+    with _lock:
+        _read.clear()
+    _hits = 0
+    _misses = 0
@@ -0,0 +1,704 @@
+"""
+Watch or co-op one match from several machines on the LAN.
+
+GameServer runs the authoritative simulation at the fixed simulation
+rate, with every connected client's input driving the one ship, and
+streams the state back over TCP. A client gets a keyframe (a snapshot)
+when it joins and whenever the fleet is rebuilt; every other tick it
+gets a delta holding only what changed: aliens killed, bullets and
+bombs spawned or removed, the ship's and fleet's motion and the score.
+Bullets and bombs fly on their own on the client between deltas, as
+they do on the server.
+
+NetClient mirrors the match into a Simulation, or into a HeadlessGame
+to draw it, interpolating between the last two ticks as the game does
+between steps. Server and clients need the same Settings.
+
+    python netplay.py serve [--host 0.0.0.0] [--port 50505]
+    python netplay.py join HOST [--port 50505]
+
+Try it on localhost with headless clients, one of them playing, and
+report bytes per tick and input latency:
+    python netplay.py local --clients 4 --seconds 10
+"""
+import argparse
+import asyncio
+import struct
+import sys
+import zlib
+from itertools import chain
+from time import perf_counter
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from bots import autopilot
+from settings import Settings
+from simulation import Projectile, Simulation, to_pixel
+
+DEFAULT_PORT = 50505
+
+# Every message: the length of what follows the kind, and its kind
+FRAME = struct.Struct('<IB')
+INPUT, KEYFRAME, DELTA = range(3)
+# Client to server: input sequence number, the buttons held, and
+# whether fire (Space) was pressed since the last message
+INPUT_MESSAGE = struct.Struct('<IBB')
+LEFT, RIGHT = 1, 2
+# Server to client, leading keyframes and deltas: the tick, and the last
+# input sequence number applied from this client
+TICK = struct.Struct('<II')
+# A keyframe's projectile ids follow the count, then the snapshot
+COUNT = struct.Struct('<H')
+# A delta's fields are there only when their flag is set, in this order
+FLAGS = struct.Struct('<H')
+(STEPPED, HELD, SHIP, FLEET_DX, FLEET_DY, SCORE, KILLS, REMOVALS,
+ SPAWNS) = (1 << bit for bit in range(9))
+DOUBLE = struct.Struct('<d')
+SCORE_FIELD = struct.Struct('<q')
+# A spawned projectile: its id, whether it is a bomb, left and y
+SPAWN = struct.Struct('<HBhd')
+ID = np.dtype('<u2')
+INDEX = np.dtype('<u4')
+
+# Clients whose unsent updates back up past this many bytes are dropped
+MAX_WRITE_BUFFER = 1 << 20
+
+
+class Connection():
+    """A connected client, as the server sees it"""
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self.writer = writer
+        self.buttons = 0
+        self.fires = 0
+        # Last input sequence number received, and applied
+        self.sequence = 0
+        self.applied = 0
+        self.needs_keyframe = True
+
+
+class GameServer():
+    """
+    The authoritative match. Each tick applies the input received since
+    the last, steps the simulation once and sends every client either a
+    keyframe or a delta against the state it was last sent.
+    """
+
+    def __init__(self, ai_settings: Settings, host: str = '127.0.0.1',
+                 port: int = DEFAULT_PORT) -> None:
+        self.game = Simulation(ai_settings)
+        self.host = host
+        self.port = port
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.connections: List[Connection] = []
+        self.tick = 0
+        self.running = False
+
+        # The state clients were last sent, which the next delta is
+        # taken against
+        self.alive = np.zeros(0, dtype=bool)
+        self.ids: Dict[Projectile, int] = {}
+        self.next_id = 0
+        self.ship_center = 0.0
+        self.fleet_dx = 0.0
+        self.score = 0
+
+        # Bytes sent per tick, and to how many clients
+        self.tick_bytes: List[int] = []
+        self.tick_clients: List[int] = []
+        self.keyframe_bytes: List[int] = []
+
+    async def start(self) -> int:
+        """Listen for clients, and return the port listened on"""
+        self.server = await asyncio.start_server(self._serve, self.host,
+                                                 self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def run(self, ticks: Optional[int] = None) -> None:
+        """Tick at the simulation rate until stop(), or ticks"""
+        loop = asyncio.get_running_loop()
+        step = self.game.step_time
+        next_tick = loop.time()
+        self.running = True
+        while self.running and (ticks is None or self.tick < ticks):
+            self.update()
+            next_tick += step
+            delay = next_tick - loop.time()
+            if delay < -self.game.ai_settings.max_frame_time:
+                # Too far behind to catch up; carry on from now
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+    def stop(self) -> None:
+        self.running = False
+
+    async def close(self) -> None:
+        self.running = False
+        for connection in self.connections:
+            connection.writer.close()
+        self.connections = []
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader,
+                     writer: asyncio.StreamWriter) -> None:
+        """Collect one client's input until it disconnects"""
+        connection = Connection(writer)
+        self.connections.append(connection)
+        try:
+            while True:
+                length, kind = FRAME.unpack(
+                    await reader.readexactly(FRAME.size))
+                if kind != INPUT or length != INPUT_MESSAGE.size:
+                    break
+                (connection.sequence, connection.buttons,
+                 fired) = INPUT_MESSAGE.unpack(
+                     await reader.readexactly(length))
+                connection.fires += fired
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._drop(connection)
+
+    def _drop(self, connection: Connection) -> None:
+        if connection in self.connections:
+            self.connections.remove(connection)
+        connection.writer.close()
+
+    def update(self) -> None:
+        """Apply input, step once and send every client the result"""
+        game = self.game
+        stats = game.stats
+        before = (stats.level, stats.ships_left, stats.game_active,
+                  game.aliens.alive_count)
+        self._apply_input()
+        stepped = stats.game_active and not stats.game_paused
+        held = stepped and stats.respawning
+        game.step()
+        self.tick += 1
+
+        # A new fleet, a lost ship or a new game change too much for a
+        # delta to be worth it
+        after = (stats.level, stats.ships_left, stats.game_active,
+                 game.aliens.alive_count)
+        rebuilt = (after[:3] != before[:3] or after[3] > before[3]
+                   or game.aliens.size != len(self.alive))
+        delta = None
+        keyframe = None
+        if rebuilt:
+            for connection in self.connections:
+                connection.needs_keyframe = True
+        elif self.connections:
+            delta = self._delta(stepped and not held, held)
+
+        sent = 0
+        for connection in list(self.connections):
+            if connection.needs_keyframe:
+                if keyframe is None:
+                    keyframe = self._keyframe()
+                    self.keyframe_bytes.append(len(keyframe))
+                sent += self._send(connection, KEYFRAME, keyframe)
+                connection.needs_keyframe = False
+            else:
+                sent += self._send(connection, DELTA, delta)
+        self.tick_bytes.append(sent)
+        self.tick_clients.append(len(self.connections))
+
+    def _apply_input(self) -> None:
+        """Steer the ship with every client's buttons, and fire"""
+        game = self.game
+        game.ship.moving_left = any(connection.buttons & LEFT
+                                    for connection in self.connections)
+        game.ship.moving_right = any(connection.buttons & RIGHT
+                                     for connection in self.connections)
+        for connection in self.connections:
+            for _ in range(connection.fires):
+                # Space fires, or starts a game, as it does locally
+                if game.stats.game_active:
+                    game.fire()
+                else:
+                    game.start()
+            connection.fires = 0
+            connection.applied = connection.sequence
+
+    def _keyframe(self) -> bytes:
+        """The whole state, with the ids deltas refer to projectiles by"""
+        game = self.game
+        projectiles = list(chain(game.bullets, game.aliens.bombs))
+        ids = {projectile: self.ids.get(projectile) for projectile
+               in projectiles}
+        for projectile, number in ids.items():
+            if number is None:
+                ids[projectile] = self._new_id()
+        self.ids = ids
+        self.alive = game.aliens.alive[:game.aliens.size].copy()
+        self.ship_center = game.ship.center
+        self.fleet_dx = game.aliens.step_dx
+        self.score = game.stats.score
+        return b''.join((
+            COUNT.pack(len(ids)),
+            np.array(list(ids.values()), dtype=ID).tobytes(),
+            game.save_state()))
+
+    def _new_id(self) -> int:
+        number = self.next_id
+        self.next_id = (self.next_id + 1) % 65536
+        return number
+
+    def _delta(self, stepped: bool, held: bool) -> bytes:
+        """What changed since clients were last sent the state"""
+        game = self.game
+        ship = game.ship
+        aliens = game.aliens
+        flags = (STEPPED if stepped else 0) | (HELD if held else 0)
+        fields = []
+
+        if stepped:
+            if ship.center != self.ship_center:
+                flags |= SHIP
+                self.ship_center = ship.center
+                fields.append(DOUBLE.pack(ship.center))
+            if aliens.step_dx != self.fleet_dx:
+                flags |= FLEET_DX
+                self.fleet_dx = aliens.step_dx
+                fields.append(DOUBLE.pack(aliens.step_dx))
+            if aliens.step_dy:
+                flags |= FLEET_DY
+                fields.append(DOUBLE.pack(aliens.step_dy))
+        if game.stats.score != self.score:
+            flags |= SCORE
+            self.score = game.stats.score
+            fields.append(SCORE_FIELD.pack(game.stats.score))
+
+        alive = aliens.alive[:aliens.size]
+        killed = np.flatnonzero(self.alive & ~alive)
+        if len(killed):
+            flags |= KILLS
+            self.alive[killed] = False
+            fields.append(COUNT.pack(len(killed)))
+            fields.append(killed.astype(INDEX).tobytes())
+
+        ids = {}
+        spawned = []
+        for pool in (game.bullets, aliens.bombs):
+            for projectile in pool:
+                number = self.ids.pop(projectile, None)
+                if number is None:
+                    number = self._new_id()
+                    spawned.append(SPAWN.pack(
+                        number, pool is aliens.bombs, projectile.left,
+                        projectile.y))
+                ids[projectile] = number
+        # Whatever is left was hit, or left the world
+        if self.ids:
+            flags |= REMOVALS
+            fields.append(COUNT.pack(len(self.ids)))
+            fields.append(np.array(list(self.ids.values()),
+                                   dtype=ID).tobytes())
+        self.ids = ids
+        if spawned:
+            flags |= SPAWNS
+            fields.append(COUNT.pack(len(spawned)))
+            fields.extend(spawned)
+        return FLAGS.pack(flags) + b''.join(fields)
+
+    def _send(self, connection: Connection, kind: int, body: bytes) -> int:
+        message = b''.join((FRAME.pack(TICK.size + len(body), kind),
+                            TICK.pack(self.tick, connection.applied),
+                            body))
+        connection.writer.write(message)
+        if (connection.writer.transport.get_write_buffer_size()
+                > MAX_WRITE_BUFFER):
+            # Too slow to keep up; it can rejoin for a fresh keyframe
+            self._drop(connection)
+        return len(message)
+
+    def report(self) -> str:
+        client_ticks = sum(self.tick_clients)
+        if not client_ticks:
+            return '{:,} ticks, no clients'.format(self.tick)
+        per_client = (np.array(self.tick_bytes, dtype=np.float64)
+                      / np.maximum(self.tick_clients, 1))
+        per_client = per_client[np.array(self.tick_clients) > 0]
+        keyframes = np.array(self.keyframe_bytes or [0])
+        return ('{:,} ticks, {:.1f} bytes per tick per client (p50 {:.0f}, '
+                'p99 {:.0f}), {:.1f} KiB/s per client; {} keyframes of '
+                '{:.0f} bytes on average'.format(
+                    self.tick, sum(self.tick_bytes) / client_ticks,
+                    np.percentile(per_client, 50),
+                    np.percentile(per_client, 99),
+                    sum(self.tick_bytes) / client_ticks
+                    * self.game.ai_settings.simulation_rate / 1024,
+                    len(self.keyframe_bytes), keyframes.mean()))
+
+
+class NetClient():
+    """
+    One client's mirror of the match. game is the Simulation, or a
+    HeadlessGame to draw, that keyframes and deltas are applied to.
+    on_tick is called after each one is applied.
+    """
+
+    def __init__(self, ai_settings: Optional[Settings] = None,
+                 game=None) -> None:
+        self.ai_settings = ai_settings or Settings()
+        self.game = game or Simulation(self.ai_settings)
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.on_tick: Optional[Callable[['NetClient'], None]] = None
+
+        self.tick = 0
+        self.received_at = 0.0
+        self.bytes_received = 0
+        self.keyframes = 0
+        self.projectiles: Dict[int, Projectile] = {}
+        self.fleet_dx = 0.0
+
+        # Input: sent once per tick or frame at most, when it changed
+        self.sequence = 0
+        self.buttons = 0
+        self.fire_pending = False
+        # Send times of input not yet applied in a tick received
+        self.sent: Dict[int, float] = {}
+        self.latencies: List[float] = []
+
+    @property
+    def ship(self):
+        return self.game.ship
+
+    @property
+    def aliens(self):
+        return self.game.aliens
+
+    @property
+    def bullets(self):
+        return self.game.bullets
+
+    @property
+    def stats(self):
+        return self.game.stats
+
+    async def connect(self, host: str, port: int = DEFAULT_PORT) -> None:
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+    def fire(self) -> None:
+        """Press Space: fire, or start a game, with the next input"""
+        if (self.stats.game_active and len(self.bullets)
+                >= self.ai_settings.bullets_allowed):
+            return
+        self.fire_pending = True
+
+    def send_input(self, moving_left: bool, moving_right: bool) -> None:
+        """Send the held buttons and any fire, if anything changed"""
+        buttons = (LEFT if moving_left else 0) | (RIGHT if moving_right
+                                                  else 0)
+        if buttons == self.buttons and not self.fire_pending:
+            return
+        self.sequence += 1
+        self.buttons = buttons
+        self.writer.write(FRAME.pack(INPUT_MESSAGE.size, INPUT)
+                          + INPUT_MESSAGE.pack(self.sequence, buttons,
+                                               self.fire_pending))
+        self.fire_pending = False
+        self.sent[self.sequence] = perf_counter()
+
+    async def run(self) -> None:
+        """Apply the server's messages until it disconnects"""
+        try:
+            while True:
+                header = await self.reader.readexactly(FRAME.size)
+                length, kind = FRAME.unpack(header)
+                body = await self.reader.readexactly(length)
+                self.bytes_received += FRAME.size + length
+                self.receive(kind, memoryview(body))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+
+    def receive(self, kind: int, view: memoryview) -> None:
+        self.tick, applied = TICK.unpack_from(view)
+        if kind == KEYFRAME:
+            self._apply_keyframe(view, TICK.size)
+        elif kind == DELTA:
+            self._apply_delta(view, TICK.size)
+        self.received_at = perf_counter()
+
+        for sequence in [sequence for sequence in self.sent
+                         if sequence <= applied]:
+            self.latencies.append(self.received_at
+                                  - self.sent.pop(sequence))
+        if self.on_tick is not None:
+            self.on_tick(self)
+
+    def _apply_keyframe(self, view: memoryview, offset: int) -> None:
+        (count,) = COUNT.unpack_from(view, offset)
+        offset += COUNT.size
+        ids = np.frombuffer(view, ID, count, offset).tolist()
+        offset += count * ID.itemsize
+        self.game.load_state(view[offset:])
+        self.projectiles = dict(zip(ids, chain(self.bullets,
+                                               self.aliens.bombs)))
+        self.fleet_dx = self.aliens.step_dx
+        self.keyframes += 1
+
+    def _apply_delta(self, view: memoryview, offset: int) -> None:
+        """Step the mirror as the server's last tick stepped the match"""
+        ai_settings = self.ai_settings
+        ship = self.ship
+        aliens = self.aliens
+        dt = self.game.step_time
+        (flags,) = FLAGS.unpack_from(view, offset)
+        offset += FLAGS.size
+
+        if flags & HELD:
+            self.stats.advance_respawn(dt)
+        if flags & STEPPED:
+            ship.previous_center = ship.center
+            if flags & SHIP:
+                (ship.center,) = DOUBLE.unpack_from(view, offset)
+                offset += DOUBLE.size
+            ship.left = to_pixel(ship.center) - ship.width // 2
+            self.bullets.update(dt)
+            aliens.bombs.update(dt)
+
+            if flags & FLEET_DX:
+                (self.fleet_dx,) = DOUBLE.unpack_from(view, offset)
+                offset += DOUBLE.size
+            step_dy = 0.0
+            if flags & FLEET_DY:
+                (step_dy,) = DOUBLE.unpack_from(view, offset)
+                offset += DOUBLE.size
+            aliens.step_dx = self.fleet_dx
+            aliens.step_dy = step_dy
+            aliens.x[:aliens.size] += self.fleet_dx
+            if step_dy:
+                aliens.y[:aliens.size] += step_dy
+        if flags & SCORE:
+            (self.stats.score,) = SCORE_FIELD.unpack_from(view, offset)
+            offset += SCORE_FIELD.size
+
+        if flags & KILLS:
+            (count,) = COUNT.unpack_from(view, offset)
+            offset += COUNT.size
+            aliens.kill(np.frombuffer(view, INDEX, count, offset))
+            offset += count * INDEX.itemsize
+        if flags & REMOVALS:
+            (count,) = COUNT.unpack_from(view, offset)
+            offset += COUNT.size
+            for number in np.frombuffer(view, ID, count, offset).tolist():
+                projectile = self.projectiles.pop(number, None)
+                if projectile is not None:
+                    projectile.kill()
+            offset += count * ID.itemsize
+        if flags & SPAWNS:
+            (count,) = COUNT.unpack_from(view, offset)
+            offset += COUNT.size
+            for _ in range(count):
+                number, bomb, left, y = SPAWN.unpack_from(view, offset)
+                offset += SPAWN.size
+                pool = aliens.bombs if bomb else self.bullets
+                projectile = pool.take()
+                projectile.left = left
+                projectile.y = projectile.previous_y = y
+                projectile.top = to_pixel(y)
+                projectile.speed_factor = (-ai_settings.bomb_speed_factor
+                                           if bomb else
+                                           ai_settings.bullet_speed_factor)
+                self.projectiles[number] = projectile
+
+
+def state_digest(game) -> int:
+    """CRC-32 over the state clients mirror, to check them by"""
+    stats = game.stats
+    aliens = game.aliens
+    crc = zlib.crc32(struct.pack(
+        '<qiid?dii', stats.score, stats.level, stats.ships_left,
+        stats.respawn_time_left, stats.game_active, game.ship.center,
+        game.ship.left, game.ship.top))
+    for array in (aliens.x, aliens.y, aliens.alive):
+        crc = zlib.crc32(array[:aliens.size].tobytes(), crc)
+    for projectile in chain(game.bullets, aliens.bombs):
+        crc = zlib.crc32(struct.pack('<iid', projectile.left,
+                                     projectile.top, projectile.y), crc)
+    return crc
+
+
+def play(client: NetClient) -> None:
+    """Let the autopilot play from a client's mirror"""
+    autopilot(client)
+    client.send_input(client.ship.moving_left, client.ship.moving_right)
+
+
+async def run_local(ai_settings: Settings, clients: int, players: int,
+                    seconds: float) -> int:
+    """
+    A server and headless clients on localhost: players of them play,
+    the rest watch. Afterwards every client's mirror is checked against
+    the server's state, and traffic and latency are reported.
+    """
+    server = GameServer(ai_settings, port=0)
+    port = await server.start()
+    net_clients = []
+    for number in range(clients):
+        client = NetClient(_copy_settings(ai_settings))
+        await client.connect('127.0.0.1', port)
+        if number < players:
+            client.on_tick = play
+        net_clients.append(client)
+    tasks = [asyncio.ensure_future(client.run()) for client in net_clients]
+
+    # Let every client be accepted before the first tick
+    while len(server.connections) < clients:
+        await asyncio.sleep(0.001)
+    await server.run(int(seconds * ai_settings.simulation_rate))
+    for _ in range(1000):
+        if all(client.tick == server.tick for client in net_clients):
+            break
+        await asyncio.sleep(0.001)
+
+    expected = state_digest(server.game)
+    mismatched = sum(state_digest(client.game) != expected
+                     for client in net_clients)
+    print('server:', server.report())
+    print('score {}, level {}, ships left {}'.format(
+        server.game.stats.score, server.game.stats.level,
+        server.game.stats.ships_left))
+    latencies = np.array([latency for client in net_clients
+                          for latency in client.latencies]) * 1000
+    if len(latencies):
+        print('input latency over {:,} inputs: mean {:.2f} ms, p50 {:.2f} '
+              'ms, p99 {:.2f} ms'.format(
+                  len(latencies), latencies.mean(),
+                  np.percentile(latencies, 50),
+                  np.percentile(latencies, 99)))
+    print('{} of {} clients match the server'.format(
+        clients - mismatched, clients))
+
+    await server.close()
+    for client in net_clients:
+        client.close()
+    await asyncio.gather(*tasks)
+    return 1 if mismatched else 0
+
+
+def _copy_settings(ai_settings: Settings) -> Settings:
+    """A client's own Settings, as keyframes overwrite them"""
+    copy = Settings()
+    copy.__dict__.update(ai_settings.__dict__)
+    return copy
+
+
+async def serve(ai_settings: Settings, host: str, port: int,
+                report_interval: float) -> None:
+    server = GameServer(ai_settings, host, port)
+    port = await server.start()
+    print('Serving on {}:{}'.format(host, port))
+    run = asyncio.ensure_future(server.run())
+    try:
+        while not run.done():
+            await asyncio.sleep(report_interval)
+            print(server.report())
+    finally:
+        await server.close()
+
+
+async def watch(ai_settings: Settings, host: str, port: int) -> None:
+    """Join a match in a window, with the arrow keys and Space to play"""
+    # Only clients with a window need pygame; the server never does
+    import pygame
+    import game_functions as gf
+    from headless import HeadlessGame
+
+    # Bring up the real display before HeadlessGame would pick the
+    # dummy driver
+    pygame.display.init()
+    game = HeadlessGame(ai_settings)
+    pygame.display.set_caption('Alien Invasion')
+    client = NetClient(ai_settings, game)
+    shown = [game.stats.score]
+
+    def refresh(client: NetClient) -> None:
+        # Keyframes re-render the whole scoreboard; deltas only score
+        if game.stats.score != shown[0]:
+            game.scoreboard.prep_score()
+            gf.check_high_score(game.stats, game.scoreboard)
+        shown[0] = game.stats.score
+
+    client.on_tick = refresh
+    await client.connect(host, port)
+    reader = asyncio.ensure_future(client.run())
+    moving_left = moving_right = False
+    try:
+        while not reader.done():
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    return
+                elif event.type in (pygame.KEYDOWN, pygame.KEYUP):
+                    pressed = event.type == pygame.KEYDOWN
+                    if event.key == pygame.K_LEFT:
+                        moving_left = pressed
+                    elif event.key == pygame.K_RIGHT:
+                        moving_right = pressed
+                    elif event.key == pygame.K_SPACE and pressed:
+                        client.fire()
+                    elif event.key == pygame.K_q:
+                        return
+            client.send_input(moving_left, moving_right)
+
+            running = game.stats.game_active and not game.stats.game_paused
+            alpha = (min(1.0, (perf_counter() - client.received_at)
+                         / game.step_time) if running else 1.0)
+            game.render(alpha)
+            await asyncio.sleep(1.0 / ai_settings.max_fps)
+    finally:
+        client.close()
+        await reader
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description='Play one match over the LAN')
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve_parser = commands.add_parser('serve', help='Run a match')
+    serve_parser.add_argument('--host', default='0.0.0.0')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument('--report-interval', type=float, default=10,
+                              help='Seconds between traffic reports')
+    join_parser = commands.add_parser('join', help='Join a match')
+    join_parser.add_argument('host')
+    join_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    local_parser = commands.add_parser(
+        'local', help='Test a server and headless clients on localhost')
+    local_parser.add_argument('--clients', type=int, default=4)
+    local_parser.add_argument('--players', type=int, default=1,
+                              help='Clients that play; the rest watch')
+    local_parser.add_argument('--seconds', type=float, default=10)
+    for command in (serve_parser, local_parser):
+        command.add_argument('--seed', type=int,
+                             help='Seed for the bombs, for repeatable runs')
+    args = parser.parse_args()
+
+    ai_settings = Settings()
+    if args.command == 'join':
+        asyncio.run(watch(ai_settings, args.host, args.port))
+        return 0
+    ai_settings.random_seed = args.seed
+    if args.command == 'serve':
+        try:
+            asyncio.run(serve(ai_settings, args.host, args.port,
+                              args.report_interval))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    return asyncio.run(run_local(ai_settings, args.clients, args.players,
+                                 args.seconds))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""
+Run the simulation on its own thread, apart from drawing.
+
+In pipelined mode a SimulationThread steps the game's pygame-free
+bodies at the simulation rate, and after every step copies what a
+frame needs into the back half of a RenderBuffers pair and swaps it to
+the front. The render thread, the one that owns the window, brings its
+sprites and scoreboard up to the front state and draws them. A slow
+blit or flip then delays only drawing, never a step or input, and while
+pygame blits and flips with the GIL released the simulation can run on
+a second core.
+
+Input still arrives on the render thread, which pygame requires; key
+presses and clicks are passed to the simulation thread and handled at
+its next step by the same game_functions handlers the serial loop
+uses, stamped with that step for recording.
+"""
+import queue
+import sys
+import threading
+from collections import deque
+from time import perf_counter, sleep
+from typing import Deque, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pygame
+from pygame.event import Event
+
+import game_functions as gf
+import simulation as sim
+from bullet import BulletPool
+from button import Button
+from fleet import Fleet
+from game_stats import GameStats
+from replay import InputRecorder, state_checksum
+from scoreboard import Scoreboard
+from settings import Settings
+from ship import Ship
+
+# Events the simulation thread handles; the render thread keeps the rest
+SIMULATION_EVENTS = (pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN)
+
+
+class RenderState():
+    """
+    What a frame is drawn from, copied out of the simulation after a
+    step: plain numbers and arrays, so drawing never reads the
+    simulation's own objects. Arrays are grown as needed and reused.
+    """
+
+    def __init__(self) -> None:
+        self.tick = -1
+        self.published = 0.0
+        self.game_active = False
+        self.game_paused = False
+        self.score = 0
+        self.level = 1
+        self.ships_left = 0
+        self.respawn_time_left = 0.0
+        # center, center before the last step, left and top
+        self.ship = (0.0, 0.0, 0, 0)
+
+        self.fleet_size = 0
+        self.x = np.zeros(0, dtype=np.float64)
+        self.y = np.zeros(0, dtype=np.float64)
+        self.alive = np.zeros(0, dtype=bool)
+        self.column = np.zeros(0, dtype=np.int32)
+        self.row = np.zeros(0, dtype=np.int32)
+        self.front = np.zeros(0, dtype=np.int64)
+        self.fleet_motion = (0.0, 0.0, 0.0, 0.0, 0.0)
+
+        # left, top, y and y before the last step of each projectile
+        self.bullets: List[tuple] = []
+        self.bombs: List[tuple] = []
+
+    def capture(self, tick: int, stats: GameStats, ship: sim.ShipBody,
+                aliens: sim.FleetBody, bullets: sim.ProjectilePool) -> None:
+        self.tick = tick
+        self.game_active = stats.game_active
+        self.game_paused = stats.game_paused
+        self.score = stats.score
+        self.level = stats.level
+        self.ships_left = stats.ships_left
+        self.respawn_time_left = stats.respawn_time_left
+        self.ship = (ship.center, ship.previous_center, ship.left, ship.top)
+
+        size = aliens.size
+        if len(self.x) < size:
+            capacity = max(size, 2 * len(self.x))
+            self.x = np.zeros(capacity, dtype=np.float64)
+            self.y = np.zeros(capacity, dtype=np.float64)
+            self.alive = np.zeros(capacity, dtype=bool)
+            self.column = np.zeros(capacity, dtype=np.int32)
+            self.row = np.zeros(capacity, dtype=np.int32)
+        for name in ('x', 'y', 'alive', 'column', 'row'):
+            getattr(self, name)[:size] = getattr(aliens, name)[:size]
+        self.fleet_size = size
+        if len(self.front) != len(aliens.front):
+            self.front = aliens.front.copy()
+        else:
+            self.front[:] = aliens.front
+        self.fleet_motion = aliens.motion()
+
+        self.bullets = [(bullet.left, bullet.top, bullet.y,
+                         bullet.previous_y) for bullet in bullets]
+        self.bombs = [(bomb.left, bomb.top, bomb.y, bomb.previous_y)
+                      for bomb in aliens.bombs]
+        self.published = perf_counter()
+
+
+class RenderBuffers():
+    """
+    A pair of RenderStates. The simulation fills the back one while the
+    render thread reads the front one, then publish() swaps them; the
+    lock keeps a swap from happening mid-read, so a published state is
+    never written to while it is read.
+    """
+
+    def __init__(self) -> None:
+        self.states = [RenderState(), RenderState()]
+        self.front_index = 0
+        self.lock = threading.Lock()
+
+    @property
+    def back(self) -> RenderState:
+        return self.states[1 - self.front_index]
+
+    @property
+    def front(self) -> RenderState:
+        """The latest published state; read it holding lock"""
+        return self.states[self.front_index]
+
+    def publish(self) -> None:
+        with self.lock:
+            self.front_index = 1 - self.front_index
+
+
+class QueuedScoreboard():
+    """
+    Stands in for the Scoreboard when the game_functions handlers run on
+    the simulation thread. Each call is queued, stamped with the step
+    it was made in, for the render thread to make on the real
+    Scoreboard once it shows that step.
+    """
+
+    def __init__(self) -> None:
+        # Appends and pops at either end of a deque are thread-safe
+        self.calls: Deque[Tuple[int, str]] = deque()
+        # The step being handled, set by the simulation thread
+        self.tick = 0
+
+    def reset(self) -> None:
+        self.calls.append((self.tick, 'reset'))
+
+
+class SimulationThread(threading.Thread):
+    """
+    Steps the game at the simulation rate, handling the events passed
+    in through events before each step and publishing a RenderState
+    after it. An error stops the thread and is kept in error, for
+    Pipeline to raise on the render thread.
+    """
+
+    def __init__(self, ai_settings: Settings, stats: GameStats,
+                 ship: sim.ShipBody, aliens: sim.FleetBody,
+                 bullets: sim.ProjectilePool, play_button: Button,
+                 buffers: RenderBuffers,
+                 recorder: Optional[InputRecorder] = None) -> None:
+        super(SimulationThread, self).__init__(name='simulation',
+                                               daemon=True)
+        self.ai_settings = ai_settings
+        self.stats = stats
+        self.ship = ship
+        self.aliens = aliens
+        self.bullets = bullets
+        # Only its rect is read, which never changes
+        self.play_button = play_button
+        self.scoreboard = QueuedScoreboard()
+        self.buffers = buffers
+        self.recorder = recorder
+        self.events: queue.SimpleQueue = queue.SimpleQueue()
+        self.running = True
+        self.error: Optional[BaseException] = None
+        # Simulation steps taken, which stamp recorded input
+        self.tick = 0
+        # When set to a list, the time each step started is appended
+        self.step_times: Optional[List[float]] = None
+
+    def run(self) -> None:
+        try:
+            self._run()
+        except BaseException as error:
+            self.error = error
+
+    def _run(self) -> None:
+        ai_settings = self.ai_settings
+        stats = self.stats
+        step = 1.0 / ai_settings.simulation_rate
+        self._publish()
+        next_step = perf_counter()
+        while self.running:
+            if self.step_times is not None:
+                self.step_times.append(perf_counter())
+            events = []
+            while not self.events.empty():
+                events.append(self.events.get())
+            if self.recorder:
+                self.recorder.record_events(self.tick, events)
+            # Nothing on this thread draws, so there is no screen
+            self.scoreboard.tick = self.tick
+            gf.check_events(ai_settings, stats, self.scoreboard, None,
+                            self.play_button, self.ship, self.aliens,
+                            self.bullets, events)
+
+            if stats.game_active and not stats.game_paused:
+                sim.update_game(ai_settings, stats, self.ship, self.aliens,
+                                self.bullets, step)
+            self.tick += 1
+            if (self.recorder
+                    and self.tick % self.recorder.checksum_interval == 0):
+                self.recorder.record_checksum(self.tick, state_checksum(
+                    ai_settings, stats, self.ship, self.aliens,
+                    self.bullets))
+            self._publish()
+
+            next_step += step
+            delay = next_step - perf_counter()
+            if delay > 0:
+                sleep(delay)
+            elif delay < -ai_settings.max_frame_time:
+                # Too far behind to catch up; carry on from now
+                next_step = perf_counter()
+
+    def _publish(self) -> None:
+        self.buffers.back.capture(self.tick, self.stats, self.ship,
+                                  self.aliens, self.bullets)
+        self.buffers.publish()
+
+
+class Pipeline():
+    """
+    The render thread's side of pipelined mode. The game's Ship, Fleet,
+    BulletPool, GameStats and Scoreboard become views, brought up to the
+    latest published state by sync(); the simulation runs on bodies of
+    its own, on a SimulationThread started by start().
+    """
+
+    def __init__(self, ai_settings: Settings, stats: GameStats,
+                 scoreboard: Scoreboard, play_button: Button, ship: Ship,
+                 aliens: Fleet, bullets: BulletPool) -> None:
+        self.ai_settings = ai_settings
+        self.view_stats = stats
+        self.scoreboard = scoreboard
+        self.view_ship = ship
+        self.view_aliens = aliens
+        self.view_bullets = bullets
+        self.play_button = play_button
+
+        world = sim.World(ai_settings.screen_width,
+                          ai_settings.screen_height)
+        self.stats = GameStats(ai_settings)
+        self.ship = sim.ShipBody(ai_settings, world, ship.width,
+                                 ship.height, ship.shape)
+        self.aliens = sim.FleetBody(
+            ai_settings, world, aliens.width, aliens.height,
+            aliens.shape if aliens.pixel_perfect else None)
+        self.bullets = sim.ProjectilePool(ai_settings, world)
+        sim.create_fleet(ai_settings, self.ship, self.aliens)
+
+        self.buffers = RenderBuffers()
+        self.thread: Optional[SimulationThread] = None
+        self.shown_tick = -1
+        self.published = 0.0
+
+    @property
+    def tick(self) -> int:
+        return self.thread.tick if self.thread else 0
+
+    def start(self, recorder: Optional[InputRecorder] = None) -> None:
+        self.thread = SimulationThread(
+            self.ai_settings, self.stats, self.ship, self.aliens,
+            self.bullets, self.play_button, self.buffers, recorder)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """Stop the simulation thread, and wait for it to finish"""
+        if self.thread and self.thread.is_alive():
+            self.thread.running = False
+            self.thread.join()
+
+    def handle_events(self, events: Iterable[Event], renderer=None) -> None:
+        """
+        Quit, exposes and the performance overlay are handled here;
+        everything else goes to the simulation thread
+        """
+        for event in events:
+            if event.type == pygame.QUIT:
+                sys.exit()
+            elif event.type in gf.EXPOSE_EVENTS:
+                if renderer is not None:
+                    renderer.invalidate()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_q:
+                sys.exit()
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.view_stats.perf_hud_visible = (
+                    not self.view_stats.perf_hud_visible)
+            elif event.type in SIMULATION_EVENTS:
+                self.thread.events.put(event)
+
+    def sync(self) -> float:
+        """
+        Bring the views up to the latest published state, and return
+        how far the clock has run into the step after it
+        """
+        if self.thread.error is not None:
+            raise self.thread.error
+        with self.buffers.lock:
+            state = self.buffers.front
+            if state.tick != self.shown_tick:
+                self._show(state)
+                self.shown_tick = state.tick
+                self.published = state.published
+            # The simulation may refill this state once the lock is let go
+            running = state.game_active and not state.game_paused
+
+        if not running:
+            return 1.0
+        step = 1.0 / self.ai_settings.simulation_rate
+        return min(1.0, (perf_counter() - self.published) / step)
+
+    def _show(self, state: RenderState) -> None:
+        stats = self.view_stats
+        score, level, ships_left = stats.score, stats.level, stats.ships_left
+        stats.score = state.score
+        stats.level = state.level
+        stats.ships_left = state.ships_left
+        stats.game_active = state.game_active
+        stats.game_paused = state.game_paused
+        stats.respawn_time_left = state.respawn_time_left
+        gf.show_changes(stats, self.scoreboard, score, level, ships_left)
+        # Make the scoreboard calls handled in the steps up to this one
+        calls = self.thread.scoreboard.calls
+        while calls and calls[0][0] < state.tick:
+            getattr(self.scoreboard, calls.popleft()[1])()
+
+        ship = self.view_ship
+        ship.center, ship.previous_center, ship.left, ship.top = state.ship
+
+        aliens = self.view_aliens
+        size = state.fleet_size
+        x = state.x[:size]
+        y = state.y[:size]
+        alive = state.alive[:size]
+        if size != aliens.size or (alive & ~aliens.alive[:size]).any():
+            # A new fleet
+            aliens.restore(x, y, alive, state.column[:size],
+                           state.row[:size], state.front,
+                           *state.fleet_motion)
+        else:
+            killed = np.flatnonzero(aliens.alive[:size] & ~alive)
+            if len(killed):
+                aliens.kill(killed)
+            aliens.x[:size] = x
+            aliens.y[:size] = y
+            aliens.step_dx, aliens.step_dy = state.fleet_motion[:2]
+
+        # After the fleet, whose restore() empties the bombs
+        for pool, projectiles in ((self.view_bullets, state.bullets),
+                                  (self.view_aliens.bombs, state.bombs)):
+            pool.empty()
+            for left, top, y, previous_y in projectiles:
+                projectile = pool.take()
+                projectile.left = left
+                projectile.top = top
+                projectile.y = y
+                projectile.previous_y = previous_y
@@ -0,0 +1,222 @@
+import csv
+import json
+from time import perf_counter
+from typing import Dict, List
+
+import numpy as np
+from pygame.surface import Surface
+
+import image_functions as img_funs
+from glyph_atlas import get_atlas
+
+PHASES = ('events', 'ship', 'bullets', 'aliens', 'render')
+EVENTS, SHIP, BULLETS, ALIENS, RENDER = range(len(PHASES))
+
+COUNTERS = ('sprites', 'collisions', 'asset_loads')
+SPRITES, COLLISIONS, ASSET_LOADS = range(len(COUNTERS))
+
+STARTUP_PHASES = ('imports', 'display', 'assets', 'objects', 'first_frame')
+IMPORTS, DISPLAY, ASSETS, OBJECTS, FIRST_FRAME = range(len(STARTUP_PHASES))
+
+
+class FrameProfiler():
+    """
+    Records how long each phase of a frame takes, plus a few per-frame
+    counters, into fixed-size ring buffers holding the last capacity
+    frames.
+    """
+
+    enabled = True
+
+    def __init__(self, capacity: int = 600) -> None:
+        self.capacity = capacity
+        self.phase_times = np.zeros((capacity, len(PHASES)))
+        self.counts = np.zeros((capacity, len(COUNTERS)), dtype=np.int64)
+        # Work done in a frame, and the wall time since the last frame
+        self.frame_times = np.zeros(capacity)
+        self.intervals = np.zeros(capacity)
+        self.frames = 0
+
+        self._phases = [0.0] * len(PHASES)
+        self._counts = [0] * len(COUNTERS)
+        self._frame_start = None
+        self._mark = 0.0
+        self._asset_loads = img_funs.cache_info().misses
+
+    def begin_frame(self) -> None:
+        now = perf_counter()
+        self._interval = (now - self._frame_start
+                          if self._frame_start is not None else 0.0)
+        self._frame_start = self._mark = now
+        self._phases = [0.0] * len(PHASES)
+        self._counts = [0] * len(COUNTERS)
+
+    def mark(self, phase: int) -> None:
+        """Charge the time since the last mark to phase"""
+        now = perf_counter()
+        self._phases[phase] += now - self._mark
+        self._mark = now
+
+    def mark_phase(self, name: str) -> None:
+        """mark() by the phase's name, as the simulation reports it"""
+        self.mark(PHASES.index(name))
+
+    def count(self, counter: int, amount: int = 1) -> None:
+        self._counts[counter] += amount
+
+    def end_frame(self) -> None:
+        asset_loads = img_funs.cache_info().misses
+        self._counts[ASSET_LOADS] += asset_loads - self._asset_loads
+        self._asset_loads = asset_loads
+
+        slot = self.frames % self.capacity
+        self.phase_times[slot] = self._phases
+        self.counts[slot] = self._counts
+        self.frame_times[slot] = self._mark - self._frame_start
+        self.intervals[slot] = self._interval
+        self.frames += 1
+
+    def _recorded(self) -> slice:
+        return slice(0, min(self.frames, self.capacity))
+
+    def summary(self) -> Dict[str, float]:
+        """FPS, frame time percentiles and mean phase times, in ms"""
+        recorded = self._recorded()
+        if not self.frames:
+            return {}
+        intervals = self.intervals[recorded]
+        intervals = intervals[intervals > 0]
+        frame_times = self.frame_times[recorded] * 1000
+        summary = {
+            'fps': 1.0 / intervals.mean() if len(intervals) else 0.0,
+            'p50_ms': float(np.percentile(frame_times, 50)),
+            'p99_ms': float(np.percentile(frame_times, 99)),
+        }
+        means = self.phase_times[recorded].mean(axis=0) * 1000
+        for name, mean in zip(PHASES, means.tolist()):
+            summary[name + '_ms'] = mean
+        return summary
+
+    def rows(self) -> List[Dict[str, float]]:
+        """Recorded frames, oldest first"""
+        recorded = self._recorded()
+        start = self.frames - (recorded.stop - recorded.start)
+        rows = []
+        for frame in range(start, self.frames):
+            slot = frame % self.capacity
+            row = {'frame': frame,
+                   'frame_ms': self.frame_times[slot] * 1000,
+                   'interval_ms': self.intervals[slot] * 1000}
+            for name, value in zip(PHASES, self.phase_times[slot]):
+                row[name + '_ms'] = float(value) * 1000
+            for name, value in zip(COUNTERS, self.counts[slot]):
+                row[name] = int(value)
+            rows.append(row)
+        return rows
+
+    def dump(self, filename: str) -> None:
+        """Write the recorded frames to a .json or .csv file"""
+        rows = self.rows()
+        if filename.endswith('.json'):
+            with open(filename, 'w') as output:
+                json.dump({'summary': self.summary(), 'frames': rows},
+                          output, indent=1)
+        else:
+            with open(filename, 'w', newline='') as output:
+                writer = csv.DictWriter(output, fieldnames=list(rows[0])
+                                        if rows else ['frame'])
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+class NullProfiler():
+    """Stand-in used when profiling is off; every call does nothing"""
+
+    enabled = False
+
+    def begin_frame(self) -> None:
+        pass
+
+    def mark(self, phase: int) -> None:
+        pass
+
+    def count(self, counter: int, amount: int = 1) -> None:
+        pass
+
+    def end_frame(self) -> None:
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class StartupTimer():
+    """
+    Splits the time from launch to the first frame on screen into the
+    phases of starting up. start is the perf_counter() reading taken
+    at launch, before the imports.
+    """
+
+    def __init__(self, start: float) -> None:
+        self.times = [0.0] * len(STARTUP_PHASES)
+        self._mark = start
+        self.total = 0.0
+
+    def mark(self, phase: int) -> None:
+        """Charge the time since the last mark to phase"""
+        now = perf_counter()
+        self.times[phase] += now - self._mark
+        self.total += now - self._mark
+        self._mark = now
+
+    def report(self) -> str:
+        lines = ['Time to first frame: {:.1f} ms'.format(self.total * 1000)]
+        for name, seconds in zip(STARTUP_PHASES, self.times):
+            lines.append('  {:<12} {:7.1f} ms'.format(name, seconds * 1000))
+        return '\n'.join(lines)
+
+
+class PerfHud():
+    """
+    On-screen overlay with FPS, p50/p99 frame time and a bar per phase.
+    The text is refreshed a few times a second rather than every frame.
+    """
+
+    bar_colors = ((230, 230, 60), (60, 200, 60), (60, 60, 230),
+                  (230, 60, 60), (200, 60, 200))
+
+    def __init__(self, profiler: FrameProfiler, screen: Surface,
+                 font) -> None:
+        self.profiler = profiler
+        self.atlas = get_atlas(font, (255, 255, 255), (0, 0, 0))
+        self.left = 10
+        self.top = screen.get_rect().bottom - 120
+        # Bars are drawn at this many pixels per millisecond
+        self.scale = 20
+        self.refresh_frames = 15
+        self._last_refresh = -self.refresh_frames
+        self._items = []
+
+    def draw_list(self) -> list:
+        if self.profiler.frames - self._last_refresh >= self.refresh_frames:
+            self._last_refresh = self.profiler.frames
+            self._items = self._build()
+        return self._items
+
+    def _build(self) -> list:
+        summary = self.profiler.summary()
+        if not summary:
+            return []
+        text = self.atlas.render(
+            'FPS {fps:.0f}  p50 {p50_ms:.2f}ms  p99 {p99_ms:.2f}ms'
+            .format(**summary))
+        items = [(text, (self.left, self.top) + text.get_size())]
+        top = self.top + text.get_height() + 4
+        for name, color in zip(PHASES, self.bar_colors):
+            label = self.atlas.render(name)
+            items.append((label, (self.left, top) + label.get_size()))
+            width = max(1, int(summary[name + '_ms'] * self.scale))
+            items.append((color, (self.left + 80, top + 4, width,
+                                  label.get_height() - 8)))
+            top += label.get_height()
+        return items
@@ -0,0 +1,198 @@
+from typing import TYPE_CHECKING, List, Optional, Sequence, Tuple, Union
+from weakref import WeakKeyDictionary
+
+import pygame.display
+from pygame.color import Color
+from pygame.surface import Surface
+
+from settings import Settings
+
+if TYPE_CHECKING:
+    # Imported when a TextureRenderer is built, so the surface backend
+    # never loads pygame's experimental _sdl2 module
+    from pygame._sdl2.video import Texture, Window
+
+# A draw list is a sequence of (source, rect) pairs, drawn in order.
+# A Surface source is blitted at rect's top-left; a colour fills rect.
+Source = Union[Surface, Tuple[int, ...]]
+DrawList = Sequence[Tuple[Source, Tuple[int, int, int, int]]]
+
+
+def draw_items(screen: Surface, items: DrawList) -> None:
+    """Draw a draw list onto screen"""
+    blits = []
+    for source, rect in items:
+        if isinstance(source, Surface):
+            blits.append((source, rect))
+        else:
+            if blits:
+                screen.blits(blits, doreturn=False)
+                blits = []
+            screen.fill(source, rect)
+    if blits:
+        screen.blits(blits, doreturn=False)
+
+
+class FullRenderer():
+    """Clear the whole screen, draw every item and flip"""
+
+    def __init__(self, ai_settings: Settings, screen: Surface) -> None:
+        self.screen = screen
+        self.bg_color = ai_settings.bg_color
+        # Headless games draw onto a plain Surface with nothing to flip
+        self.on_display = screen is pygame.display.get_surface()
+
+    def invalidate(self) -> None:
+        """Nothing to do; every frame is drawn in full"""
+
+    def present(self, items: DrawList) -> None:
+        self.screen.fill(self.bg_color)
+        draw_items(self.screen, items)
+        if self.on_display:
+            pygame.display.flip()
+
+
+class DirtyRenderer():
+    """
+    Only repaint the rectangles that changed since the last frame.
+    The areas covered by last frame's items and this frame's items are
+    cleared to the background, redrawn and pushed with
+    pygame.display.update(rects). A frame identical to the last one
+    costs nothing, and when more than max_dirty_fraction of the screen
+    is dirty it falls back to a full fill and flip. full_frames and
+    dirty_frames count the frames pushed each way.
+    """
+
+    def __init__(self, ai_settings: Settings, screen: Surface) -> None:
+        self.screen = screen
+        self.bg_color = ai_settings.bg_color
+        self.max_dirty_area = (ai_settings.max_dirty_fraction
+                               * screen.get_width() * screen.get_height())
+        self.on_display = screen is pygame.display.get_surface()
+        self._last_frame: List = None
+        self.full_frames = self.dirty_frames = 0
+
+    def invalidate(self) -> None:
+        """Repaint the whole screen next frame, e.g. after an expose"""
+        self._last_frame = None
+
+    def present(self, items: DrawList) -> None:
+        frame = [(source, tuple(rect)) for source, rect in items]
+        if frame == self._last_frame:
+            # Paused, or waiting on the Play screen: nothing to push
+            return
+
+        if self._last_frame is None:
+            dirty = None
+        else:
+            dirty = [rect for _, rect in self._last_frame]
+            dirty.extend(rect for _, rect in frame)
+            area = sum(rect[2] * rect[3] for rect in dirty)
+            if area > self.max_dirty_area:
+                dirty = None
+        self._last_frame = frame
+
+        screen = self.screen
+        if dirty is None:
+            self.full_frames += 1
+            screen.fill(self.bg_color)
+            draw_items(screen, frame)
+            if self.on_display:
+                pygame.display.flip()
+        else:
+            self.dirty_frames += 1
+            for rect in dirty:
+                screen.fill(self.bg_color, rect)
+            draw_items(screen, frame)
+            if self.on_display:
+                pygame.display.update(dirty)
+
+
+class TextureRenderer():
+    """
+    Draw through an SDL renderer instead of software blits. Each image
+    is uploaded as a texture the first time it is drawn and kept for as
+    long as its Surface lives, so a frame only sends draw calls: one
+    copy per image and, for each run of same-coloured fills such as the
+    bullets, one draw colour and a fill per rect.
+
+    SDL picks the best renderer the window supports, falling back to
+    its software renderer where there is no GPU. Without a window, e.g.
+    for headless games, the renderer draws on a hidden one. Each frame
+    is read back into screen when copy_to_screen is set, which it is
+    without a window, so captures and checks still see the frame.
+    """
+
+    def __init__(self, ai_settings: Settings, screen: Surface,
+                 window: Optional['Window'] = None) -> None:
+        from pygame._sdl2.video import Renderer, Texture, Window
+        self.screen = screen
+        if window is None:
+            window = Window(size=screen.get_size(), hidden=True)
+            self.copy_to_screen = True
+        else:
+            self.copy_to_screen = False
+        self.window = window
+        self.renderer = Renderer(window, vsync=ai_settings.vsync)
+        self.upload = Texture.from_surface
+        self.bg_color = Color(ai_settings.bg_color)
+        self._textures: WeakKeyDictionary = WeakKeyDictionary()
+        self._last_frame: List = None
+
+    def invalidate(self) -> None:
+        """Redraw next frame even if nothing changed"""
+        self._last_frame = None
+
+    def texture(self, image: Surface) -> 'Texture':
+        """The texture uploaded for image, uploading it the first time"""
+        texture = self._textures.get(image)
+        if texture is None:
+            texture = self.upload(self.renderer, image)
+            self._textures[image] = texture
+        return texture
+
+    def present(self, items: DrawList) -> None:
+        frame = [(source, tuple(rect)) for source, rect in items]
+        if frame == self._last_frame:
+            # The last frame is still showing
+            return
+        self._last_frame = frame
+
+        renderer = self.renderer
+        renderer.draw_color = self.bg_color
+        renderer.clear()
+        fill_color = None
+        for source, rect in frame:
+            if isinstance(source, Surface):
+                self.texture(source).draw(dstrect=rect)
+                fill_color = None
+            else:
+                if source != fill_color:
+                    renderer.draw_color = Color(source)
+                    fill_color = source
+                renderer.fill_rect(rect)
+        if self.copy_to_screen:
+            renderer.to_surface(self.screen)
+        renderer.present()
+
+
+def create_renderer(ai_settings: Settings, screen: Surface,
+                    window: Optional['Window'] = None):
+    """
+    Build the renderer selected by ai_settings.render_backend and, for
+    the surface backend, ai_settings.render_mode. window is the window
+    the texture backend draws to.
+    """
+    if ai_settings.render_backend == 'texture':
+        return TextureRenderer(ai_settings, screen, window)
+    if ai_settings.render_backend != 'surface':
+        raise ValueError("Unknown render backend {!r}, expected 'surface' "
+                         "or 'texture'".format(ai_settings.render_backend))
+    renderers = {'full': FullRenderer, 'dirty': DirtyRenderer}
+    try:
+        renderer_class = renderers[ai_settings.render_mode]
+    except KeyError:
+        raise ValueError('Unknown render mode {!r}, expected one of {}'
+                         .format(ai_settings.render_mode,
+                                 ', '.join(renderers)))
+    return renderer_class(ai_settings, screen)
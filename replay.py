@@ -0,0 +1,184 @@
+"""
+Record a session's input per simulation tick, and replay it headless.
+
+A log is a fixed header followed by fixed-size records, each stamped
+with the simulation tick it happened on: key presses and releases,
+Play button clicks, periodic state checksums and an end marker.
+Because the simulation runs on a fixed timestep, feeding the same
+input back on the same ticks reproduces the session exactly, and the
+checksums prove that it did.
+
+Replay a log as fast as the CPU allows:
+    python replay.py session.rec
+"""
+import argparse
+import struct
+import sys
+import zlib
+from time import perf_counter
+from typing import Dict, Iterable, List, Tuple
+
+import pygame
+from pygame.event import Event
+
+from bullet import BulletPool
+from fleet import Fleet
+from game_stats import GameStats
+from headless import HeadlessGame
+from settings import Settings
+from ship import Ship
+
+MAGIC = b'AIRP'
+VERSION = 2
+# magic, version, simulation rate, screen width, screen height, and
+# the seed the fleet's bombs were drawn with
+HEADER = struct.Struct('<4sHHHHQ')
+# tick, kind, then a key code or x, and a y
+RECORD = struct.Struct('<IBIi')
+KEY_DOWN, KEY_UP, CLICK, CHECKSUM, END = range(5)
+
+
+def state_checksum(ai_settings: Settings, stats: GameStats, ship: Ship,
+                   aliens: Fleet, bullets: BulletPool) -> int:
+    """CRC-32 over everything the simulation steps forward"""
+    crc = zlib.crc32(struct.pack(
+        '<qiiBBddddddd', stats.score, stats.level, stats.ships_left,
+        stats.game_active, stats.game_paused, stats.respawn_time_left,
+        ship.center, ai_settings.fleet_direction,
+        ai_settings.ship_speed_factor, ai_settings.bullet_speed_factor,
+        ai_settings.alien_speed_factor, ai_settings.alien_points))
+    size = aliens.size
+    for array in (aliens.x, aliens.y, aliens.alive):
+        crc = zlib.crc32(array[:size].tobytes(), crc)
+    for bullet in bullets:
+        crc = zlib.crc32(struct.pack('<id', bullet.left, bullet.y), crc)
+    for bomb in aliens.bombs:
+        crc = zlib.crc32(struct.pack('<id', bomb.left, bomb.y), crc)
+    return crc
+
+
+class InputRecorder():
+    """Append input events and checksums to a log as they happen"""
+
+    def __init__(self, filename: str, ai_settings: Settings,
+                 seed: int) -> None:
+        self.output = open(filename, 'wb')
+        self.output.write(HEADER.pack(
+            MAGIC, VERSION, ai_settings.simulation_rate,
+            ai_settings.screen_width, ai_settings.screen_height, seed))
+        self.checksum_interval = ai_settings.record_checksum_interval
+
+    def record_events(self, tick: int, events: Iterable[Event]) -> None:
+        for event in events:
+            if event.type == pygame.KEYDOWN and event.key != pygame.K_q:
+                self.output.write(RECORD.pack(tick, KEY_DOWN, event.key, 0))
+            elif event.type == pygame.KEYUP:
+                self.output.write(RECORD.pack(tick, KEY_UP, event.key, 0))
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                x, y = event.pos
+                self.output.write(RECORD.pack(tick, CLICK, x, y))
+
+    def record_checksum(self, tick: int, checksum: int) -> None:
+        self.output.write(RECORD.pack(tick, CHECKSUM, checksum, 0))
+
+    def close(self, tick: int) -> None:
+        self.output.write(RECORD.pack(tick, END, 0, 0))
+        self.output.close()
+
+
+def read_log(filename: str) -> Tuple[Dict[str, int],
+                                     List[Tuple[int, int, int, int]]]:
+    """Return a log's header fields and its (tick, kind, a, b) records"""
+    with open(filename, 'rb') as log:
+        data = log.read()
+    magic, version, rate, width, height, seed = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('{} is not a version {} input log'.format(
+            filename, VERSION))
+    header = {'simulation_rate': rate, 'screen_width': width,
+              'screen_height': height, 'random_seed': seed}
+    records = list(RECORD.iter_unpack(data[HEADER.size:]))
+    return header, records
+
+
+def replay(filename: str, render: bool = False) -> Dict:
+    """
+    Feed a log back through the game's event handlers, stepping the
+    simulation as fast as possible, and check every recorded checksum.
+    """
+    header, records = read_log(filename)
+    ai_settings = Settings()
+    for name, value in header.items():
+        setattr(ai_settings, name, value)
+    game = HeadlessGame(ai_settings, display=render)
+
+    tick = 0
+    checksums = mismatches = 0
+    first_mismatch = None
+    start = perf_counter()
+    for record_tick, kind, a, b in records:
+        while tick < record_tick:
+            game.step()
+            tick += 1
+            if render:
+                game.render()
+
+        if kind == KEY_DOWN:
+            game.handle_events([Event(pygame.KEYDOWN, key=a)])
+        elif kind == KEY_UP:
+            game.handle_events([Event(pygame.KEYUP, key=a)])
+        elif kind == CLICK:
+            game.handle_events([Event(pygame.MOUSEBUTTONDOWN,
+                                      pos=(a, b), button=1)])
+        elif kind == CHECKSUM:
+            checksums += 1
+            checksum = state_checksum(game.ai_settings, game.stats,
+                                      game.ship, game.aliens, game.bullets)
+            if checksum != a:
+                mismatches += 1
+                if first_mismatch is None:
+                    first_mismatch = tick
+        elif kind == END:
+            break
+    seconds = perf_counter() - start
+
+    return {'ticks': tick,
+            'seconds': seconds,
+            'ticks_per_second': tick / seconds if seconds else 0.0,
+            'speedup': (tick / ai_settings.simulation_rate / seconds
+                        if seconds else 0.0),
+            'checksums': checksums,
+            'mismatches': mismatches,
+            'first_mismatch_tick': first_mismatch,
+            'score': game.stats.score,
+            'level': game.stats.level}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description='Replay a recorded Alien Invaders session headless')
+    parser.add_argument('log', nargs='+', help='Input log(s) to replay')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='Replay each log this many times')
+    parser.add_argument('--render', action='store_true',
+                        help='Also draw every tick (still headless)')
+    args = parser.parse_args()
+
+    failed = False
+    for filename in args.log:
+        for _ in range(args.repeat):
+            result = replay(filename, args.render)
+            print('{}: {ticks} ticks in {seconds:.3f}s '
+                  '({ticks_per_second:,.0f} ticks/s, {speedup:.0f}x real '
+                  'time), score {score}, level {level}, '
+                  '{checksums} checksums, {mismatches} mismatches'
+                  .format(filename, **result))
+            if result['mismatches']:
+                failed = True
+                print('  first mismatch at tick',
+                      result['first_mismatch_tick'])
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,11 +1,13 @@
-import pygame.font
-from pygame.sprite import Group
+import string
+
+from pygame.sprite import Group, Sprite
 from pygame.surface import Surface
 
 import image_functions as img_funs
 from game_stats import GameStats
+from glyph_atlas import get_atlas, get_font
 from settings import Settings
-from ship import Ship
+from ship import SHIP_IMAGE
 
 
 class Scoreboard():
@@ -18,7 +20,11 @@ class Scoreboard():
         self.stats = stats
 
         self.text_color = (30, 30, 30)
-        self.font = pygame.font.SysFont(None, 48)
+        self.font = get_font(48, ai_settings.font_file)
+        # Numbers are composed from cached glyphs instead of FreeType
+        self.atlas = get_atlas(self.font, self.text_color,
+                               self.ai_settings.bg_color)
+        self.atlas.preload(string.digits + ',')
 
         self.reset()
 
@@ -33,8 +39,7 @@ class Scoreboard():
         """Turn score into a rendered image"""
         rounded_score: int = round(self.stats.score, -1)
         score_str: str = "{:,}".format(rounded_score)
-        self.score_image = self.font.render(score_str, True,
-                                            self.text_color, self.ai_settings.bg_color)
+        self.score_image = self.atlas.render(score_str)
 
         # Display the score at the top right corner of the screen
         self.score_rect = self.score_image.get_rect()
@@ -45,9 +50,7 @@ class Scoreboard():
         """Turn high score into an image"""
         rounded_high_score: int = round(self.stats.high_score, -1)
         high_score_str = "{:,}".format(rounded_high_score)
-        self.high_score_image = self.font.render(high_score_str, True,
-                                                 self.text_color,
-                                                 self.ai_settings.bg_color)
+        self.high_score_image = self.atlas.render(high_score_str)
 
         # Center high score at top of screen
         self.high_score_rect = self.high_score_image.get_rect()
@@ -56,9 +59,7 @@ class Scoreboard():
 
     def prep_level(self) -> None:
         """Render the level into an image"""
-        self.level_image = self.font.render(str(self.stats.level), True,
-                                            self.text_color,
-                                            self.ai_settings.bg_color)
+        self.level_image = self.atlas.render(str(self.stats.level))
 
         # Position the level below the score
         self.level_rect = self.level_image.get_rect()
@@ -68,19 +69,20 @@ class Scoreboard():
     def prep_ships_left(self):
         """Show how many ships are left"""
         self.ships = Group()
-        ship_image = Ship(self.ai_settings, self.screen).image
-        small_ship_image = img_funs.resize(ship_image,
-                                           self.ai_settings.lives_left_height)
+        small_ship_image = img_funs.load_image(
+            SHIP_IMAGE, self.ai_settings.lives_left_height)
         for ship_number in range(self.stats.ships_left):
-            ship = Ship(self.ai_settings, self.screen)
+            ship = Sprite()
             ship.image = small_ship_image
+            ship.rect = small_ship_image.get_rect()
             ship.rect.x = 10 + ship_number * ship.rect.width
             ship.rect.y = 10
             self.ships.add(ship)
 
-    def show_score(self) -> None:
-        """Draw the score to the screen"""
-        self.screen.blit(self.score_image, self.score_rect)
-        self.screen.blit(self.high_score_image, self.high_score_rect)
-        self.screen.blit(self.level_image, self.level_rect)
-        self.ships.draw(self.screen)
+    def draw_list(self) -> list:
+        """The score, level and ships left as (source, rect) pairs"""
+        items = [(self.score_image, self.score_rect),
+                 (self.high_score_image, self.high_score_rect),
+                 (self.level_image, self.level_rect)]
+        items.extend((ship.image, ship.rect) for ship in self.ships)
+        return items
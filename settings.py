@@ -1,20 +1,119 @@
+import os
+
+# The game's own directory, which files it ships or keeps are found in
+# wherever it is launched from
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
 class Settings():
 
     def __init__(self) -> None:
         self.screen_width = 1200
         self.screen_height = 800
         self.bg_color = 30, 200, 230
+        # Font file for all text; None is the font bundled with pygame
+        self.font_file = None
+
+        # The simulation advances in fixed steps of 1 / simulation_rate
+        # seconds, however fast the screen is redrawn. max_fps caps the
+        # render rate (0 renders uncapped, e.g. for benchmarks) and
+        # idle_fps applies while the game is paused or waiting on Play.
+        self.simulation_rate = 120
+        self.max_fps = 60
+        self.idle_fps = 30
+        self.vsync = False
+        # Longest stretch of time simulated after a stall, in seconds
+        self.max_frame_time = 0.25
+        # Step the simulation on a thread of its own, which publishes a
+        # snapshot of what to draw after every step, so a slow frame
+        # never holds up a step or input
+        self.pipelined = False
+
+        # 'dirty' repaints only changed rectangles and falls back to a
+        # full flip past max_dirty_fraction of the screen; 'full'
+        # always redraws the whole screen.
+        self.render_mode = 'dirty'
+        self.max_dirty_fraction = 0.4
+        # 'surface' draws with software blits onto the display surface;
+        # 'texture' uploads each image once as a texture and draws
+        # through an SDL renderer, accelerated where the machine allows
+        self.render_backend = 'surface'
+        # Draw the fleet from one surface holding every living alien,
+        # patched as aliens die, instead of blitting each alien. Only
+        # used with the 'full' render mode on the 'surface' backend,
+        # which redraw the whole screen every frame anyway.
+        self.fleet_composite = True
+
+        # 'rect' collides sprites by their bounding rects; 'mask' only
+        # counts a hit where opaque pixels overlap, using masks built
+        # once per image and tested only after the rects overlap
+        self.collision_mode = 'rect'
+
+        # Per-phase frame profiling, with an overlay toggled by F3. The
+        # last profile_frames frames are written to profile_output
+        # (.csv or .json) on exit when it is set.
+        self.profile = False
+        self.profile_frames = 600
+        self.profile_output = None
+        # Print how long startup took, phase by phase, at the first frame
+        self.startup_report = False
+
+        # When set, every input event is logged to this file per
+        # simulation tick, with a state checksum every
+        # record_checksum_interval ticks, for replay.py to play back
+        self.record_input = None
+        self.record_checksum_interval = 120
+
+        # When set, rendered frames are written to this file or
+        # directory by a background thread: a .y4m or .rgb/.raw video
+        # stream, or else numbered PNGs. capture_format overrides the
+        # guess from the name. Frames are written at max_fps (or
+        # simulation_rate) over capture_every a second of wall time,
+        # repeated or skipped to hold that rate, and dropped while all
+        # capture_queue_size buffers wait on the writer.
+        self.capture_output = None
+        self.capture_format = None
+        self.capture_every = 1
+        self.capture_queue_size = 8
+
+        # SQLite file the high score and finished games are kept in, or
+        # None to keep the high score in memory only. Writes are
+        # batched over high_score_flush_interval seconds.
+        self.high_score_file = os.path.join(GAME_DIR, 'high_scores.db')
+        self.high_score_flush_interval = 1.0
 
         self.ship_limit = 3
+        # Seconds the game holds after the ship is hit; the ship blinks
+        # blink_rate times a second meanwhile if respawn_animation is on
+        self.respawn_delay = 0.5
+        self.respawn_animation = True
+        self.respawn_blink_rate = 8
 
         self.bullet_width = 3
         self.bullet_height = 15
         self.bullet_color = 60, 60, 60
         self.bullets_allowed = 3
 
+        # Aliens at the front of their column drop bombs, bomb_rate a
+        # second on average across the fleet, up to bombs_allowed at a
+        # time. Bombs are drawn from a generator seeded with
+        # random_seed, or a fresh seed when it is None; replays record
+        # the seed they need.
+        self.bomb_width = 3
+        self.bomb_height = 12
+        self.bomb_color = 230, 60, 60
+        self.bombs_allowed = 3
+        self.bomb_rate = 1.0
+        self.random_seed = None
+
         self.lives_left_height = 50
+        # Aliens are drawn at their image's own size unless this is set
+        self.alien_height = None
 
         self.fleet_drop_speed = 10
+        # Seconds a new fleet takes to slide down into place from above
+        # the screen; 0 puts it in place at once
+        self.fleet_entry_time = 0.0
 
         self.speedup_scale = 1.1
         self.score_scale = 1.5
@@ -22,11 +121,15 @@ class Settings():
         self.initialize_dynamic_settings()
 
     def initialize_dynamic_settings(self) -> None:
-        """Initialize settings that change throughout the game"""
-        self.ship_speed_factor = 1.5
-        self.bullet_speed_factor = 3
+        """
+        Initialize settings that change throughout the game.
+        Speeds are in pixels per second.
+        """
+        self.ship_speed_factor = 180
+        self.bullet_speed_factor = 360
+        self.bomb_speed_factor = 240
 
-        self.alien_speed_factor = 1
+        self.alien_speed_factor = 120
         self.alien_points = 50
 
         self.fleet_direction = 1
@@ -34,5 +137,6 @@ class Settings():
     def increase_speed(self) -> None:
         self.ship_speed_factor *= self.speedup_scale
         self.bullet_speed_factor *= self.speedup_scale
+        self.bomb_speed_factor *= self.speedup_scale
         self.alien_speed_factor *= self.speedup_scale
         self.alien_points = int(self.alien_points * self.score_scale)
@@ -1,45 +1,36 @@
-import pygame
-import pygame.image
-from pygame.sprite import Sprite
+from pygame.rect import Rect
 from pygame.surface import Surface
 
 import image_functions as img_funs
 from settings import Settings
+from simulation import SHIP_IMAGE, ShipBody, World
 
 
-class Ship(Sprite):
+class Ship(ShipBody):
+    """
+    The ship as the game draws it: a ShipBody with the ship's image,
+    and a rect built from the body's position
+    """
+
     def __init__(self, ai_settings: Settings, screen: Surface) -> None:
-        super(Ship, self).__init__()
         self.screen = screen
-        self.ai_settings = ai_settings
-
-        self.image = img_funs.load_as_surface('images/ship.png')
-        self.rect = self.image.get_rect()
-        self.screen_rect = screen.get_rect()
-
-        # Set initial position of the ship to be bottom center of screen
-        self.rect.centerx = self.screen_rect.centerx
-        self.rect.bottom = self.screen_rect.bottom
-
-        # Store position separately as a float value
-        self.center = float(self.rect.centerx)
-
-        self.moving_right = False
-        self.moving_left = False
-
-    def center_ship(self) -> None:
-        """Center the ship on the screen"""
-        self.center = self.screen_rect.centerx
-
-    def update(self) -> None:
-        """Update the ship's position based on the movement flag"""
-        if self.moving_right and self.rect.right < self.screen_rect.right:
-            self.center += self.ai_settings.ship_speed_factor
-        if self.moving_left and self.rect.left > 0:
-            self.center -= self.ai_settings.ship_speed_factor
-
-        self.rect.centerx = self.center
-
-    def blitme(self) -> None:
-        """ Draw the ship at its current location """
-        self.screen.blit(self.image, self.rect)
+        self.image = img_funs.load_image(SHIP_IMAGE)
+        width, height = self.image.get_size()
+        shape = (img_funs.load_shape(SHIP_IMAGE)
+                 if ai_settings.collision_mode == 'mask' else None)
+        super(Ship, self).__init__(ai_settings, World(*screen.get_size()),
+                                   width, height, shape)
+
+    @property
+    def rect(self) -> Rect:
+        return Rect(self.left, self.top, self.width, self.height)
+
+    def interpolated_rect(self, alpha: float) -> Rect:
+        """Rect for drawing alpha of the way through the last step"""
+        rect = self.rect
+        rect.centerx = (self.previous_center
+                        + (self.center - self.previous_center) * alpha)
+        return rect
+
+    def draw_list(self, alpha: float = 1.0) -> list:
+        return [(self.image, self.interpolated_rect(alpha))]
@@ -0,0 +1,1124 @@
+"""
+The game's simulation, with no pygame anywhere in it.
+
+World, ShipBody, the projectiles and FleetBody hold the game's state as
+plain numbers and NumPy arrays, and the functions below are the rules
+that step it forward. The sprites the game draws (Ship, Bullet, Bomb,
+BulletPool and Fleet) are thin adapters over these classes, adding
+images and rects; game_functions runs these rules and keeps the
+scoreboard up to date. Simulation puts a whole game together without
+them, for tools and batch jobs that never draw a frame.
+
+Image sizes are read from the PNG headers, so nothing here decodes an
+image. The one exception is 'mask' collision mode, whose shapes come
+from the decoded images and have to be handed in.
+"""
+import os
+import random
+import struct
+from collections import namedtuple
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple, Type)
+
+import numpy as np
+
+from collisions import (LatticeIndex, ShapeOverlap, SpatialHash,
+                        rect_touches_mask, rects_touch_mask, shape_sums)
+from game_stats import GameStats
+from settings import GAME_DIR, Settings
+
+ALIEN_IMAGE = os.path.join(GAME_DIR, 'images', 'alien.png')
+SHIP_IMAGE = os.path.join(GAME_DIR, 'images', 'ship.png')
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# A full grid's slot contents, and the lattice grid mapping its cells to
+# slots, computed once per grid size and copied into every new fleet
+Layout = namedtuple('Layout', ['x', 'y', 'column', 'row', 'grid',
+                               'front'])
+
+COLLISION_MODES = ('rect', 'mask')
+# Up to this many rect-alien pairs are mask tested one by one in plain
+# Python, which beats NumPy's overhead per call on so few
+FEW_PAIRS = 16
+# Up to this many projectiles in flight are each looked up on the fleet's
+# lattice in plain Python; the vectorised query pays off for volleys
+FEW_PROJECTILES = 8
+
+
+def image_size(filename: str, height: Optional[int] = None
+               ) -> Tuple[int, int]:
+    """
+    Size of load_image(filename, height), read from the PNG header
+    without decoding the image
+    """
+    with open(filename, 'rb') as image:
+        header = image.read(24)
+    if header[:8] != PNG_SIGNATURE:
+        raise ValueError('{} is not a PNG image'.format(filename))
+    width, image_height = struct.unpack('>II', header[16:24])
+    if height is None:
+        return width, image_height
+    # As image_functions.resize scales it
+    return int(width * (height / image_height)), height
+
+
+def to_pixel(value: float) -> int:
+    """Round a position to a pixel as a Rect does, halves away from zero"""
+    if value < 0:
+        return -int(-value + 0.5)
+    return int(value + 0.5)
+
+
+def to_pixels(values: np.ndarray) -> np.ndarray:
+    """to_pixel over an array of positions"""
+    return (np.floor(np.abs(values) + 0.5)
+            * np.sign(values)).astype(np.int64)
+
+
+class World():
+    """The bounds everything moves within: the screen, in pixels"""
+
+    def __init__(self, width: int, height: int) -> None:
+        self.width = width
+        self.height = height
+
+
+class ShipBody():
+    """
+    The ship's position and movement. left and top are the pixel
+    position a Rect would hold; like the ship's rect always has, left
+    follows center only when the ship moves.
+    """
+
+    def __init__(self, ai_settings: Settings, world: World, width: int,
+                 height: int, shape: Optional[np.ndarray] = None) -> None:
+        self.ai_settings = ai_settings
+        self.world = world
+        self.width = width
+        self.height = height
+        # The opaque pixels 'mask' collision mode hits
+        self.shape = shape
+        self.shape_sums = shape_sums(shape) if shape is not None else None
+
+        # Set initial position of the ship to be bottom center of world
+        self.left = world.width // 2 - width // 2
+        self.top = world.height - height
+
+        # Store position separately as a float value, along with the
+        # position before the last step for interpolated drawing
+        self.center = float(self.centerx)
+        self.previous_center = self.center
+
+        self.moving_right = False
+        self.moving_left = False
+
+    @property
+    def centerx(self) -> int:
+        return self.left + self.width // 2
+
+    @property
+    def right(self) -> int:
+        return self.left + self.width
+
+    @property
+    def bottom(self) -> int:
+        return self.top + self.height
+
+    def center_ship(self) -> None:
+        """Center the ship in the world"""
+        self.center = float(self.world.width // 2)
+        self.previous_center = self.center
+
+    def update(self, dt: float) -> None:
+        """Update the ship's position based on the movement flag"""
+        self.previous_center = self.center
+        distance = self.ai_settings.ship_speed_factor * dt
+        if self.moving_right and self.right < self.world.width:
+            self.center += distance
+        if self.moving_left and self.left > 0:
+            self.center -= distance
+
+        self.left = to_pixel(self.center) - self.width // 2
+
+
+class Projectile():
+    """
+    A bullet fired up from the ship. Projectiles live in a
+    ProjectilePool and are recycled rather than reallocated, so they
+    are kept compact with __slots__. kill() hands one back to its pool.
+    """
+
+    __slots__ = ('pool', 'left', 'top', 'width', 'height', 'y',
+                 'previous_y', 'speed_factor')
+
+    def __init__(self, ai_settings: Settings,
+                 pool: Optional['ProjectilePool'] = None) -> None:
+        self.pool = pool
+        self.left = self.top = 0
+        self.width = ai_settings.bullet_width
+        self.height = ai_settings.bullet_height
+        self.y = self.previous_y = 0.0
+        self.speed_factor = 0.0
+
+    @property
+    def centerx(self) -> int:
+        return self.left + self.width // 2
+
+    @property
+    def right(self) -> int:
+        return self.left + self.width
+
+    @property
+    def bottom(self) -> int:
+        return self.top + self.height
+
+    def launch(self, ai_settings: Settings, centerx: int, top: int) -> None:
+        """Place the projectile at centerx, top, ready to fly"""
+        self.left = centerx - self.width // 2
+        self.top = top
+
+        # Store position separately as a float value, along with the
+        # position before the last step for interpolated drawing
+        self.y = self.previous_y = float(top)
+
+        self.speed_factor = ai_settings.bullet_speed_factor
+
+    def kill(self) -> None:
+        if self.pool is not None:
+            self.pool.release(self)
+
+    def update(self, dt: float) -> None:
+        self.previous_y = self.y
+        self.y -= self.speed_factor * dt
+        self.top = to_pixel(self.y)
+
+    def off_screen(self, world: World) -> bool:
+        return self.bottom <= 0
+
+
+class FallingProjectile(Projectile):
+    """
+    A bomb dropped by an alien. It falls rather than rises, so its
+    speed_factor is negative.
+    """
+
+    __slots__ = ()
+
+    def __init__(self, ai_settings: Settings,
+                 pool: Optional['ProjectilePool'] = None) -> None:
+        super(FallingProjectile, self).__init__(ai_settings, pool)
+        self.width = ai_settings.bomb_width
+        self.height = ai_settings.bomb_height
+
+    def launch(self, ai_settings: Settings, centerx: int, top: int) -> None:
+        super(FallingProjectile, self).launch(ai_settings, centerx, top)
+        self.speed_factor = -ai_settings.bomb_speed_factor
+
+    def off_screen(self, world: World) -> bool:
+        return self.top >= world.height
+
+
+class ProjectilePool():
+    """
+    The projectiles in flight, plus preallocated spares. Firing takes a
+    spare instead of building a new one, and projectiles that hit
+    something or leave the world go back to the spares. Offers the
+    Group calls the game makes on its bullets: len(), iteration,
+    sprites(), update() and empty().
+    """
+
+    def __init__(self, ai_settings: Settings, world: World,
+                 capacity: Optional[int] = None,
+                 kind: Type[Projectile] = Projectile) -> None:
+        self.ai_settings = ai_settings
+        self.world = world
+        self.kind = kind
+        if capacity is None:
+            capacity = ai_settings.bullets_allowed
+        self.free: List[Projectile] = [self._make()
+                                       for _ in range(capacity)]
+        # A dict keeps firing order and removes projectiles in O(1)
+        self.active: Dict[Projectile, None] = {}
+
+    def _make(self) -> Projectile:
+        return self.kind(self.ai_settings, pool=self)
+
+    def __len__(self) -> int:
+        return len(self.active)
+
+    def __iter__(self) -> Iterator[Projectile]:
+        return iter(self.active)
+
+    def sprites(self) -> List[Projectile]:
+        return list(self.active)
+
+    def take(self) -> Projectile:
+        """A spare projectile, made if none are left, now in flight"""
+        if self.free:
+            projectile = self.free.pop()
+        else:
+            projectile = self._make()
+        self.active[projectile] = None
+        return projectile
+
+    def fire(self, centerx: int, top: int) -> Projectile:
+        """Launch a projectile from centerx, top"""
+        projectile = self.take()
+        projectile.launch(self.ai_settings, centerx, top)
+        return projectile
+
+    def release(self, projectile: Projectile) -> None:
+        if self.active.pop(projectile, False) is None:
+            self.free.append(projectile)
+
+    def empty(self) -> None:
+        self.free.extend(self.active)
+        self.active.clear()
+
+    def update(self, dt: float) -> None:
+        """Move every projectile and recycle those that left the world"""
+        gone = []
+        for projectile in self.active:
+            projectile.update(dt)
+            if projectile.off_screen(self.world):
+                gone.append(projectile)
+        for projectile in gone:
+            self.release(projectile)
+
+    def first_hit(self, left: int, top: int, width: int, height: int,
+                  sums: Optional[np.ndarray] = None
+                  ) -> Optional[Projectile]:
+        """
+        The first projectile in flight overlapping the given rect. With
+        sums, the summed-area table of a shape inside the rect, only
+        projectiles covering one of its set pixels count.
+        """
+        right = left + width
+        bottom = top + height
+        for projectile in self.active:
+            if (projectile.left >= right or projectile.right <= left
+                    or projectile.top >= bottom
+                    or projectile.bottom <= top):
+                continue
+            if sums is None or rect_touches_mask(
+                    sums, projectile.left - left, projectile.top - top,
+                    projectile.right - left, projectile.bottom - top):
+                return projectile
+        return None
+
+
+class FleetBody():
+    """
+    The alien fleet, stored as a struct of NumPy arrays rather than one
+    object per alien. Every alien is the same size and moves by the
+    same amount each step, so moving the fleet, finding its edges and
+    dropping it are single vectorized operations.
+    """
+
+    def __init__(self, ai_settings: Settings, world: World, width: int,
+                 height: int, shape: Optional[np.ndarray] = None,
+                 bombs: Optional[ProjectilePool] = None) -> None:
+        self.ai_settings = ai_settings
+        self.world = world
+        self.width = width
+        self.height = height
+
+        # 'mask' mode tests rect hits against the image's opaque pixels
+        if ai_settings.collision_mode not in COLLISION_MODES:
+            raise ValueError('Unknown collision mode {!r}, expected one of {}'
+                             .format(ai_settings.collision_mode,
+                                     ', '.join(COLLISION_MODES)))
+        self.pixel_perfect = ai_settings.collision_mode == 'mask'
+        if self.pixel_perfect:
+            if shape is None:
+                raise ValueError("'mask' collision mode needs the alien's "
+                                 "shape")
+            self.shape = shape
+            self._shape_sums = shape_sums(shape)
+            # Per shape tested against the aliens', by id
+            self._overlaps: Dict[int, Tuple[np.ndarray, ShapeOverlap]] = {}
+
+        # Slots [0, size) are in use; dead aliens keep their slot until
+        # the fleet is emptied so indexes stay stable during a level.
+        self.size = 0
+        self.alive_count = 0
+        self._allocate(64)
+
+        # How far the whole fleet moved in the last step, for drawing
+        # between steps. The fleet moves as a block, so two numbers do.
+        self.step_dx = 0.0
+        self.step_dy = 0.0
+        self._pending_dy = 0.0
+
+        # create_alien spaces aliens two widths and two heights apart
+        self.lattice = LatticeIndex(self.width, self.height,
+                                    2 * self.width, 2 * self.height)
+        self._index_stale = True
+        self._on_lattice = True
+
+        self._layouts: Dict[Tuple[int, int], Layout] = {}
+        # The front line: per column, the slot of its lowest living
+        # alien, or -1. Only front-line aliens drop bombs.
+        self.front = np.full(0, -1, dtype=np.int64)
+        if bombs is None:
+            bombs = ProjectilePool(ai_settings, world,
+                                   ai_settings.bombs_allowed,
+                                   FallingProjectile)
+        self.bombs = bombs
+        self.seed = (ai_settings.random_seed
+                     if ai_settings.random_seed is not None
+                     else random.randrange(2 ** 63))
+        self.rng = random.Random(self.seed)
+        # Distance a new fleet still has to slide down into place
+        self.entry_distance_left = 0.0
+        self.entry_speed = 0.0
+
+    def _allocate(self, capacity: int) -> None:
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.column = np.zeros(capacity, dtype=np.int32)
+        self.row = np.zeros(capacity, dtype=np.int32)
+
+    def _reserve(self, capacity: int) -> None:
+        """Grow the arrays so that they can hold at least capacity aliens"""
+        if capacity <= len(self.x):
+            return
+        old = self.x, self.y, self.alive, self.column, self.row
+        self._allocate(max(capacity, 2 * len(self.x)))
+        for new_array, old_array in zip(
+                (self.x, self.y, self.alive, self.column, self.row), old):
+            new_array[:self.size] = old_array[:self.size]
+
+    def __len__(self) -> int:
+        return self.alive_count
+
+    def empty(self) -> None:
+        self.alive[:self.size] = False
+        self.size = 0
+        self.alive_count = 0
+        self._index_stale = True
+        self.step_dx = self.step_dy = self._pending_dy = 0.0
+        self.entry_distance_left = 0.0
+        self.front[:] = -1
+        self.bombs.empty()
+
+    def motion(self) -> Tuple[float, float, float, float, float]:
+        """
+        The fleet's motion as restore() takes it: the last step's, the
+        drop still to come and the entry still to go
+        """
+        return (self.step_dx, self.step_dy, self._pending_dy,
+                self.entry_distance_left, self.entry_speed)
+
+    def restore(self, x: np.ndarray, y: np.ndarray, alive: np.ndarray,
+                column: np.ndarray, row: np.ndarray, front: np.ndarray,
+                step_dx: float, step_dy: float, pending_dy: float,
+                entry_distance_left: float, entry_speed: float) -> None:
+        """
+        Replace the fleet with the aliens and motion a snapshot held.
+        The bombs are emptied, and the index is rebuilt on next use.
+        """
+        self.empty()
+        size = len(x)
+        self._reserve(size)
+        self.x[:size] = x
+        self.y[:size] = y
+        self.alive[:size] = alive
+        self.column[:size] = column
+        self.row[:size] = row
+        self.size = size
+        self.alive_count = int(np.count_nonzero(self.alive[:size]))
+        self._reserve_columns(len(front))
+        self.front[:len(front)] = front
+
+        self.step_dx = step_dx
+        self.step_dy = step_dy
+        self._pending_dy = pending_dy
+        self.entry_distance_left = entry_distance_left
+        self.entry_speed = entry_speed
+
+    def _recycle_if_cleared(self) -> None:
+        """Reuse every slot once the whole fleet has been destroyed"""
+        if self.size and not self.alive_count:
+            self.empty()
+
+    def spawn(self, x: float, y: float, column: int, row: int) -> int:
+        """Add one alien and return its index"""
+        self._recycle_if_cleared()
+        self._reserve(self.size + 1)
+        index = self.size
+        self.x[index] = x
+        self.y[index] = y
+        self.column[index] = column
+        self.row[index] = row
+        self.alive[index] = True
+        self.size += 1
+        self.alive_count += 1
+        self._index_stale = True
+
+        self._reserve_columns(column + 1)
+        front = self.front.item(column)
+        if front < 0 or self.row.item(front) < row:
+            self.front[column] = index
+        return index
+
+    def _reserve_columns(self, count: int) -> None:
+        if count > len(self.front):
+            front = np.full(count, -1, dtype=np.int64)
+            front[:len(self.front)] = self.front
+            self.front = front
+
+    def layout(self, number_aliens_x: int, number_rows: int) -> Layout:
+        """
+        The layout of a full grid, as create_alien would place it. It is
+        computed on first use and shared by every later fleet that size.
+        """
+        key = (number_aliens_x, number_rows)
+        layout = self._layouts.get(key)
+        if layout is None:
+            count = number_aliens_x * number_rows
+            rows, columns = np.divmod(np.arange(count, dtype=np.int32),
+                                      number_aliens_x)
+            layout = Layout(
+                x=(self.width + 2 * self.width * columns).astype(np.float64),
+                y=(self.height + 2 * self.height * rows).astype(np.float64),
+                column=columns, row=rows,
+                grid=np.arange(count, dtype=np.int64).reshape(
+                    number_rows, number_aliens_x),
+                front=np.arange(count - number_aliens_x, count,
+                                dtype=np.int64))
+            for array in layout:
+                array.flags.writeable = False
+            self._layouts[key] = layout
+        return layout
+
+    def spawn_grid(self, number_aliens_x: int, number_rows: int) -> None:
+        """
+        Lay out a full grid of aliens by copying in its precomputed
+        layout. A grid spawned into an empty fleet also takes the
+        layout's lattice as it is, so no index needs building.
+        """
+        self._recycle_if_cleared()
+        layout = self.layout(number_aliens_x, number_rows)
+        count = len(layout.x)
+        fresh = not self.size
+        self._reserve(self.size + count)
+        block = slice(self.size, self.size + count)
+
+        self.column[block] = layout.column
+        self.row[block] = layout.row
+        self.x[block] = layout.x
+        self.y[block] = layout.y
+        self.alive[block] = True
+
+        self.size += count
+        self.alive_count += count
+        if fresh:
+            self.lattice.grid = layout.grid
+            self._on_lattice = True
+            self._index_stale = False
+            self._reserve_columns(number_aliens_x)
+            self.front[:number_aliens_x] = layout.front
+            self._start_entry(number_rows)
+        else:
+            self._index_stale = True
+            self._reserve_columns(number_aliens_x)
+            for column in range(number_aliens_x):
+                self._advance_front(column)
+
+    def _start_entry(self, number_rows: int) -> None:
+        """Lift a new fleet above the world to slide down into place"""
+        entry_time = self.ai_settings.fleet_entry_time
+        if entry_time <= 0 or not self.size:
+            return
+        distance = float(2 * self.height * number_rows)
+        self.y[:self.size] -= distance
+        self.entry_distance_left = distance
+        self.entry_speed = distance / entry_time
+
+    def update(self, dt: float) -> None:
+        """
+        Move every alien sideways in the current fleet direction, and
+        down while a new fleet is still entering
+        """
+        self.step_dx = (self.ai_settings.alien_speed_factor
+                        * self.ai_settings.fleet_direction * dt)
+        self.step_dy = self._pending_dy
+        self._pending_dy = 0.0
+        self.x[:self.size] += self.step_dx
+        if self.entry_distance_left > 0:
+            dy = min(self.entry_distance_left, self.entry_speed * dt)
+            self.entry_distance_left -= dy
+            self.y[:self.size] += dy
+            self.step_dy += dy
+
+    def drop(self, distance: float) -> None:
+        self.y[:self.size] += distance
+        self._pending_dy += distance
+
+    def lefts(self) -> np.ndarray:
+        """Integer rect positions, as a Rect would hold them"""
+        return to_pixels(self.x[:self.size])
+
+    def tops(self) -> np.ndarray:
+        return to_pixels(self.y[:self.size])
+
+    def check_edges(self) -> bool:
+        """Return true if any living alien is at the edge of the world"""
+        if not self.alive_count:
+            return False
+        # Rounding keeps order, so only the extremes need rounding
+        x = self.x[:self.size][self.alive[:self.size]]
+        return (to_pixel(x.max().item()) + self.width >= self.world.width
+                or to_pixel(x.min().item()) <= 0)
+
+    def reached_bottom(self, bottom: int) -> bool:
+        """Return true if any living alien has reached bottom"""
+        if not self.alive_count:
+            return False
+        y = self.y[:self.size][self.alive[:self.size]]
+        return to_pixel(y.max().item()) + self.height >= bottom
+
+    def kill(self, indexes: Iterable[int]) -> np.ndarray:
+        """Kill the aliens at indexes, and return those that were alive"""
+        indexes = np.fromiter(indexes, dtype=np.int64)
+        indexes = indexes[self.alive[indexes]]
+        self.alive[indexes] = False
+        self.alive_count -= len(indexes)
+
+        # Move the front line back in the columns that lost their front
+        columns = self.column[indexes]
+        for column in columns[self.front[columns] == indexes].tolist():
+            self._advance_front(column)
+        return indexes
+
+    def _advance_front(self, column: int) -> None:
+        """Find the lowest living alien left in column"""
+        if self._on_lattice and not self._index_stale:
+            # Walk up the column's cells from the bottom
+            grid = self.lattice.grid
+            if column < grid.shape[1]:
+                for index in grid[::-1, column].tolist():
+                    if index >= 0 and self.alive.item(index):
+                        self.front[column] = index
+                        return
+            self.front[column] = -1
+            return
+        indexes = np.flatnonzero((self.column[:self.size] == column)
+                                 & self.alive[:self.size])
+        self.front[column] = (indexes[np.argmax(self.row[indexes])]
+                              if len(indexes) else -1)
+
+    def drop_bombs(self, dt: float) -> None:
+        """
+        Maybe drop a bomb from a random front-line alien, so that the
+        fleet drops bomb_rate a second on average
+        """
+        if self.rng.random() >= self.ai_settings.bomb_rate * dt:
+            return
+        if len(self.bombs) >= self.ai_settings.bombs_allowed:
+            return
+        columns = np.flatnonzero(self.front >= 0)
+        if not len(columns):
+            return
+        index = self.front.item(columns[self.rng.randrange(len(columns))])
+        self.bombs.fire(to_pixel(self.x.item(index)) + self.width // 2,
+                        to_pixel(self.y.item(index)) + self.height)
+
+    def origin(self) -> Tuple[float, float]:
+        """Position of lattice cell (0, 0), taken from the first slot"""
+        return (self.x[0] - self.lattice.pitch_x * self.column[0],
+                self.y[0] - self.lattice.pitch_y * self.row[0])
+
+    def _refresh_index(self) -> None:
+        """
+        Rebuild the lattice after spawning. The fleet moves as a block,
+        so the lattice stays valid until the next spawn; aliens placed
+        off the lattice fall back to a spatial hash.
+        """
+        self._index_stale = False
+        indexes = np.arange(self.size)
+        columns = self.column[:self.size]
+        rows = self.row[:self.size]
+        self.lattice.build(columns, rows, indexes)
+        if not self.size:
+            self._on_lattice = True
+            return
+        origin_x, origin_y = self.origin()
+        drift_x = self.x[:self.size] - self.lattice.pitch_x * columns
+        drift_y = self.y[:self.size] - self.lattice.pitch_y * rows
+        self._on_lattice = bool(
+            (np.abs(drift_x - origin_x) < 0.5).all()
+            and (np.abs(drift_y - origin_y) < 0.5).all()
+            and len(np.unique(rows * (columns.max() + 1) + columns))
+            == self.size)
+
+    def _candidates(self, lefts: np.ndarray, tops: np.ndarray,
+                    rights: np.ndarray, bottoms: np.ndarray
+                    ) -> Tuple[np.ndarray, np.ndarray]:
+        if self._on_lattice:
+            origin_x, origin_y = self.origin()
+            return self.lattice.query(origin_x, origin_y,
+                                      lefts, tops, rights, bottoms)
+
+        # Free-moving aliens: bucket them in a spatial hash instead
+        spatial_hash = SpatialHash(2 * max(self.width, self.height))
+        for index, left, top in zip(range(self.size),
+                                    self.lefts().tolist(),
+                                    self.tops().tolist()):
+            spatial_hash.insert(index, (left, top, self.width, self.height))
+        rects, indexes = [], []
+        for rect_index, rect in enumerate(zip(
+                lefts.tolist(), tops.tolist(),
+                (rights - lefts).tolist(), (bottoms - tops).tolist())):
+            for index in spatial_hash.query(rect):
+                rects.append(rect_index)
+                indexes.append(index)
+        return (np.array(rects, dtype=np.int64),
+                np.array(indexes, dtype=np.int64))
+
+    def collide_rects(self, lefts: np.ndarray, tops: np.ndarray,
+                      rights: np.ndarray, bottoms: np.ndarray
+                      ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return (rect, alien) index pairs for every living alien that
+        overlaps one of the given rects, sorted by rect then alien. In
+        'mask' collision mode the rects are taken as solid, and only
+        count where they cover one of the alien's opaque pixels.
+        """
+        if self._index_stale:
+            self._refresh_index()
+        rects, indexes = self._candidates(lefts, tops, rights, bottoms)
+
+        # Exact test against the integer rects the aliens are drawn at
+        alien_lefts = to_pixels(self.x[indexes])
+        alien_tops = to_pixels(self.y[indexes])
+        hits = (self.alive[indexes]
+                & (alien_lefts < rights[rects])
+                & (alien_lefts + self.width > lefts[rects])
+                & (alien_tops < bottoms[rects])
+                & (alien_tops + self.height > tops[rects]))
+        rects, indexes = rects[hits], indexes[hits]
+        if self.pixel_perfect and len(rects):
+            alien_lefts = alien_lefts[hits]
+            alien_tops = alien_tops[hits]
+            if len(rects) <= FEW_PAIRS:
+                sums = self._shape_sums
+                touching = np.array(
+                    [rect_touches_mask(sums, lefts.item(rect) - alien_left,
+                                       tops.item(rect) - alien_top,
+                                       rights.item(rect) - alien_left,
+                                       bottoms.item(rect) - alien_top)
+                     for rect, alien_left, alien_top in zip(
+                         rects.tolist(), alien_lefts.tolist(),
+                         alien_tops.tolist())], dtype=bool)
+            else:
+                touching = rects_touch_mask(
+                    self._shape_sums,
+                    lefts[rects] - alien_lefts, tops[rects] - alien_tops,
+                    rights[rects] - alien_lefts,
+                    bottoms[rects] - alien_tops)
+            rects, indexes = rects[touching], indexes[touching]
+        order = np.lexsort((indexes, rects))
+        return rects[order], indexes[order]
+
+    def collide_and_kill(self, lefts: np.ndarray, tops: np.ndarray,
+                         rights: np.ndarray, bottoms: np.ndarray,
+                         kill: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        collide_rects, optionally killing the aliens hit. An alien
+        killed by one rect cannot be hit by a later one.
+        """
+        rect_indexes, indexes = self.collide_rects(lefts, tops,
+                                                   rights, bottoms)
+        if kill:
+            _, first = np.unique(indexes, return_index=True)
+            first.sort()
+            rect_indexes, indexes = rect_indexes[first], indexes[first]
+            self.kill(indexes)
+        return rect_indexes, indexes
+
+    def collide_projectiles(self, projectiles: ProjectilePool
+                            ) -> Dict[Projectile, List[int]]:
+        """
+        Kill every living alien a projectile in flight hits, and the
+        projectiles that hit, mapping each of those to the indexes of
+        the aliens it hit
+        """
+        flying = projectiles.sprites()
+        if not flying or not self.alive_count:
+            return {}
+        if self._index_stale:
+            self._refresh_index()
+        if len(flying) <= FEW_PROJECTILES and self._on_lattice:
+            return self._collide_few(flying)
+        rects = np.array([(projectile.left, projectile.top,
+                           projectile.width, projectile.height)
+                          for projectile in flying],
+                         dtype=np.int64).reshape(-1, 4)
+        lefts, tops = rects[:, 0], rects[:, 1]
+        rect_indexes, indexes = self.collide_and_kill(
+            lefts, tops, lefts + rects[:, 2], tops + rects[:, 3], True)
+
+        collisions: Dict[Projectile, List[int]] = {}
+        for rect_index, index in zip(rect_indexes.tolist(),
+                                     indexes.tolist()):
+            collisions.setdefault(flying[rect_index], []).append(index)
+        for projectile in collisions:
+            projectile.kill()
+        return collisions
+
+    def _collide_few(self, flying: List[Projectile]
+                     ) -> Dict[Projectile, List[int]]:
+        """collide_projectiles for a few projectiles, one at a time"""
+        collisions: Dict[Projectile, List[int]] = {}
+        killed: List[int] = []
+        for projectile in flying:
+            # An alien killed by an earlier projectile cannot be hit
+            hits = [index for index in self._lattice_hits(
+                        projectile.left, projectile.top, projectile.width,
+                        projectile.height, None)
+                    if index not in killed]
+            if hits:
+                collisions[projectile] = hits
+                killed.extend(hits)
+        if killed:
+            self.kill(killed)
+            for projectile in collisions:
+                projectile.kill()
+        return collisions
+
+    def collide_rect(self, left: int, top: int, width: int, height: int,
+                     shape: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Return the indexes of living aliens overlapping the given rect.
+        In 'mask' collision mode, shape is what fills the rect, which is
+        taken as solid without one.
+        """
+        if self._index_stale:
+            self._refresh_index()
+        right = left + width
+        bottom = top + height
+        overlap = None
+        if self.pixel_perfect and shape is not None:
+            overlap = self._overlap_with(shape)
+        if self._on_lattice:
+            return np.array(self._lattice_hits(left, top, width, height,
+                                               overlap), dtype=np.int64)
+
+        _, indexes = self.collide_rects(
+            np.array([left]), np.array([top]),
+            np.array([right]), np.array([bottom]))
+        if overlap is not None:
+            # collide_rects took the rect as solid; now try its shape
+            indexes = np.array(
+                [index for index in indexes.tolist() if overlap.overlap(
+                    left - to_pixel(self.x.item(index)),
+                    top - to_pixel(self.y.item(index)))],
+                dtype=np.int64)
+        return indexes
+
+    def _lattice_hits(self, left: int, top: int, width: int, height: int,
+                      overlap: Optional[ShapeOverlap]) -> List[int]:
+        """
+        Sorted indexes of the living aliens a rect hits, looked up on the
+        lattice one cell at a time
+        """
+        right = left + width
+        bottom = top + height
+        origin_x, origin_y = self.origin()
+        hits = []
+        for index in sorted(self.lattice.query_rect(origin_x, origin_y,
+                                                    left, top, right,
+                                                    bottom)):
+            if not self.alive.item(index):
+                continue
+            alien_left = to_pixel(self.x.item(index))
+            alien_top = to_pixel(self.y.item(index))
+            if not (alien_left < right and left < alien_left + self.width
+                    and alien_top < bottom
+                    and top < alien_top + self.height):
+                continue
+            if not self.pixel_perfect:
+                hits.append(index)
+                continue
+            dx, dy = left - alien_left, top - alien_top
+            if (overlap.overlap(dx, dy) if overlap is not None
+                    else rect_touches_mask(self._shape_sums, dx, dy,
+                                           dx + width, dy + height)):
+                hits.append(index)
+        return hits
+
+    def _overlap_with(self, shape: np.ndarray) -> ShapeOverlap:
+        cached = self._overlaps.get(id(shape))
+        if cached is None or cached[0] is not shape:
+            cached = (shape, ShapeOverlap(self.shape, shape))
+            self._overlaps[id(shape)] = cached
+        return cached[1]
+
+
+def get_number_aliens_x(ai_settings: Settings, alien_width: int) -> int:
+    """Determine the number of aliens that fit in a row"""
+    available_space_x = ai_settings.screen_width - (2 * alien_width)
+    number_aliens_x = int(available_space_x / (2 * alien_width))
+    return number_aliens_x
+
+
+def get_number_rows(ai_settings: Settings, ship_height: int,
+                    alien_height: int) -> int:
+    available_space_y = (ai_settings.screen_height
+                         - (3 * alien_height)
+                         - ship_height)
+    number_rows = int(available_space_y / (2 * alien_height))
+    return number_rows
+
+
+def create_alien(ai_settings: Settings, aliens: FleetBody,
+                 alien_number: int, row_number: int) -> None:
+    """Create an alien and place it"""
+    alien_width = aliens.width
+    alien_height = aliens.height
+    aliens.spawn(alien_width + (2 * alien_width * alien_number),
+                 alien_height + (2 * alien_height * row_number),
+                 alien_number, row_number)
+
+
+def create_fleet(ai_settings: Settings, ship: ShipBody,
+                 aliens: FleetBody) -> None:
+    number_aliens_x = get_number_aliens_x(ai_settings, aliens.width)
+    number_rows = get_number_rows(ai_settings, ship.height, aliens.height)
+
+    # Create a fleet of aliens, laid out as create_alien would
+    aliens.spawn_grid(number_aliens_x, number_rows)
+
+
+def reset_game(ai_settings: Settings, stats: GameStats, ship: ShipBody,
+               aliens: FleetBody, bullets: ProjectilePool) -> None:
+    """Start a new game, unless one is running"""
+    if stats.game_active:
+        return
+    # Reset the game statistics
+    stats.reset_stats()
+
+    # Empty the list of aliens and bullets
+    aliens.empty()
+    bullets.empty()
+
+    create_fleet(ai_settings, ship, aliens)
+    ship.center_ship()
+
+    ai_settings.initialize_dynamic_settings()
+
+    stats.game_active = True
+
+
+def fire_bullet(ai_settings: Settings, ship: ShipBody,
+                bullets: ProjectilePool) -> None:
+    if len(bullets) < ai_settings.bullets_allowed:
+        bullets.fire(ship.centerx, ship.top)
+
+
+def update_game(ai_settings: Settings, stats: GameStats, ship: ShipBody,
+                aliens: FleetBody, bullets: ProjectilePool, dt: float,
+                mark: Optional[Callable[[str], None]] = None) -> int:
+    """
+    Advance the simulation by one fixed step of dt seconds, and return
+    how many aliens were hit. mark, for profiling, is called with
+    'ship', 'bullets' and 'aliens' as each is brought up to date.
+    """
+    if stats.respawning:
+        # Hold the world still until the respawn delay has run out
+        stats.advance_respawn(dt)
+        return 0
+
+    ship.update(dt)
+    if mark:
+        mark('ship')
+    hits = update_bullets(ai_settings, stats, ship, aliens, bullets, dt)
+    if mark:
+        mark('bullets')
+    update_aliens(ai_settings, stats, ship, aliens, bullets, dt)
+    if mark:
+        mark('aliens')
+    return hits
+
+
+def update_bullets(ai_settings: Settings, stats: GameStats,
+                   ship: ShipBody, aliens: FleetBody,
+                   bullets: ProjectilePool, dt: float) -> int:
+    """
+    Update bullet positions, recycling bullets that left the world,
+    and return how many aliens were hit
+    """
+    bullets.update(dt)
+    return check_bullet_alien_collisions(ai_settings, stats, ship,
+                                         aliens, bullets)
+
+
+def check_bullet_alien_collisions(ai_settings: Settings, stats: GameStats,
+                                  ship: ShipBody, aliens: FleetBody,
+                                  bullets: ProjectilePool) -> int:
+    """
+    Check for any bullets that have hit aliens.
+    When so, get rid of both bullet an alien.
+    Return the number of aliens hit.
+    """
+    # Remove any bullets and aliens that have collided.
+    collisions = aliens.collide_projectiles(bullets)
+    hits = 0
+
+    for hit_aliens in collisions.values():
+        stats.score += ai_settings.alien_points
+        hits += len(hit_aliens)
+
+    if len(aliens) == 0:
+        # If the entire alien fleet is destroyed start a new level
+        bullets.empty()
+        ai_settings.increase_speed()
+
+        stats.level += 1
+
+        create_fleet(ai_settings, ship, aliens)
+
+    return hits
+
+
+def check_fleet_edges(ai_settings: Settings, aliens: FleetBody) -> None:
+    """Respond if any aliens have reached an edge"""
+    if aliens.check_edges():
+        change_fleet_direction(ai_settings, aliens)
+
+
+def change_fleet_direction(ai_settings: Settings,
+                           aliens: FleetBody) -> None:
+    """Drop the entire fleed and change the fleet's direction"""
+    aliens.drop(ai_settings.fleet_drop_speed)
+    ai_settings.fleet_direction *= -1
+
+
+def update_aliens(ai_settings: Settings, stats: GameStats, ship: ShipBody,
+                  aliens: FleetBody, bullets: ProjectilePool,
+                  dt: float) -> None:
+    """
+    Check if a fleet is at an edge.
+    Update the positions of all aliens in the fleet.
+    Check for alien-ship collisions, and for bombs hitting the ship
+    """
+    check_fleet_edges(ai_settings, aliens)
+    aliens.update(dt)
+
+    # Look for alien-ship collisions
+    if len(aliens.collide_rect(ship.left, ship.top, ship.width, ship.height,
+                               ship.shape)):
+        ship_hit(ai_settings, stats, ship, aliens, bullets)
+    # Look for aliens hitting the bottom of the world
+    check_aliens_bottom(ai_settings, stats, ship, aliens, bullets)
+
+    update_bombs(ai_settings, stats, ship, aliens, bullets, dt)
+
+
+def check_aliens_bottom(ai_settings: Settings, stats: GameStats,
+                        ship: ShipBody, aliens: FleetBody,
+                        bullets: ProjectilePool) -> None:
+    """Check if any aliens have reached the bottom of the world"""
+    if aliens.reached_bottom(aliens.world.height):
+        ship_hit(ai_settings, stats, ship, aliens, bullets)
+
+
+def update_bombs(ai_settings: Settings, stats: GameStats, ship: ShipBody,
+                 aliens: FleetBody, bullets: ProjectilePool,
+                 dt: float) -> None:
+    """
+    Let the front line drop bombs, move the bombs in flight and check
+    whether one has hit the ship
+    """
+    if not stats.game_active or stats.respawning:
+        # The ship was already hit this step
+        return
+    aliens.drop_bombs(dt)
+    aliens.bombs.update(dt)
+    if aliens.bombs.first_hit(ship.left, ship.top, ship.width, ship.height,
+                              ship.shape_sums):
+        ship_hit(ai_settings, stats, ship, aliens, bullets)
+
+
+def ship_hit(ai_settings: Settings, stats: GameStats, ship: ShipBody,
+             aliens: FleetBody, bullets: ProjectilePool) -> None:
+    """Respond to a ship being hit by an alien"""
+    stats.ships_left -= 1
+
+    if stats.ships_left > 0:
+        aliens.empty()
+        bullets.empty()
+
+        create_fleet(ai_settings, ship, aliens)
+        ship.center_ship()
+
+        # Pause without blocking; update_game counts the delay down
+        stats.respawn_time_left = ai_settings.respawn_delay
+
+    else:
+        stats.game_active = False
+
+
+class Simulation():
+    """
+    A whole game with nothing drawn, driven by the caller one step at a
+    time. Importing and building it never touches pygame, so batch
+    jobs can run thousands of games without SDL. 'mask' collision mode
+    needs decoded images, so it is not available here.
+
+    HeadlessGame builds on it, making sprites in make_bodies() and
+    keeping its scoreboard up to date in update().
+    """
+
+    def __init__(self, ai_settings: Optional[Settings] = None) -> None:
+        self.ai_settings = ai_settings or Settings()
+        self.world = World(self.ai_settings.screen_width,
+                           self.ai_settings.screen_height)
+        self.step_time = 1.0 / self.ai_settings.simulation_rate
+
+        self.stats = GameStats(self.ai_settings)
+        self.ship, self.aliens, self.bullets = self.make_bodies()
+
+        create_fleet(self.ai_settings, self.ship, self.aliens)
+
+    def make_bodies(self) -> Tuple[ShipBody, FleetBody, ProjectilePool]:
+        """The ship, the fleet and the bullet pool to play with"""
+        return (ShipBody(self.ai_settings, self.world,
+                         *image_size(SHIP_IMAGE)),
+                FleetBody(self.ai_settings, self.world,
+                          *image_size(ALIEN_IMAGE,
+                                      self.ai_settings.alien_height)),
+                ProjectilePool(self.ai_settings, self.world))
+
+    def start(self) -> None:
+        """Start a new game, as pressing Play does"""
+        reset_game(self.ai_settings, self.stats, self.ship, self.aliens,
+                   self.bullets)
+
+    def fire(self) -> None:
+        fire_bullet(self.ai_settings, self.ship, self.bullets)
+
+    def save_state(self) -> bytes:
+        """Snapshot the game, to load_state() back into it later"""
+        # snapshot builds on this module, so is imported on first use
+        import snapshot
+        return snapshot.save(self.ai_settings, self.stats, self.ship,
+                             self.aliens, self.bullets)
+
+    def load_state(self, state: bytes) -> None:
+        import snapshot
+        snapshot.restore(state, self.ai_settings, self.stats, self.ship,
+                         self.aliens, self.bullets)
+
+    def step(self) -> None:
+        """Advance one fixed simulation step, if a game is running"""
+        if self.stats.game_active and not self.stats.game_paused:
+            self.update(self.step_time)
+
+    def update(self, dt: float) -> None:
+        update_game(self.ai_settings, self.stats, self.ship, self.aliens,
+                    self.bullets, dt)
@@ -0,0 +1,210 @@
+"""
+Sweep Settings values over many headless games, played by an autopilot.
+
+Each --param names a Settings field and either a comma-separated list
+of values, swept as a grid, or a low:high range, sampled uniformly
+(with --samples). Every combination is played --games times with
+different seeds, spread over a process pool. Workers run the
+pygame-free Simulation, so they never start SDL, and 'mask' collision
+mode is not available.
+
+Results go to a columnar .npz file: one array per parameter, plus each
+game's seed, level reached, score, length in seconds, ships left and a
+score curve sampled every --sample-interval seconds.
+
+    python sweep.py --param speedup_scale=1.05,1.1,1.2 \\
+        --param fleet_drop_speed=5,10,20 --games 20 --output sweep.npz
+    python sweep.py --param score_scale=1.2:2.0 --samples 500
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Settings overrides for one game, its seed, and the length of the game
+Job = Tuple[Dict[str, float], int, int, int]
+
+
+def parse_param(text: str) -> Tuple[str, object]:
+    """'name=1,2,3' gives a list to sweep, 'name=1:2' a range to sample"""
+    name, _, values = text.partition('=')
+    if not name or not values:
+        raise argparse.ArgumentTypeError(
+            'expected name=a,b,c or name=low:high, not {!r}'.format(text))
+    if ':' in values:
+        low, high = (parse_number(value) for value in values.split(':'))
+        return name, (low, high)
+    return name, [parse_number(value) for value in values.split(',')]
+
+
+def parse_number(text: str):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def build_jobs(params: Sequence[Tuple[str, object]], games: int,
+               samples: int, seed: int, max_ticks: int,
+               sample_ticks: int) -> List[Job]:
+    """One job per game: a grid of the listed values, or random samples"""
+    rng = random.Random(seed)
+    names = [name for name, _ in params]
+    if any(isinstance(values, tuple) for _, values in params):
+        combinations = []
+        for _ in range(samples):
+            combination = []
+            for _, values in params:
+                if isinstance(values, list):
+                    combination.append(rng.choice(values))
+                elif all(isinstance(value, int) for value in values):
+                    combination.append(rng.randint(*values))
+                else:
+                    combination.append(rng.uniform(*values))
+            combinations.append(combination)
+    else:
+        combinations = list(itertools.product(
+            *(values for _, values in params)))
+
+    jobs = []
+    for combination in combinations:
+        for _ in range(games):
+            jobs.append((dict(zip(names, combination)),
+                         rng.randrange(2 ** 63), max_ticks, sample_ticks))
+    return jobs
+
+
+def play(job: Job) -> Dict:
+    """Play one game to the end, or max_ticks, and report on it"""
+    from bots import autopilot
+    from settings import Settings
+    from simulation import Simulation
+
+    overrides, seed, max_ticks, sample_ticks = job
+    ai_settings = Settings()
+    for name, value in overrides.items():
+        setattr(ai_settings, name, value)
+    ai_settings.random_seed = seed
+    game = Simulation(ai_settings)
+    game.start()
+    # Starting a game resets the dynamic settings; apply them again
+    for name, value in overrides.items():
+        setattr(ai_settings, name, value)
+
+    stats = game.stats
+    curve = np.zeros(max_ticks // sample_ticks + 1, dtype=np.int64)
+    tick = 0
+    while stats.game_active and tick < max_ticks:
+        if tick % sample_ticks == 0:
+            curve[tick // sample_ticks] = stats.score
+        autopilot(game)
+        game.step()
+        tick += 1
+    curve[tick // sample_ticks:] = stats.score
+
+    return {'seed': seed, 'level': stats.level, 'score': stats.score,
+            'seconds': tick / ai_settings.simulation_rate,
+            'ships_left': stats.ships_left,
+            'finished': not stats.game_active, 'score_curve': curve}
+
+
+def run_sweep(jobs: Sequence[Job], workers: int) -> List[Dict]:
+    if workers == 0:
+        return [play(job) for job in jobs]
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(workers, context) as executor:
+        chunksize = max(1, len(jobs) // (4 * workers))
+        return list(executor.map(play, jobs, chunksize=chunksize))
+
+
+def save_results(filename: str, names: Sequence[str], jobs: Sequence[Job],
+                 results: Sequence[Dict], sample_interval: float) -> None:
+    columns = {'param_' + name: np.array([job[0][name] for job in jobs])
+               for name in names}
+    for field in ('seed', 'level', 'score', 'seconds', 'ships_left',
+                  'finished'):
+        columns[field] = np.array([result[field] for result in results],
+                                  dtype=np.uint64 if field == 'seed'
+                                  else None)
+    columns['score_curve'] = np.stack([result['score_curve']
+                                       for result in results])
+    columns['sample_interval'] = np.array(sample_interval)
+    np.savez_compressed(filename, **columns)
+
+
+def print_summary(names: Sequence[str], jobs: Sequence[Job],
+                  results: Sequence[Dict], limit: int = 20) -> None:
+    groups: Dict[tuple, List[Dict]] = {}
+    for job, result in zip(jobs, results):
+        key = tuple(job[0][name] for name in names)
+        groups.setdefault(key, []).append(result)
+    rows = sorted(groups.items(), key=lambda item: -np.mean(
+        [result['level'] for result in item[1]]))
+    print('{:<40} {:>5} {:>7} {:>10} {:>9}'.format(
+        ', '.join(names) or 'defaults', 'games', 'level', 'score',
+        'seconds'))
+    for key, group in rows[:limit]:
+        print('{:<40} {:>5} {:>7.2f} {:>10.0f} {:>9.1f}'.format(
+            ', '.join('{:g}'.format(value) for value in key)[:40],
+            len(group), np.mean([result['level'] for result in group]),
+            np.mean([result['score'] for result in group]),
+            np.mean([result['seconds'] for result in group])))
+    if len(rows) > limit:
+        print('... {} more combinations'.format(len(rows) - limit))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description='Sweep Settings values over autopiloted headless games')
+    parser.add_argument('--param', type=parse_param, action='append',
+                        default=[], metavar='NAME=VALUES',
+                        help='a,b,c to sweep as a grid, low:high to sample')
+    parser.add_argument('--games', type=int, default=10,
+                        help='Games per combination of values')
+    parser.add_argument('--samples', type=int, default=100,
+                        help='Combinations to draw when sampling ranges')
+    parser.add_argument('--max-seconds', type=float, default=600,
+                        help='Stop games still running after this long')
+    parser.add_argument('--sample-interval', type=float, default=1.0,
+                        help='Seconds between score curve samples')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help='Worker processes, 0 to play in this one')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='sweep.npz')
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from settings import Settings
+    defaults = Settings()
+    for name, _ in args.param:
+        if not hasattr(defaults, name):
+            parser.error('Settings has no field {!r}'.format(name))
+
+    rate = defaults.simulation_rate
+    jobs = build_jobs(args.param, args.games, args.samples, args.seed,
+                      int(args.max_seconds * rate),
+                      max(1, int(args.sample_interval * rate)))
+    print('{:,} games on {} workers'.format(len(jobs), args.workers))
+    start = perf_counter()
+    results = run_sweep(jobs, args.workers)
+    seconds = perf_counter() - start
+    played = sum(result['seconds'] for result in results)
+    print('Done in {:.1f}s, {:.0f}x real time'.format(
+        seconds, played / seconds if seconds else 0.0))
+
+    names = [name for name, _ in args.param]
+    save_results(args.output, names, jobs, results, args.sample_interval)
+    print_summary(names, jobs, results)
+    print('Results written to', args.output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())